@@ -67,6 +67,7 @@ Organizational Membership Support:
         'data/membership_email_templates.xml',
         'data/seat_notification_email_templates.xml',
         'data/cron_data.xml',
+        'data/membership_entitlement_data.xml',
         
         # Wizard views
         'wizard/membership_quick_setup_wizard_views.xml',
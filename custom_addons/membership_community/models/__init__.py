@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 
 from . import membership_category
+from . import membership_chapter_territory
 from . import membership_benefit
 from . import membership_feature
+from . import membership_entitlement
 from . import product_template
 from . import res_partner
 from . import subscription_plan
@@ -14,84 +14,60 @@ class AccountMove(models.Model):
     def _post(self, soft=True):
         """Override post to activate memberships when invoice is posted and paid"""
         result = super()._post(soft=soft)
-        
-        for move in self:
-            # Only process customer invoices that are paid
-            if move.move_type == 'out_invoice' and move.payment_state in ('paid', 'in_payment'):
-                # Find related membership subscriptions
-                subscriptions = self.env['subscription.subscription'].search([
-                    ('invoice_ids', 'in', move.ids),
-                    ('is_membership', '=', True),
-                    ('state', '=', 'draft')
-                ])
-                
-                if subscriptions:
-                    _logger.info(f"Auto-activating {len(subscriptions)} membership subscriptions from paid invoice {move.name}")
-                    for subscription in subscriptions:
-                        try:
-                            # Activate subscription based on trial period
-                            if subscription.plan_id.trial_period > 0:
-                                subscription.action_start_trial()
-                            else:
-                                subscription.action_activate()
-                        except Exception as e:
-                            _logger.error(f"Failed to activate subscription {subscription.name}: {e}")
-        
+        self._activate_paid_memberships(('paid', 'in_payment'))
         return result
 
     def _invoice_paid_hook(self):
         """Hook called when invoice payment state changes to paid"""
         result = super()._invoice_paid_hook() if hasattr(super(), '_invoice_paid_hook') else None
-    
-        for move in self:
-            if move.move_type == 'out_invoice' and move.payment_state == 'paid':
-                # Find related membership subscriptions in draft state
-                subscriptions = self.env['subscription.subscription'].search([
-                    ('invoice_ids', 'in', move.ids),
-                    ('is_membership', '=', True),
-                    ('state', '=', 'draft')
-                ])
-            
-                # ALSO check if this invoice came from a sale order with subscription
-                if not subscriptions and move.invoice_origin:
-                    sale_order = self.env['sale.order'].search([
-                        ('name', '=', move.invoice_origin)
-                    ], limit=1)
-                
-                    if sale_order and sale_order.subscription_id:
-                        subscriptions = sale_order.subscription_id.filtered(
-                            lambda s: s.is_membership and s.state == 'draft'
-                        )
-            
-                if subscriptions:
-                    _logger.info(f"Invoice {move.name} paid - activating {len(subscriptions)} membership subscriptions")
-                    for subscription in subscriptions:
-                        try:
-                            # Activate subscription
-                            if subscription.plan_id.trial_period > 0:
-                                subscription.action_start_trial()
-                            else:
-                                subscription.action_activate()
-                        
-                            _logger.info(f"Activated subscription {subscription.name} for member {subscription.partner_id.name}")
-                        
-                            # Send welcome email
-                            send_welcome = self.env['ir.config_parameter'].sudo().get_param(
-                                'subscription.send_welcome_email', 'True'
-                            )
-                            if send_welcome == 'True':
-                                template = self.env.ref(
-                                    'subscription_management.email_template_subscription_welcome',
-                                    raise_if_not_found=False
-                                )
-                                if template:
-                                    template.send_mail(subscription.id, force_send=False)
-                        
-                        except Exception as e:
-                            _logger.error(f"Failed to activate subscription {subscription.name}: {str(e)}")
-    
+        self._activate_paid_memberships(('paid',), include_sale_orders=True)
         return result
 
+    def _activate_paid_memberships(self, payment_states, include_sale_orders=False):
+        """
+        Activate the draft membership subscriptions of paid customer invoices
+        
+        All invoices are resolved together: one search for the subscriptions
+        they bill and, when asked, one search for the sale orders of the
+        invoices that bill none, followed by one bulk activation.
+        
+        Args:
+            payment_states: invoice payment states that count as paid
+            include_sale_orders: also look up subscriptions through invoice_origin
+        
+        Returns:
+            recordset: the activated subscriptions
+        """
+        moves = self.filtered(
+            lambda m: m.move_type == 'out_invoice' and m.payment_state in payment_states
+        )
+        if not moves:
+            return self.env['subscription.subscription']
+        
+        # Find related membership subscriptions in draft state
+        subscriptions = self.env['subscription.subscription'].search([
+            ('invoice_ids', 'in', moves.ids),
+            ('is_membership', '=', True),
+            ('state', '=', 'draft')
+        ])
+        
+        # ALSO check if these invoices came from a sale order with subscription
+        if include_sale_orders:
+            origins = moves.filtered(
+                lambda m: m.invoice_origin and not (m.subscription_id & subscriptions)
+            ).mapped('invoice_origin')
+            if origins:
+                sale_orders = self.env['sale.order'].search([('name', 'in', origins)])
+                subscriptions |= sale_orders.subscription_id.filtered(
+                    lambda s: s.is_membership and s.state == 'draft'
+                )
+        
+        if not subscriptions:
+            return subscriptions
+        
+        _logger.info(f"{len(moves)} paid invoices - activating {len(subscriptions)} membership subscriptions")
+        return subscriptions._activate_from_payment()
+
 
 class AccountPayment(models.Model):
     """
@@ -102,31 +78,5 @@ class AccountPayment(models.Model):
     def action_post(self):
         """Override to activate membership subscriptions when payment is posted"""
         result = super().action_post()
-        
-        for payment in self:
-            # Get related invoices
-            reconciled_invoices = payment.reconciled_invoice_ids
-            
-            for invoice in reconciled_invoices:
-                if invoice.move_type == 'out_invoice' and invoice.payment_state == 'paid':
-                    # Find related membership subscriptions
-                    subscriptions = self.env['subscription.subscription'].search([
-                        ('invoice_ids', 'in', invoice.ids),
-                        ('is_membership', '=', True),
-                        ('state', '=', 'draft')
-                    ])
-                    
-                    if subscriptions:
-                        _logger.info(f"Payment posted for invoice {invoice.name} - activating {len(subscriptions)} memberships")
-                        for subscription in subscriptions:
-                            try:
-                                # Activate based on trial period
-                                if subscription.plan_id.trial_period > 0:
-                                    subscription.action_start_trial()
-                                else:
-                                    subscription.action_activate()
-                                _logger.info(f"Activated subscription {subscription.name} for member {subscription.partner_id.name}")
-                            except Exception as e:
-                                _logger.error(f"Failed to activate subscription {subscription.name}: {str(e)}")
-        
+        self.reconciled_invoice_ids._activate_paid_memberships(('paid',))
         return result
\ No newline at end of file
@@ -198,6 +198,35 @@ class MembershipBenefit(models.Model):
         help='Catchy tagline for marketing (e.g., "Save up to $500!")'
     )
 
+    # ==========================================
+    # CRUD OVERRIDES
+    # ==========================================
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Grant the new benefits to members of the products they are created on"""
+        benefits = super().create(vals_list)
+        if any('product_ids' in vals for vals in vals_list):
+            self.env['membership.entitlement']._refresh_products(benefits.product_ids.ids)
+        return benefits
+    
+    def write(self, vals):
+        """Rebuild member entitlements when the benefit is added to or removed from products"""
+        previous_product_ids = self.product_ids.ids if 'product_ids' in vals else []
+        result = super().write(vals)
+        if 'product_ids' in vals:
+            self.env['membership.entitlement']._refresh_products(
+                set(previous_product_ids) | set(self.product_ids.ids)
+            )
+        if 'code' in vals or 'active' in vals:
+            # Cached access checks are keyed by code
+            self.env['membership.entitlement']._bump_target_versions('benefit', self.ids)
+        return result
+    
+    def unlink(self):
+        self.env['membership.entitlement']._bump_target_versions('benefit', self.ids)
+        return super().unlink()
+
     # ==========================================
     # BUSINESS METHODS
     # ==========================================
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
+from datetime import timedelta
+import math
 
 
 class MembershipCategory(models.Model):
@@ -19,6 +21,8 @@ class MembershipCategory(models.Model):
     _description = 'Membership Category'
     _order = 'sequence, name'
     _inherit = ['mail.thread', 'mail.activity.mixin']
+    _parent_name = 'parent_category_id'
+    _parent_store = True
 
     # ==========================================
     # CORE IDENTIFICATION
@@ -206,6 +210,11 @@ class MembershipCategory(models.Model):
         help='Parent membership category (e.g., National membership for chapters)'
     )
     
+    parent_path = fields.Char(
+        index=True,
+        help='Materialized ancestor ids (e.g. "1/4/12/"), maintained by the ORM'
+    )
+    
     child_category_ids = fields.One2many(
         'membership.category',
         'parent_category_id',
@@ -231,6 +240,28 @@ class MembershipCategory(models.Model):
         help='Instructions or notes about parent membership requirement'
     )
     
+    # ==========================================
+    # CHAPTER TERRITORY
+    # ==========================================
+    
+    territory_ids = fields.One2many(
+        'membership.chapter.territory',
+        'category_id',
+        string='Territories',
+        help='Countries, states and zip ranges covered by this chapter'
+    )
+    
+    eligible_partner_ids = fields.Many2many(
+        'res.partner',
+        'partner_eligible_chapter_rel',
+        'category_id',
+        'partner_id',
+        string='Eligible Partners',
+        readonly=True,
+        copy=False,
+        help='Partners located in the territories of this chapter'
+    )
+    
     @api.depends('child_category_ids')
     def _compute_child_count(self):
         """Count child categories"""
@@ -345,18 +376,12 @@ class MembershipCategory(models.Model):
         Get all parent categories up the hierarchy
         
         Returns:
-            recordset: membership.category records (parents)
+            recordset: membership.category records (parents), nearest first
         """
         self.ensure_one()
         
-        parents = self.env['membership.category']
-        current = self.parent_category_id
-        
-        while current:
-            parents |= current
-            current = current.parent_category_id
-        
-        return parents
+        ancestor_ids = [int(category_id) for category_id in (self.parent_path or '').split('/')[:-2]]
+        return self.browse(reversed(ancestor_ids))
     
     def get_all_child_categories(self, recursive=True):
         """
@@ -370,13 +395,45 @@ class MembershipCategory(models.Model):
         """
         self.ensure_one()
         
-        children = self.child_category_ids
+        if not recursive:
+            return self.child_category_ids
+        
+        # One indexed parent_path LIKE lookup
+        return self.search([
+            ('id', 'child_of', self.id),
+            ('id', '!=', self.id),
+        ])
+    
+    def get_subtree_members(self):
+        """
+        Get current members of these categories and all their descendants
         
-        if recursive:
-            for child in self.child_category_ids:
-                children |= child.get_all_child_categories(recursive=True)
+        Returns:
+            recordset: res.partner records
+        """
+        return self.env['res.partner'].search([
+            ('membership_category_id', 'child_of', self.ids),
+            ('is_member', '=', True),
+        ])
+
+    def action_rematch_territories(self):
+        """
+        Rebuild chapter eligibility after territory boundaries changed
         
-        return children
+        Runs on the selected chapters, or on every chapter when called
+        without records (e.g. from a server action).
+        """
+        chapters = self or self.search([('category_type', '=', 'chapter')])
+        match_count = self.env['membership.chapter.territory']._rematch_chapters(chapters.ids)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Territories Matched'),
+                'message': _('%s partners matched to %s chapters') % (match_count, len(chapters)),
+                'type': 'success',
+            }
+        }
 
     # ==========================================
     # EMERITUS/LIFETIME BUSINESS METHODS (NEW)
@@ -421,6 +478,55 @@ class MembershipCategory(models.Model):
         
         return (True, '')
     
+    @api.model
+    def _get_emeritus_rules(self):
+        """
+        Active emeritus categories, read once per compute batch
+        
+        Returns:
+            tuple: (category_id, auto_qualify_age, auto_qualify_years, requires_board_approval) per category
+        """
+        categories = self.sudo().search([
+            ('is_emeritus_category', '=', True),
+            ('active', '=', True),
+        ])
+        return tuple(
+            (category.id, category.auto_qualify_age, category.auto_qualify_years, category.requires_board_approval)
+            for category in categories
+        )
+    
+    @api.model
+    def _get_emeritus_cutoffs(self, auto_qualify_age, auto_qualify_years, today=None):
+        """
+        Latest birthdate and join date still meeting the age and years rules
+        
+        A partner qualifies when (today - date).days / 365.25 reaches the
+        rule, i.e. when the date is on or before today minus ceil(rule * 365.25) days.
+        
+        Returns:
+            tuple: (birthdate cutoff or None, member_since cutoff or None)
+        """
+        today = today or fields.Date.today()
+        birthdate_cutoff = member_since_cutoff = None
+        if auto_qualify_age > 0:
+            birthdate_cutoff = today - timedelta(days=math.ceil(auto_qualify_age * 365.25))
+        if auto_qualify_years > 0:
+            member_since_cutoff = today - timedelta(days=math.ceil(auto_qualify_years * 365.25))
+        return birthdate_cutoff, member_since_cutoff
+    
+    def _get_emeritus_eligibility_domain(self, today=None):
+        """Partner domain equivalent to check_emeritus_eligibility, evaluated in SQL"""
+        self.ensure_one()
+        birthdate_cutoff, member_since_cutoff = self._get_emeritus_cutoffs(
+            self.auto_qualify_age, self.auto_qualify_years, today
+        )
+        domain = []
+        if birthdate_cutoff:
+            domain += [('birthdate', '!=', False), ('birthdate', '<=', birthdate_cutoff)]
+        if member_since_cutoff:
+            domain += [('member_since', '!=', False), ('member_since', '<=', member_since_cutoff)]
+        return domain
+    
     def action_view_eligible_members(self):
         """View members eligible for this category (emeritus/honorary)"""
         self.ensure_one()
@@ -432,15 +538,10 @@ class MembershipCategory(models.Model):
         eligible_partners = self.env['res.partner']
         
         if self.is_emeritus_category and (self.auto_qualify_age > 0 or self.auto_qualify_years > 0):
-            all_members = self.env['res.partner'].search([
+            eligible_partners = self.env['res.partner'].search([
                 ('is_member', '=', True),
                 ('membership_category_id', '!=', self.id),
-            ])
-            
-            for partner in all_members:
-                is_eligible, reason = self.check_emeritus_eligibility(partner)
-                if is_eligible:
-                    eligible_partners |= partner
+            ] + self._get_emeritus_eligibility_domain())
         
         return {
             'type': 'ir.actions.act_window',
@@ -514,6 +615,18 @@ class MembershipCategory(models.Model):
             result.append((record.id, name))
         return result
 
+    # ==========================================
+    # CRUD OVERRIDES
+    # ==========================================
+    
+    def write(self, vals):
+        if vals.get('parent_category_id'):
+            self._check_new_parent(self.browse(vals['parent_category_id']))
+        result = super().write(vals)
+        if 'category_type' in vals or 'active' in vals:
+            self.env['membership.chapter.territory']._rematch_chapters(self.ids)
+        return result
+
     # ==========================================
     # ONCHANGE METHODS
     # ==========================================
@@ -589,36 +702,28 @@ class MembershipCategory(models.Model):
                     _("Category code must be unique. '%s' is already used.") % category.code
                 )
     
+    def _check_new_parent(self, parent):
+        """Reject a parent that would close a loop, using parent paths only"""
+        for category in self:
+            if parent == category:
+                raise ValidationError(_(
+                    "A category cannot be its own parent."
+                ))
+            if category.parent_path and (parent.parent_path or '').startswith(category.parent_path):
+                raise ValidationError(_(
+                    "Circular parent relationship detected. "
+                    "Category '%s' cannot be a parent of itself through the hierarchy."
+                ) % category.name)
+    
     @api.constrains('parent_category_id')
     def _check_parent_recursion(self):
         """Prevent circular parent relationships"""
         for category in self:
-            if category.parent_category_id:
-                # Check for direct self-reference
-                if category.parent_category_id == category:
-                    raise ValidationError(_(
-                        "A category cannot be its own parent."
-                    ))
-                
-                # Check for circular reference
-                current = category.parent_category_id
-                visited = set()
-                while current:
-                    if current.id in visited:
-                        raise ValidationError(_(
-                            "Circular parent relationship detected. "
-                            "Category '%s' is in a parent loop."
-                        ) % category.name)
-                    
-                    visited.add(current.id)
-                    
-                    if current == category:
-                        raise ValidationError(_(
-                            "Circular parent relationship detected. "
-                            "Category '%s' cannot be a parent of itself through the hierarchy."
-                        ) % category.name)
-                    
-                    current = current.parent_category_id
+            if category.parent_category_id and str(category.id) in (category.parent_path or '').split('/')[:-2]:
+                raise ValidationError(_(
+                    "Circular parent relationship detected. "
+                    "Category '%s' is in a parent loop."
+                ) % category.name)
     
     @api.constrains('is_parent_required', 'parent_category_id')
     def _check_parent_requirement(self):
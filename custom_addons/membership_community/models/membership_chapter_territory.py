@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+from odoo.tools import split_every
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class MembershipChapterTerritory(models.Model):
+    """
+    Chapter Territory Rule
+    A country, optionally narrowed to a state and a zip prefix range.
+    Rules are compiled into partner_eligible_chapter_rel, so eligible
+    chapters of a partner and eligible partners of a chapter are each
+    one indexed lookup instead of a partner x chapter comparison.
+    """
+    _name = 'membership.chapter.territory'
+    _description = 'Chapter Territory'
+    _order = 'category_id, country_id, state_id, zip_from'
+
+    category_id = fields.Many2one(
+        'membership.category',
+        string='Chapter',
+        required=True,
+        ondelete='cascade',
+        index=True,
+        domain=[('category_type', '=', 'chapter')]
+    )
+
+    country_id = fields.Many2one(
+        'res.country',
+        string='Country',
+        required=True
+    )
+
+    state_id = fields.Many2one(
+        'res.country.state',
+        string='State',
+        domain="[('country_id', '=', country_id)]",
+        help='Leave empty to cover the whole country'
+    )
+
+    zip_from = fields.Char(
+        string='Zip From',
+        help='First zip prefix of the range (e.g., 940). Leave empty to ignore zip codes'
+    )
+
+    zip_to = fields.Char(
+        string='Zip To',
+        help='Last zip prefix of the range (e.g., 959), same length as Zip From. Defaults to Zip From'
+    )
+
+    zip_prefix_length = fields.Integer(
+        string='Zip Prefix Length',
+        compute='_compute_zip_prefix_length',
+        store=True,
+        help='Number of leading zip characters compared with the range'
+    )
+
+    @api.depends('zip_from')
+    def _compute_zip_prefix_length(self):
+        """Length of the compared zip prefix"""
+        for territory in self:
+            territory.zip_prefix_length = len(territory.zip_from or '')
+
+    # ==========================================
+    # CRUD OVERRIDES
+    # ==========================================
+
+    @api.model
+    def _normalize_zip(self, zip_code):
+        """Uppercase and strip spaces, matching the SQL normalization of partner zips"""
+        return (zip_code or '').replace(' ', '').upper() or False
+
+    def _normalize_zip_vals(self, vals):
+        for field_name in ('zip_from', 'zip_to'):
+            if field_name in vals:
+                vals[field_name] = self._normalize_zip(vals[field_name])
+        return vals
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            self._normalize_zip_vals(vals)
+            if vals.get('zip_from') and not vals.get('zip_to'):
+                vals['zip_to'] = vals['zip_from']
+        territories = super().create(vals_list)
+        self._rematch_chapters(territories.category_id.ids)
+        return territories
+
+    def write(self, vals):
+        previous_category_ids = self.category_id.ids
+        result = super().write(self._normalize_zip_vals(dict(vals)))
+        self._rematch_chapters(set(previous_category_ids) | set(self.category_id.ids))
+        return result
+
+    def unlink(self):
+        category_ids = self.category_id.ids
+        result = super().unlink()
+        self._rematch_chapters(category_ids)
+        return result
+
+    # ==========================================
+    # CONSTRAINTS
+    # ==========================================
+
+    @api.constrains('zip_from', 'zip_to')
+    def _check_zip_range(self):
+        """Zip ranges compare prefixes of one length, in order"""
+        for territory in self:
+            if territory.zip_to and not territory.zip_from:
+                raise ValidationError(_('Set Zip From before Zip To.'))
+            if territory.zip_from and len(territory.zip_to or '') != len(territory.zip_from):
+                raise ValidationError(_(
+                    'Zip From and Zip To must have the same length (%s, %s).'
+                ) % (territory.zip_from, territory.zip_to))
+            if territory.zip_from and territory.zip_to < territory.zip_from:
+                raise ValidationError(_(
+                    'Zip To must not be lower than Zip From (%s, %s).'
+                ) % (territory.zip_from, territory.zip_to))
+
+    @api.constrains('state_id', 'country_id')
+    def _check_state_country(self):
+        """State must belong to the country"""
+        for territory in self:
+            if territory.state_id and territory.state_id.country_id != territory.country_id:
+                raise ValidationError(_(
+                    'State %s is not in %s.'
+                ) % (territory.state_id.name, territory.country_id.name))
+
+    # ==========================================
+    # TERRITORY MATCHING
+    # ==========================================
+
+    def _flush_territory_sources(self):
+        """Flush every field the compiled matches are built from"""
+        self.flush_model(['category_id', 'country_id', 'state_id', 'zip_from', 'zip_to', 'zip_prefix_length'])
+        self.env['membership.category'].flush_model(['category_type', 'active'])
+        self.env['res.partner'].flush_model(['country_id', 'state_id', 'zip', 'active'])
+
+    def _insert_matches(self, condition, ids):
+        """Insert partner/chapter matches of the territory rules, restricted by a SQL condition on t or p"""
+        self.env.cr.execute("""
+            INSERT INTO partner_eligible_chapter_rel (partner_id, category_id)
+            SELECT DISTINCT p.id, t.category_id
+              FROM membership_chapter_territory t
+              JOIN membership_category c ON c.id = t.category_id
+              JOIN res_partner p ON p.country_id = t.country_id
+             WHERE c.active
+               AND c.category_type = 'chapter'
+               AND p.active
+               AND (t.state_id IS NULL OR p.state_id = t.state_id)
+               AND (t.zip_from IS NULL
+                    OR LEFT(UPPER(REPLACE(p.zip, ' ', '')), t.zip_prefix_length) BETWEEN t.zip_from AND t.zip_to)
+               AND %s = ANY(%%s)
+        """ % condition, (ids,))
+        return self.env.cr.rowcount
+
+    def _invalidate_matches(self):
+        """Drop cached eligibility on both sides of the match table"""
+        self.env['res.partner'].invalidate_model(['eligible_chapters'])
+        self.env['membership.category'].invalidate_model(['eligible_partner_ids'])
+
+    @api.model
+    def _rematch_chapters(self, category_ids):
+        """Rebuild the eligible partners of the given chapters"""
+        category_ids = list(set(category_ids))
+        if not category_ids:
+            return 0
+        self._flush_territory_sources()
+
+        self.env.cr.execute("""
+            DELETE FROM partner_eligible_chapter_rel WHERE category_id = ANY(%s)
+        """, (category_ids,))
+        match_count = self._insert_matches('t.category_id', category_ids)
+
+        self._invalidate_matches()
+        _logger.info(f"Matched {match_count} partners to {len(category_ids)} chapters")
+        return match_count
+
+    @api.model
+    def _rematch_partners(self, partner_ids):
+        """Rebuild the eligible chapters of the given partners"""
+        partner_ids = list(set(partner_ids))
+        if not partner_ids:
+            return 0
+        # Nothing to match (or left over) until a chapter defines territories
+        self.env.cr.execute("SELECT 1 FROM membership_chapter_territory LIMIT 1")
+        if not self.env.cr.fetchone():
+            return 0
+        self._flush_territory_sources()
+
+        match_count = 0
+        for chunk_ids in split_every(10000, partner_ids, list):
+            self.env.cr.execute("""
+                DELETE FROM partner_eligible_chapter_rel WHERE partner_id = ANY(%s)
+            """, (chunk_ids,))
+            match_count += self._insert_matches('p.id', chunk_ids)
+
+        self._invalidate_matches()
+        return match_count
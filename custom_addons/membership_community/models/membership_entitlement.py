@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, tools
+from odoo.tools import split_every
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Subscription states that grant features and benefits
+ENTITLED_STATES = ('trial', 'active')
+
+
+class MembershipEntitlement(models.Model):
+    """
+    Materialized Partner Entitlements
+    One row per partner, feature or benefit and granting subscription.
+    Kept up to date by subscription, partner, plan and product writes so
+    access checks and portal pages read one indexed table instead of
+    walking subscriptions, plans and products for every partner.
+    """
+    _name = 'membership.entitlement'
+    _description = 'Membership Entitlement'
+    _order = 'partner_id, entitlement_type'
+
+    partner_id = fields.Many2one(
+        'res.partner',
+        string='Partner',
+        required=True,
+        ondelete='cascade',
+        index=True,
+        readonly=True
+    )
+
+    entitlement_type = fields.Selection([
+        ('feature', 'Feature'),
+        ('benefit', 'Benefit'),
+    ], string='Type', required=True, readonly=True)
+
+    feature_id = fields.Many2one(
+        'membership.feature',
+        string='Feature',
+        ondelete='cascade',
+        readonly=True
+    )
+
+    benefit_id = fields.Many2one(
+        'membership.benefit',
+        string='Benefit',
+        ondelete='cascade',
+        readonly=True
+    )
+
+    source = fields.Selection([
+        ('direct', 'Direct Membership'),
+        ('seat', 'Seat'),
+        ('parent_org', 'Parent Organization'),
+    ], string='Source', required=True, readonly=True,
+       help='How the partner receives this entitlement')
+
+    subscription_id = fields.Many2one(
+        'subscription.subscription',
+        string='Granting Subscription',
+        required=True,
+        ondelete='cascade',
+        index=True,
+        readonly=True
+    )
+
+    _sql_constraints = [
+        ('entitlement_target', "CHECK((entitlement_type = 'feature' AND feature_id IS NOT NULL AND benefit_id IS NULL) "
+                               "OR (entitlement_type = 'benefit' AND benefit_id IS NOT NULL AND feature_id IS NULL))",
+         'An entitlement grants either one feature or one benefit!'),
+    ]
+
+    def init(self):
+        # Never reuses a value, even across rolled back transactions
+        self._cr.execute("CREATE SEQUENCE IF NOT EXISTS membership_entitlement_version_seq")
+        tools.create_index(
+            self._cr, 'membership_entitlement_feature_idx', self._table,
+            ['partner_id', 'feature_id'], where='feature_id IS NOT NULL'
+        )
+        tools.create_index(
+            self._cr, 'membership_entitlement_benefit_idx', self._table,
+            ['partner_id', 'benefit_id'], where='benefit_id IS NOT NULL'
+        )
+
+    # ==========================================
+    # ACCESS CHECKS
+    # ==========================================
+
+    @api.model
+    def _get_access_matrix(self, partner_ids, codes, entitlement_type):
+        """
+        Resolve access of several partners to several codes with one query
+
+        Args:
+            partner_ids: list of partner ids
+            codes: list of feature or benefit codes
+            entitlement_type: 'feature' or 'benefit'
+
+        Returns:
+            dict: {partner_id: {code: bool}}
+        """
+        partner_ids = list(partner_ids)
+        codes = list(codes)
+        matrix = {partner_id: dict.fromkeys(codes, False) for partner_id in partner_ids}
+        if not partner_ids or not codes:
+            return matrix
+
+        target_model = 'membership.feature' if entitlement_type == 'feature' else 'membership.benefit'
+        target_column = 'feature_id' if entitlement_type == 'feature' else 'benefit_id'
+        self.env[target_model].flush_model(['code', 'active'])
+        self.env.cr.execute("""
+            SELECT DISTINCT e.partner_id, t.code
+              FROM membership_entitlement e
+              JOIN %s t ON t.id = e.%s
+             WHERE e.partner_id = ANY(%%s)
+               AND t.code = ANY(%%s)
+               AND t.active
+        """ % (self.env[target_model]._table, target_column), (partner_ids, codes))
+        for partner_id, code in self.env.cr.fetchall():
+            matrix[partner_id][code] = True
+        return matrix
+
+    @api.model
+    def _has_access(self, partner_id, entitlement_type, code):
+        """
+        Cached single access check
+        
+        The cache is keyed on the partner's entitlement version, which every
+        refresh of the partner's rows bumps, so stale entries are simply never
+        hit again and no cache has to be cleared.
+        """
+        version = self.env['res.partner'].browse(partner_id).entitlement_version
+        return self._has_access_cached(partner_id, entitlement_type, code, version)
+    
+    @api.model
+    @tools.ormcache('partner_id', 'entitlement_type', 'code', 'version')
+    def _has_access_cached(self, partner_id, entitlement_type, code, version):
+        return self._get_access_matrix([partner_id], [code], entitlement_type)[partner_id][code]
+
+    # ==========================================
+    # INCREMENTAL MAINTENANCE
+    # ==========================================
+    
+    @api.model
+    def _bump_versions(self, partner_ids):
+        """Give the partners a new entitlement version, retiring their cached access checks"""
+        partner_ids = list(partner_ids)
+        if not partner_ids:
+            return
+        self.env.cr.execute("""
+            UPDATE res_partner
+               SET entitlement_version = (SELECT nextval('membership_entitlement_version_seq'))
+             WHERE id = ANY(%s)
+        """, (partner_ids,))
+        self.env['res.partner'].browse(partner_ids).invalidate_recordset(['entitlement_version'])
+    
+    @api.model
+    def _bump_target_versions(self, entitlement_type, target_ids):
+        """Retire cached access checks of partners entitled to these features or benefits (code or active changed)"""
+        target_column = 'feature_id' if entitlement_type == 'feature' else 'benefit_id'
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT DISTINCT partner_id FROM membership_entitlement WHERE %s = ANY(%%s)
+        """ % target_column, (list(target_ids),))
+        self._bump_versions([row[0] for row in self.env.cr.fetchall()])
+
+    def _flush_sources(self):
+        """Flush every field the entitlement rows are built from"""
+        self.env['subscription.subscription'].flush_model(['partner_id', 'plan_id', 'state'])
+        self.env['subscription.plan'].flush_model(['product_template_id'])
+        self.env['product.template'].flush_model(['is_membership_product', 'feature_ids', 'benefit_ids'])
+        self.env['res.partner'].flush_model(['seat_subscription_id', 'parent_organization_id'])
+
+    @api.model
+    def _refresh_partners(self, partner_ids):
+        """
+        Rebuild the entitlement rows of the given partners
+
+        Each chunk is one DELETE and one INSERT ... SELECT over the
+        subscriptions (direct), the seat subscription (seat) and, for seat
+        members, the parent organization's subscriptions (parent_org, benefits only).
+        """
+        partner_ids = list(set(partner_ids))
+        if not partner_ids:
+            return
+        self._flush_sources()
+
+        for chunk_ids in split_every(5000, partner_ids, list):
+            self.env.cr.execute("""
+                DELETE FROM membership_entitlement WHERE partner_id = ANY(%s)
+            """, (chunk_ids,))
+            self._bump_versions(chunk_ids)
+            self.env.cr.execute("""
+                WITH sources AS (
+                    SELECT s.partner_id, s.id AS subscription_id,
+                           pl.product_template_id, 'direct' AS source
+                      FROM subscription_subscription s
+                      JOIN subscription_plan pl ON pl.id = s.plan_id
+                      JOIN product_template pt ON pt.id = pl.product_template_id
+                     WHERE s.partner_id = ANY(%(partner_ids)s)
+                       AND s.state IN %(states)s
+                       AND pt.is_membership_product
+                    UNION ALL
+                    SELECT p.id, s.id, pl.product_template_id, 'seat'
+                      FROM res_partner p
+                      JOIN subscription_subscription s ON s.id = p.seat_subscription_id
+                      JOIN subscription_plan pl ON pl.id = s.plan_id
+                     WHERE p.id = ANY(%(partner_ids)s)
+                       AND s.state IN %(states)s
+                    UNION ALL
+                    SELECT p.id, s.id, pl.product_template_id, 'parent_org'
+                      FROM res_partner p
+                      JOIN subscription_subscription s ON s.partner_id = p.parent_organization_id
+                      JOIN subscription_plan pl ON pl.id = s.plan_id
+                      JOIN product_template pt ON pt.id = pl.product_template_id
+                     WHERE p.id = ANY(%(partner_ids)s)
+                       AND p.seat_subscription_id IS NOT NULL
+                       AND s.state IN %(states)s
+                       AND pt.is_membership_product
+                )
+                INSERT INTO membership_entitlement
+                    (partner_id, entitlement_type, feature_id, benefit_id, source, subscription_id,
+                     create_uid, create_date, write_uid, write_date)
+                SELECT src.partner_id, 'feature', rel.feature_id, NULL, src.source, src.subscription_id,
+                       %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+                  FROM sources src
+                  JOIN product_feature_rel rel ON rel.product_id = src.product_template_id
+                 WHERE src.source != 'parent_org'
+                UNION ALL
+                SELECT src.partner_id, 'benefit', NULL, rel.benefit_id, src.source, src.subscription_id,
+                       %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+                  FROM sources src
+                  JOIN product_benefit_rel rel ON rel.product_id = src.product_template_id
+            """, {
+                'partner_ids': chunk_ids,
+                'states': ENTITLED_STATES,
+                'uid': self.env.uid,
+            })
+
+        self.invalidate_model()
+        self.env['res.partner'].browse(partner_ids).invalidate_recordset(
+            ['entitlement_ids', 'available_features', 'available_benefits']
+        )
+
+    @api.model
+    def _refresh_subscriptions(self, subscription_ids, extra_partner_ids=()):
+        """
+        Rebuild the entitlements granted by the given subscriptions
+
+        Covers the subscription partners, the holders of these seats and the
+        seat members of the subscribing organizations.
+
+        Args:
+            subscription_ids: ids of created or changed subscriptions
+            extra_partner_ids: partners that may have lost a grant (e.g. previous subscribers)
+        """
+        if not subscription_ids and not extra_partner_ids:
+            return
+        self._flush_sources()
+        self.env.cr.execute("""
+            SELECT partner_id FROM subscription_subscription WHERE id = ANY(%(ids)s)
+            UNION
+            SELECT id FROM res_partner WHERE seat_subscription_id = ANY(%(ids)s)
+            UNION
+            SELECT p.id
+              FROM res_partner p
+              JOIN subscription_subscription s ON s.partner_id = p.parent_organization_id
+             WHERE s.id = ANY(%(ids)s)
+               AND p.seat_subscription_id IS NOT NULL
+        """, {'ids': list(subscription_ids)})
+        partner_ids = [row[0] for row in self.env.cr.fetchall()]
+        self._refresh_partners(partner_ids + list(extra_partner_ids))
+
+    @api.model
+    def _refresh_products(self, product_tmpl_ids):
+        """Rebuild the entitlements of everyone subscribed to the given products"""
+        if not product_tmpl_ids:
+            return
+        self._flush_sources()
+        self.env.cr.execute("""
+            SELECT s.id
+              FROM subscription_subscription s
+              JOIN subscription_plan pl ON pl.id = s.plan_id
+             WHERE pl.product_template_id = ANY(%s)
+               AND s.state IN %s
+        """, (list(product_tmpl_ids), ENTITLED_STATES))
+        self._refresh_subscriptions([row[0] for row in self.env.cr.fetchall()])
+
+    @api.model
+    def _backfill_entitlements(self):
+        """Build entitlement rows from running subscriptions when the table is still empty (install/upgrade)"""
+        self.env.cr.execute("SELECT 1 FROM membership_entitlement LIMIT 1")
+        if self.env.cr.fetchone():
+            return
+
+        self._flush_sources()
+        self.env.cr.execute("SELECT id FROM subscription_subscription WHERE state IN %s", (ENTITLED_STATES,))
+        self._refresh_subscriptions([row[0] for row in self.env.cr.fetchall()])
+
+        self.env.cr.execute("SELECT COUNT(*) FROM membership_entitlement")
+        _logger.info(f"Backfilled {self.env.cr.fetchone()[0]} membership entitlements")
@@ -127,6 +127,35 @@ class MembershipFeature(models.Model):
         for feature in self:
             feature.product_count = len(feature.product_ids)
 
+    # ==========================================
+    # CRUD OVERRIDES
+    # ==========================================
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Grant the new features to members of the products they are created on"""
+        features = super().create(vals_list)
+        if any('product_ids' in vals for vals in vals_list):
+            self.env['membership.entitlement']._refresh_products(features.product_ids.ids)
+        return features
+    
+    def write(self, vals):
+        """Rebuild member entitlements when the feature is added to or removed from products"""
+        previous_product_ids = self.product_ids.ids if 'product_ids' in vals else []
+        result = super().write(vals)
+        if 'product_ids' in vals:
+            self.env['membership.entitlement']._refresh_products(
+                set(previous_product_ids) | set(self.product_ids.ids)
+            )
+        if 'code' in vals or 'active' in vals:
+            # Cached access checks are keyed by code
+            self.env['membership.entitlement']._bump_target_versions('feature', self.ids)
+        return result
+    
+    def unlink(self):
+        self.env['membership.entitlement']._bump_target_versions('feature', self.ids)
+        return super().unlink()
+
     # ==========================================
     # BUSINESS METHODS
     # ==========================================
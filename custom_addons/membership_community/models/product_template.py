@@ -281,6 +281,17 @@ class ProductTemplate(models.Model):
                 # Suggest adding seat quantity to name
                 pass
 
+    # ==========================================
+    # CRUD OVERRIDES
+    # ==========================================
+    
+    def write(self, vals):
+        """Rebuild member entitlements when the features or benefits of a membership product change"""
+        result = super().write(vals)
+        if {'feature_ids', 'benefit_ids', 'is_membership_product'} & set(vals):
+            self.env['membership.entitlement']._refresh_products(self.ids)
+        return result
+
     # ==========================================
     # CONSTRAINTS
     # ==========================================
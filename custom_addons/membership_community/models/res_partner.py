@@ -1,10 +1,14 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
+from odoo.tools import split_every
+from collections import defaultdict
 import logging
 
 _logger = logging.getLogger(__name__)
 
+PORTAL_ACCESS_LEVELS = ['none', 'basic', 'standard', 'premium']
+
 
 class ResPartner(models.Model):
     """
@@ -25,14 +29,14 @@ class ResPartner(models.Model):
     
     is_member = fields.Boolean(
         string='Is Member',
-        compute='_compute_is_member',
+        compute='_compute_membership_snapshot',
         store=True,
         help='Partner has at least one active membership'
     )
     
     member_since = fields.Date(
         string='Member Since',
-        compute='_compute_member_since',
+        compute='_compute_membership_snapshot',
         store=True,
         help='Date of first membership'
     )
@@ -43,7 +47,7 @@ class ResPartner(models.Model):
         ('trial', 'Trial'),
         ('expired', 'Expired'),
     ], string='Membership Status',
-       compute='_compute_membership_state',
+       compute='_compute_membership_snapshot',
        store=True,
        help='Current membership status')
 
@@ -95,7 +99,7 @@ class ResPartner(models.Model):
     
     is_lifetime_member = fields.Boolean(
         string='Lifetime Member',
-        compute='_compute_is_lifetime_member',
+        compute='_compute_membership_snapshot',
         store=True,
         help='Has a lifetime membership'
     )
@@ -109,9 +113,14 @@ class ResPartner(models.Model):
     
     eligible_chapters = fields.Many2many(
         'membership.category',
-        compute='_compute_eligible_chapters',
+        'partner_eligible_chapter_rel',
+        'partner_id',
+        'category_id',
         string='Eligible Chapters',
-        help='Chapters this member is eligible to join based on location'
+        readonly=True,
+        copy=False,
+        help='Chapters this member is eligible to join based on location, '
+             'matched from chapter territories'
     )
     
     chapter_memberships = fields.Many2many(
@@ -145,20 +154,22 @@ class ResPartner(models.Model):
     primary_membership_id = fields.Many2one(
         'subscription.subscription',
         string='Primary Membership',
-        compute='_compute_primary_membership',
+        compute='_compute_membership_snapshot',
         store=True,
         help='Current active primary membership'
     )
     
     membership_count = fields.Integer(
         string='Membership Count',
-        compute='_compute_membership_counts',
+        compute='_compute_membership_snapshot',
+        store=True,
         help='Total number of membership subscriptions'
     )
     
     active_membership_count = fields.Integer(
         string='Active Memberships',
-        compute='_compute_membership_counts',
+        compute='_compute_membership_snapshot',
+        store=True,
         help='Number of currently active memberships'
     )
 
@@ -236,13 +247,13 @@ class ResPartner(models.Model):
         ('standard', 'Standard'),
         ('premium', 'Premium'),
     ], string='Portal Access',
-       compute='_compute_portal_access',
+       compute='_compute_membership_snapshot',
        store=True,
        help='Current portal access level')
     
     has_portal_access = fields.Boolean(
         string='Has Portal Access',
-        compute='_compute_portal_access',
+        compute='_compute_membership_snapshot',
         store=True
     )
 
@@ -250,6 +261,21 @@ class ResPartner(models.Model):
     # FEATURES & BENEFITS - Available to member
     # ==========================================
     
+    entitlement_ids = fields.One2many(
+        'membership.entitlement',
+        'partner_id',
+        string='Entitlements',
+        readonly=True,
+        help='Materialized features and benefits with the subscription granting them'
+    )
+    
+    entitlement_version = fields.Integer(
+        string='Entitlement Version',
+        readonly=True,
+        copy=False,
+        help='Changes whenever the entitlements of the partner change, keys cached access checks'
+    )
+    
     available_features = fields.Many2many(
         'membership.feature',
         compute='_compute_available_features',
@@ -327,24 +353,63 @@ class ResPartner(models.Model):
     # ==========================================
 
     @api.depends('membership_subscription_ids', 'membership_subscription_ids.state',
-                 'seat_subscription_id', 'seat_subscription_id.state')
-    def _compute_is_member(self):
-        """Compute if partner is a member - includes seat memberships"""
+                 'membership_subscription_ids.date_start', 'membership_subscription_ids.is_lifetime',
+                 'membership_subscription_ids.plan_id.product_template_id.portal_access_level',
+                 'seat_subscription_id', 'seat_subscription_id.state',
+                 'seat_subscription_id.date_start', 'seat_subscription_id.is_lifetime',
+                 'seat_subscription_id.plan_id.product_template_id.portal_access_level')
+    def _compute_membership_snapshot(self):
+        """
+        Derive every subscription-based membership field in one pass
+        
+        The membership subscriptions of the whole batch are loaded with one
+        query; seat subscriptions count as memberships of their holder, direct
+        memberships take precedence as primary membership.
+        """
+        partner_ids = [partner._origin.id for partner in self if partner._origin.id]
+        direct_subs = defaultdict(lambda: self.env['subscription.subscription'])
+        if partner_ids:
+            for subscription in self.env['subscription.subscription'].search_fetch(
+                [('partner_id', 'in', partner_ids),
+                 ('plan_id.product_template_id.is_membership_product', '=', True)],
+                ['partner_id', 'state', 'date_start', 'is_lifetime', 'plan_id'],
+            ):
+                direct_subs[subscription.partner_id.id] |= subscription
+        
         for partner in self:
-            # Check direct memberships
-            has_direct = bool(
-                partner.membership_subscription_ids.filtered(
-                    lambda s: s.state in ['trial', 'active']
-                )
-            )
+            direct = direct_subs[partner._origin.id] if partner._origin.id else partner.membership_subscription_ids
+            seat = partner.seat_subscription_id
+            all_subs = direct | seat
+            running_direct = direct.filtered(lambda s: s.state in ('trial', 'active'))
+            running = all_subs.filtered(lambda s: s.state in ('trial', 'active'))
+            
+            partner.is_member = bool(running)
+            partner.member_since = min(all_subs.mapped('date_start'), default=False)
+            partner.membership_count = len(all_subs)
+            partner.active_membership_count = len(running)
+            
+            if running:
+                partner.membership_state = 'trial' if 'trial' in running.mapped('state') else 'active'
+            else:
+                partner.membership_state = 'expired' if 'expired' in all_subs.mapped('state') else 'none'
+            
+            # Direct memberships first, seat membership as fallback
+            if running_direct:
+                partner.primary_membership_id = running_direct.sorted('date_start', reverse=True)[:1]
+            elif seat.state in ('trial', 'active'):
+                partner.primary_membership_id = seat
+            else:
+                partner.primary_membership_id = False
             
-            # Check seat membership
-            has_seat = bool(
-                partner.seat_subscription_id and 
-                partner.seat_subscription_id.state in ['trial', 'active']
+            access_level = max(
+                running.mapped(lambda s: s.plan_id.product_template_id.portal_access_level or 'none'),
+                key=PORTAL_ACCESS_LEVELS.index,
+                default='none',
             )
+            partner.portal_access_level = access_level
+            partner.has_portal_access = access_level != 'none'
             
-            partner.is_member = has_direct or has_seat
+            partner.is_lifetime_member = bool(running_direct.filtered('is_lifetime')) or seat.is_lifetime
 
     @api.depends('seat_subscription_id')
     def _compute_is_seat_member(self):
@@ -352,85 +417,6 @@ class ResPartner(models.Model):
         for partner in self:
             partner.is_seat_member = bool(partner.seat_subscription_id)
 
-    @api.depends('membership_subscription_ids', 'membership_subscription_ids.date_start',
-                 'seat_subscription_id', 'seat_subscription_id.date_start')
-    def _compute_member_since(self):
-        """Find earliest membership start date - includes seat memberships"""
-        for partner in self:
-            dates = []
-            
-            # Direct memberships
-            if partner.membership_subscription_ids:
-                direct_dates = partner.membership_subscription_ids.filtered(
-                    lambda s: s.date_start
-                ).mapped('date_start')
-                dates.extend(direct_dates)
-            
-            # Seat membership
-            if partner.seat_subscription_id and partner.seat_subscription_id.date_start:
-                dates.append(partner.seat_subscription_id.date_start)
-            
-            partner.member_since = min(dates) if dates else False
-
-    @api.depends('membership_subscription_ids', 'membership_subscription_ids.state',
-                 'seat_subscription_id', 'seat_subscription_id.state')
-    def _compute_membership_state(self):
-        """Compute overall membership state - includes seat memberships"""
-        for partner in self:
-            # Check direct subscriptions
-            active_subs = partner.membership_subscription_ids.filtered(
-                lambda s: s.state in ['trial', 'active']
-            )
-            
-            # Check seat subscription
-            if partner.seat_subscription_id and partner.seat_subscription_id.state in ['trial', 'active']:
-                active_subs |= partner.seat_subscription_id
-            
-            if active_subs:
-                if any(s.state == 'trial' for s in active_subs):
-                    partner.membership_state = 'trial'
-                else:
-                    partner.membership_state = 'active'
-            else:
-                # Check for expired
-                all_subs = partner.membership_subscription_ids
-                if partner.seat_subscription_id:
-                    all_subs |= partner.seat_subscription_id
-                
-                expired = all_subs.filtered(lambda s: s.state == 'expired')
-                partner.membership_state = 'expired' if expired else 'none'
-
-    @api.depends('membership_subscription_ids', 'membership_subscription_ids.state',
-                 'seat_subscription_id', 'seat_subscription_id.state')
-    def _compute_primary_membership(self):
-        """Find current active primary membership - prioritizes direct over seat"""
-        for partner in self:
-            # First, try direct memberships
-            primary = partner.membership_subscription_ids.filtered(
-                lambda s: s.state in ['trial', 'active']
-            ).sorted(lambda s: s.date_start, reverse=True)
-            
-            if primary:
-                partner.primary_membership_id = primary[:1]
-            elif partner.seat_subscription_id and partner.seat_subscription_id.state in ['trial', 'active']:
-                # Fall back to seat subscription if no direct membership
-                partner.primary_membership_id = partner.seat_subscription_id
-            else:
-                partner.primary_membership_id = False
-
-    @api.depends('membership_subscription_ids', 'seat_subscription_id')
-    def _compute_membership_counts(self):
-        """Count total and active memberships - includes seat"""
-        for partner in self:
-            all_subs = partner.membership_subscription_ids
-            if partner.seat_subscription_id:
-                all_subs |= partner.seat_subscription_id
-            
-            partner.membership_count = len(all_subs)
-            partner.active_membership_count = len(
-                all_subs.filtered(lambda s: s.state in ['trial', 'active'])
-            )
-
     @api.depends('primary_membership_id', 'primary_membership_id.membership_category_id',
                  'seat_subscription_id', 'seat_subscription_id.membership_category_id')
     def _compute_membership_category(self):
@@ -473,85 +459,32 @@ class ResPartner(models.Model):
             else:
                 partner.days_until_expiry = 0
 
-    @api.depends('membership_subscription_ids', 
-                 'membership_subscription_ids.plan_id.product_template_id.portal_access_level',
-                 'seat_subscription_id',
-                 'seat_subscription_id.plan_id.product_template_id.portal_access_level')
-    def _compute_portal_access(self):
-        """Compute portal access level - includes seat subscriptions"""
-        levels = ['none', 'basic', 'standard', 'premium']
-        
-        for partner in self:
-            active_subs = partner.membership_subscription_ids.filtered(
-                lambda s: s.state in ['trial', 'active']
-            )
-            
-            # Add seat subscription if active
-            if partner.seat_subscription_id and partner.seat_subscription_id.state in ['trial', 'active']:
-                active_subs |= partner.seat_subscription_id
-            
-            if not active_subs:
-                partner.portal_access_level = 'none'
-                partner.has_portal_access = False
-            else:
-                access_levels = active_subs.mapped(
-                    'plan_id.product_template_id.portal_access_level'
-                )
-                max_level = max(
-                    access_levels, 
-                    key=lambda x: levels.index(x) if x in levels else 0
-                )
-                partner.portal_access_level = max_level
-                partner.has_portal_access = max_level != 'none'
-
-    @api.depends('membership_subscription_ids', 
-                 'membership_subscription_ids.plan_id.product_template_id.feature_ids',
-                 'seat_subscription_id',
-                 'seat_subscription_id.plan_id.product_template_id.feature_ids')
+    @api.depends('entitlement_ids')
     def _compute_available_features(self):
-        """Get all features from active subscriptions - includes seat subscriptions"""
+        """Get all features from the materialized entitlements - includes seat subscriptions"""
+        features_by_partner = self._get_entitlement_map('feature')
         for partner in self:
-            active_subs = partner.membership_subscription_ids.filtered(
-                lambda s: s.state in ['trial', 'active']
-            )
-            
-            # Add seat subscription if active
-            if partner.seat_subscription_id and partner.seat_subscription_id.state in ['trial', 'active']:
-                active_subs |= partner.seat_subscription_id
-            
-            features = active_subs.mapped('plan_id.product_template_id.feature_ids')
-            partner.available_features = features
+            partner.available_features = [(6, 0, features_by_partner.get(partner._origin.id, []))]
 
-    @api.depends('membership_subscription_ids', 
-                 'membership_subscription_ids.plan_id.product_template_id.benefit_ids',
-                 'seat_subscription_id',
-                 'seat_subscription_id.plan_id.product_template_id.benefit_ids',
-                 'parent_organization_id',
-                 'parent_organization_id.membership_subscription_ids',
-                 'parent_organization_id.membership_subscription_ids.plan_id.product_template_id.benefit_ids')
+    @api.depends('entitlement_ids')
     def _compute_available_benefits(self):
-        """Get all benefits from active subscriptions - includes seat subscriptions and parent org"""
+        """Get all benefits from the materialized entitlements - includes seat subscriptions and parent org"""
+        benefits_by_partner = self._get_entitlement_map('benefit')
         for partner in self:
-            benefits = self.env['membership.benefit']
-            
-            # Direct subscriptions
-            active_subs = partner.membership_subscription_ids.filtered(
-                lambda s: s.state in ['trial', 'active']
-            )
-            benefits |= active_subs.mapped('plan_id.product_template_id.benefit_ids')
-            
-            # Seat subscription
-            if partner.seat_subscription_id and partner.seat_subscription_id.state in ['trial', 'active']:
-                benefits |= partner.seat_subscription_id.plan_id.product_template_id.benefit_ids
-            
-            # Inherit from parent organization if seat member
-            if partner.parent_organization_id and partner.is_seat_member:
-                parent_subs = partner.parent_organization_id.membership_subscription_ids.filtered(
-                    lambda s: s.state in ['trial', 'active']
-                )
-                benefits |= parent_subs.mapped('plan_id.product_template_id.benefit_ids')
-            
-            partner.available_benefits = benefits
+            partner.available_benefits = [(6, 0, benefits_by_partner.get(partner._origin.id, []))]
+
+    def _get_entitlement_map(self, entitlement_type):
+        """Map each partner id to its feature or benefit ids with one query"""
+        partner_ids = [partner_id for partner_id in self._origin.ids if partner_id]
+        if not partner_ids:
+            return {}
+        target = 'feature_id' if entitlement_type == 'feature' else 'benefit_id'
+        groups = self.env['membership.entitlement'].sudo()._read_group(
+            [('partner_id', 'in', partner_ids), ('entitlement_type', '=', entitlement_type),
+             (f'{target}.active', '=', True)],
+            ['partner_id'], [f'{target}:array_agg'],
+        )
+        return {partner.id: list(set(target_ids)) for partner, target_ids in groups}
 
     @api.depends('primary_membership_id', 'primary_membership_id.paid_through_date',
                  'primary_membership_id.grace_period_end_date',
@@ -607,58 +540,26 @@ class ResPartner(models.Model):
             else:
                 partner.years_of_membership = 0.0
     
-    @api.depends('age', 'years_of_membership', 'membership_category_id')
+    @api.depends('birthdate', 'member_since', 'membership_category_id')
     def _compute_emeritus_eligible(self):
         """Check if eligible for emeritus based on current category rules"""
+        today = fields.Date.today()
+        Category = self.env['membership.category']
+        cutoffs = [
+            Category._get_emeritus_cutoffs(age, years, today)
+            for category_id, age, years, requires_approval in Category._get_emeritus_rules()
+        ]
         for partner in self:
-            partner.is_emeritus_eligible = False
-            
-            if not partner.membership_category_id:
-                continue
-            
-            # Find emeritus categories
-            emeritus_categories = self.env['membership.category'].search([
-                ('is_emeritus_category', '=', True),
-                ('active', '=', True),
-            ])
-            
-            for category in emeritus_categories:
-                is_eligible, reason = category.check_emeritus_eligibility(partner)
-                if is_eligible:
-                    partner.is_emeritus_eligible = True
-                    break
-    
-    @api.depends('membership_subscription_ids', 'membership_subscription_ids.is_lifetime',
-                 'seat_subscription_id', 'seat_subscription_id.is_lifetime')
-    def _compute_is_lifetime_member(self):
-        """Check if member has any lifetime subscriptions"""
-        for partner in self:
-            has_lifetime = bool(
-                partner.membership_subscription_ids.filtered(
-                    lambda s: s.is_lifetime and s.state in ['active', 'trial']
-                )
+            partner.is_emeritus_eligible = bool(partner.membership_category_id) and any(
+                (not birthdate_cutoff or (partner.birthdate and partner.birthdate <= birthdate_cutoff))
+                and (not member_since_cutoff or (partner.member_since and partner.member_since <= member_since_cutoff))
+                for birthdate_cutoff, member_since_cutoff in cutoffs
             )
-            
-            if not has_lifetime and partner.seat_subscription_id:
-                has_lifetime = partner.seat_subscription_id.is_lifetime
-            
-            partner.is_lifetime_member = has_lifetime
-
+    
     # ==========================================
     # COMPUTE METHODS - GEOGRAPHIC/CHAPTERS
     # ==========================================
     
-    @api.depends('country_id', 'state_id', 'zip')
-    def _compute_eligible_chapters(self):
-        """
-        Compute which chapters this member is eligible for based on location
-        Override in membership_chapter for actual geographic matching logic
-        """
-        for partner in self:
-            # Base implementation: no geographic matching
-            # membership_chapter module will override this
-            partner.eligible_chapters = self.env['membership.category']
-    
     @api.depends('membership_subscription_ids', 
                  'membership_subscription_ids.membership_category_id',
                  'membership_subscription_ids.membership_category_id.category_type')
@@ -671,6 +572,124 @@ class ResPartner(models.Model):
             )
             partner.chapter_count = len(chapter_subs)
 
+    # ==========================================
+    # MEMBERSHIP SNAPSHOT - BULK RECOMPUTE
+    # ==========================================
+
+    @api.model
+    def _recompute_membership_snapshots(self):
+        """
+        Recompute the membership snapshot of every partner with one UPDATE
+        
+        Meant for migrations and data repairs, e.g. from an Odoo shell:
+        env['res.partner']._recompute_membership_snapshots()
+        Only partners whose snapshot changed are written; the fields derived
+        from the primary membership are then recomputed for them in chunks.
+        """
+        self.env['subscription.subscription'].flush_model()
+        self.flush_model()
+        self.env.cr.execute("""
+            WITH member_subscription AS (
+                SELECT s.partner_id, s.id, s.state, s.date_start, s.is_lifetime,
+                       COALESCE(pt.portal_access_level, 'none') AS access_level, FALSE AS is_seat
+                  FROM subscription_subscription s
+                  JOIN subscription_plan pl ON pl.id = s.plan_id
+                  JOIN product_template pt ON pt.id = pl.product_template_id
+                 WHERE pt.is_membership_product
+                 UNION ALL
+                SELECT p.id, s.id, s.state, s.date_start, s.is_lifetime,
+                       COALESCE(pt.portal_access_level, 'none'), TRUE
+                  FROM res_partner p
+                  JOIN subscription_subscription s ON s.id = p.seat_subscription_id
+                  JOIN subscription_plan pl ON pl.id = s.plan_id
+                  LEFT JOIN product_template pt ON pt.id = pl.product_template_id
+            ),
+            snapshot AS (
+                SELECT p.id,
+                       COUNT(DISTINCT ms.id) FILTER (WHERE ms.state IN ('trial', 'active')) > 0 AS is_member,
+                       MIN(ms.date_start) AS member_since,
+                       COUNT(DISTINCT ms.id) AS membership_count,
+                       COUNT(DISTINCT ms.id) FILTER (WHERE ms.state IN ('trial', 'active')) AS active_membership_count,
+                       CASE WHEN bool_or(ms.state = 'trial') THEN 'trial'
+                            WHEN bool_or(ms.state = 'active') THEN 'active'
+                            WHEN bool_or(ms.state = 'expired') THEN 'expired'
+                            ELSE 'none' END AS membership_state,
+                       COALESCE(
+                           (array_agg(ms.id ORDER BY ms.date_start DESC, ms.id DESC)
+                                FILTER (WHERE NOT ms.is_seat AND ms.state IN ('trial', 'active')))[1],
+                           (array_agg(ms.id) FILTER (WHERE ms.is_seat AND ms.state IN ('trial', 'active')))[1]
+                       ) AS primary_membership_id,
+                       COALESCE(MAX(CASE ms.access_level WHEN 'basic' THEN 1 WHEN 'standard' THEN 2
+                                                         WHEN 'premium' THEN 3 ELSE 0 END)
+                                    FILTER (WHERE ms.state IN ('trial', 'active')), 0) AS access_rank,
+                       COALESCE(bool_or(ms.is_lifetime AND NOT ms.is_seat AND ms.state IN ('trial', 'active'))
+                                OR bool_or(ms.is_lifetime AND ms.is_seat), FALSE) AS is_lifetime_member
+                  FROM res_partner p
+                  LEFT JOIN member_subscription ms ON ms.partner_id = p.id
+                 GROUP BY p.id
+            )
+            UPDATE res_partner p
+               SET is_member = sn.is_member,
+                   member_since = sn.member_since,
+                   membership_count = sn.membership_count,
+                   active_membership_count = sn.active_membership_count,
+                   membership_state = sn.membership_state,
+                   primary_membership_id = sn.primary_membership_id,
+                   portal_access_level = (ARRAY['none', 'basic', 'standard', 'premium'])[sn.access_rank + 1],
+                   has_portal_access = sn.access_rank > 0,
+                   is_lifetime_member = sn.is_lifetime_member
+              FROM snapshot sn
+             WHERE p.id = sn.id
+               AND (p.is_member IS DISTINCT FROM sn.is_member
+                    OR p.member_since IS DISTINCT FROM sn.member_since
+                    OR p.membership_count IS DISTINCT FROM sn.membership_count
+                    OR p.active_membership_count IS DISTINCT FROM sn.active_membership_count
+                    OR p.membership_state IS DISTINCT FROM sn.membership_state
+                    OR p.primary_membership_id IS DISTINCT FROM sn.primary_membership_id
+                    OR p.portal_access_level IS DISTINCT FROM (ARRAY['none', 'basic', 'standard', 'premium'])[sn.access_rank + 1]
+                    OR p.has_portal_access IS DISTINCT FROM (sn.access_rank > 0)
+                    OR p.is_lifetime_member IS DISTINCT FROM sn.is_lifetime_member)
+         RETURNING p.id
+        """)
+        partner_ids = [row[0] for row in self.env.cr.fetchall()]
+        self.invalidate_model()
+        
+        # Category, dates and lifecycle follow the primary membership
+        for chunk_ids in split_every(10000, partner_ids):
+            partners = self.browse(chunk_ids)
+            partners.modified([
+                'is_member', 'member_since', 'membership_count', 'active_membership_count',
+                'membership_state', 'primary_membership_id', 'portal_access_level',
+                'has_portal_access', 'is_lifetime_member',
+            ])
+            partners.flush_recordset()
+            self.env.invalidate_all()
+        
+        _logger.info(f"Recomputed membership snapshot of {len(partner_ids)} partners")
+        return len(partner_ids)
+
+    # ==========================================
+    # CRUD OVERRIDES
+    # ==========================================
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Match new partners to chapter territories"""
+        partners = super().create(vals_list)
+        self.env['membership.chapter.territory']._rematch_partners(
+            partners.filtered('country_id').ids
+        )
+        return partners
+
+    def write(self, vals):
+        """Rebuild entitlements and chapter matches when the inputs change"""
+        result = super().write(vals)
+        if 'seat_subscription_id' in vals or 'parent_organization_id' in vals:
+            self.env['membership.entitlement']._refresh_partners(self.ids)
+        if {'country_id', 'state_id', 'zip', 'active'} & set(vals):
+            self.env['membership.chapter.territory']._rematch_partners(self.ids)
+        return result
+
     # ==========================================
     # ACTIONS - Basic
     # ==========================================
@@ -732,7 +751,7 @@ class ResPartner(models.Model):
             'name': _('Eligible Chapters'),
             'res_model': 'membership.category',
             'view_mode': 'list,form',
-            'domain': [('id', 'in', self.eligible_chapters.ids)],
+            'domain': [('eligible_partner_ids', 'in', self.id)],
             'context': {'default_category_type': 'chapter'}
         }
 
@@ -790,15 +809,34 @@ class ResPartner(models.Model):
         """Complete the transition to emeritus"""
         self.ensure_one()
         
-        old_category = self.membership_category_id
+        self._complete_emeritus_transitions(emeritus_category)
         
-        # Update member category
-        self.membership_category_id = emeritus_category
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Success'),
+                'message': _('Member successfully transitioned to emeritus status'),
+                'type': 'success',
+            }
+        }
+    
+    def _complete_emeritus_transitions(self, emeritus_category):
+        """
+        Move several members to an emeritus category at once
         
-        # Update active subscriptions to emeritus plan
-        active_subs = self.membership_subscription_ids.filtered(
-            lambda s: s.state in ['active', 'trial']
-        )
+        Partners are written in one go, their running memberships are moved to
+        the emeritus plan with one write and chatter notes are logged in batch.
+        """
+        if not self:
+            return
+        
+        old_category_names = {
+            partner.id: partner.membership_category_id.name or 'Unknown' for partner in self
+        }
+        
+        # Update member category
+        self.write({'membership_category_id': emeritus_category.id})
         
         # Find emeritus product/plan
         emeritus_product = emeritus_category.default_product_id
@@ -809,30 +847,24 @@ class ResPartner(models.Model):
             ], limit=1)
             
             if emeritus_plan:
-                for subscription in active_subs:
-                    subscription.plan_id = emeritus_plan
-                    subscription.message_post(
-                        body=_('Subscription updated to emeritus plan'),
-                        message_type='notification'
+                # Update active subscriptions to emeritus plan
+                active_subs = self.env['subscription.subscription'].search([
+                    ('partner_id', 'in', self.ids),
+                    ('plan_id.product_template_id.is_membership_product', '=', True),
+                    ('state', 'in', ['active', 'trial']),
+                ])
+                if active_subs:
+                    active_subs.write({'plan_id': emeritus_plan.id})
+                    active_subs._message_log_batch(
+                        bodies=dict.fromkeys(active_subs.ids, _('Subscription updated to emeritus plan'))
                     )
         
-        self.message_post(
-            body=_('Member transitioned from %s to %s (Emeritus)') % (
-                old_category.name if old_category else 'Unknown',
-                emeritus_category.name
-            ),
-            message_type='notification'
-        )
-        
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'display_notification',
-            'params': {
-                'title': _('Success'),
-                'message': _('Member successfully transitioned to emeritus status'),
-                'type': 'success',
-            }
-        }
+        self._message_log_batch(bodies={
+            partner.id: _('Member transitioned from %s to %s (Emeritus)') % (
+                old_category_names[partner.id], emeritus_category.name
+            )
+            for partner in self
+        })
     
     # ==========================================
     # CRON METHOD - AUTO EMERITUS TRANSITION (NEW)
@@ -861,23 +893,33 @@ class ResPartner(models.Model):
         transition_count = 0
         
         for category in emeritus_categories:
-            # Find eligible members not already in emeritus
-            eligible_members = self.search([
+            # Eligible members not already in emeritus, matched in SQL
+            eligible_ids = self.search([
                 ('is_member', '=', True),
                 ('membership_category_id', '!=', category.id),
                 ('membership_category_id.is_emeritus_category', '=', False),
-            ])
+            ] + category._get_emeritus_eligibility_domain()).ids
+            
+            for chunk_ids in split_every(500, eligible_ids):
+                members = self.browse(chunk_ids)
+                try:
+                    with self.env.cr.savepoint():
+                        members._complete_emeritus_transitions(category)
+                    transition_count += len(members)
+                except Exception as e:
+                    _logger.error(f"Failed to auto-transition {len(members)} members to {category.name}, "
+                                  f"retrying one by one: {e}")
+                    self.env.invalidate_all()
+                    for member in members:
+                        try:
+                            with self.env.cr.savepoint():
+                                member._complete_emeritus_transitions(category)
+                            transition_count += 1
+                        except Exception as member_error:
+                            _logger.error(f"Failed to auto-transition {member.name} to emeritus: {member_error}")
+                self.env['subscription.subscription']._cron_commit()
             
-            for member in eligible_members:
-                is_eligible, reason = category.check_emeritus_eligibility(member)
-                
-                if is_eligible:
-                    try:
-                        member._complete_emeritus_transition(category)
-                        transition_count += 1
-                        _logger.info(f"Auto-transitioned {member.name} to emeritus status")
-                    except Exception as e:
-                        _logger.error(f"Failed to auto-transition {member.name} to emeritus: {e}")
+            _logger.info(f"Found {len(eligible_ids)} members eligible for {category.name}")
         
         _logger.info(f"Emeritus auto-transition completed: {transition_count} members transitioned")
 
@@ -897,14 +939,7 @@ class ResPartner(models.Model):
         """
         self.ensure_one()
         
-        feature = self.env['membership.feature'].search([
-            ('code', '=', feature_code)
-        ], limit=1)
-        
-        if not feature:
-            return False
-        
-        return feature in self.available_features
+        return self.env['membership.entitlement'].sudo()._has_access(self.id, 'feature', feature_code)
 
     def check_benefit_access(self, benefit_code):
         """
@@ -918,11 +953,25 @@ class ResPartner(models.Model):
         """
         self.ensure_one()
         
-        benefit = self.env['membership.benefit'].search([
-            ('code', '=', benefit_code)
-        ], limit=1)
+        return self.env['membership.entitlement'].sudo()._has_access(self.id, 'benefit', benefit_code)
+
+    @api.model
+    def check_access_bulk(self, partners, codes, entitlement_type='feature'):
+        """
+        Check access of several partners to several features or benefits at once
         
-        if not benefit:
-            return False
+        Meant for portal pages and controllers that would otherwise call
+        check_feature_access/check_benefit_access many times per render.
         
-        return benefit in self.available_benefits
\ No newline at end of file
+        Args:
+            partners: res.partner recordset or list of partner ids
+            codes: list of feature or benefit codes
+            entitlement_type: 'feature' or 'benefit'
+        
+        Returns:
+            dict: {partner_id: {code: bool}}
+        """
+        partner_ids = partners.ids if isinstance(partners, models.BaseModel) else list(partners)
+        return self.env['membership.entitlement'].sudo()._get_access_matrix(
+            partner_ids, codes, entitlement_type
+        )
\ No newline at end of file
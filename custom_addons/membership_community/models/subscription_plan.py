@@ -48,25 +48,6 @@ class SubscriptionPlan(models.Model):
         compute='_compute_seat_statistics',
         help='Number of active seat subscriptions'
     )
-    
-    @api.depends('subscription_ids', 'subscription_ids.allocated_seat_count',
-                 'subscription_ids.child_subscription_ids')
-    def _compute_seat_statistics(self):
-        """Calculate seat allocation statistics"""
-        for plan in self:
-            if plan.supports_seats:
-                active_subs = plan.subscription_ids.filtered(
-                    lambda s: s.state in ('active', 'trial')
-                )
-                plan.total_allocated_seats = sum(active_subs.mapped('allocated_seat_count'))
-                
-                # Count all child subscriptions (seat subscriptions)
-                plan.active_seat_subscriptions = len(
-                    active_subs.mapped('child_subscription_ids')
-                )
-            else:
-                plan.total_allocated_seats = 0
-                plan.active_seat_subscriptions = 0
 
     # ==========================================
     # BUSINESS METHODS - ENHANCED
@@ -142,6 +123,19 @@ class SubscriptionPlan(models.Model):
             result.append((plan.id, name))
         return result
 
+    # ==========================================
+    # CRUD OVERRIDES
+    # ==========================================
+    
+    def write(self, vals):
+        """Rebuild member entitlements when a plan is moved to another product"""
+        result = super().write(vals)
+        if 'product_template_id' in vals:
+            self.env['membership.entitlement']._refresh_subscriptions(
+                self.env['subscription.subscription'].search([('plan_id', 'in', self.ids)]).ids
+            )
+        return result
+
     # ==========================================
     # CONSTRAINTS - MEMBERSHIP-SPECIFIC
     # ==========================================
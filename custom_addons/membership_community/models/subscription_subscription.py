@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError, UserError
+from collections import defaultdict
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -124,7 +125,8 @@ class SubscriptionSubscription(models.Model):
     # - parent_subscription_id, child_subscription_ids, is_seat_subscription
     # - seat_holder_id, max_seats, allocated_seat_count, available_seat_count
     # - seat_utilization
-    # - _compute_is_seat_subscription(), _compute_seat_counts(), _compute_seat_utilization()
+    # - _compute_is_seat_subscription(), _compute_available_seat_count(), _compute_seat_utilization()
+    # - _update_seat_counts() (stored seat counter maintenance)
     # ==========================================
 
     # ==========================================
@@ -309,6 +311,7 @@ class SubscriptionSubscription(models.Model):
                             vals['max_seats'] = plan.max_seats
         
         subscriptions = super().create(vals_list)
+        self.env['membership.entitlement']._refresh_subscriptions(subscriptions.ids)
         
         # Auto-assign primary subscriptions if needed
         for subscription in subscriptions:
@@ -319,7 +322,10 @@ class SubscriptionSubscription(models.Model):
 
     def write(self, vals):
         """Handle membership-specific updates"""
+        previous_partner_ids = self.partner_id.ids if 'partner_id' in vals else []
         result = super().write(vals)
+        if {'state', 'partner_id', 'plan_id'} & set(vals):
+            self.env['membership.entitlement']._refresh_subscriptions(self.ids, previous_partner_ids)
         
         # Auto-assign member numbers and join dates when activating
         for subscription in self:
@@ -439,6 +445,12 @@ class SubscriptionSubscription(models.Model):
 
     def _send_membership_welcome_email(self):
         """Send membership welcome email"""
+        self._send_membership_welcome_emails()
+
+    def _send_membership_welcome_emails(self):
+        """Queue the welcome emails of several subscriptions with one batch"""
+        if not self:
+            return
         send_welcome = self.env['ir.config_parameter'].sudo().get_param(
             'subscription.send_welcome_email', 'True'
         )
@@ -449,10 +461,115 @@ class SubscriptionSubscription(models.Model):
             )
             if template:
                 try:
-                    template.send_mail(self.id, force_send=False)
-                    _logger.info(f"Sent welcome email for membership {self.name}")
+                    template.send_mail_batch(self.ids, force_send=False)
+                    _logger.info(f"Queued welcome emails for {len(self)} subscriptions")
                 except Exception as e:
-                    _logger.error(f"Failed to send welcome email for {self.name}: {e}")
+                    _logger.error(f"Failed to queue welcome emails for {len(self)} subscriptions: {e}")
+
+    # ==========================================
+    # PAYMENT ACTIVATION PIPELINE
+    # ==========================================
+
+    def _activate_from_payment(self, notes=None):
+        """
+        Activate paid draft subscriptions collected from invoices or transactions
+        
+        The whole set is activated in bulk. If that fails, each subscription is
+        retried on its own so one bad record does not block the others.
+        
+        Args:
+            notes: optional {subscription_id: chatter note}
+        
+        Returns:
+            recordset: the activated subscriptions
+        """
+        subscriptions = self.filtered(lambda s: s.state == 'draft')
+        if not subscriptions:
+            return subscriptions
+        
+        try:
+            with self.env.cr.savepoint():
+                return subscriptions._activate_paid_subscriptions(notes)
+        except Exception as e:
+            _logger.error(f"Bulk activation of {len(subscriptions)} subscriptions failed, retrying one by one: {e}")
+        
+        activated = self.browse()
+        for subscription in subscriptions:
+            try:
+                with self.env.cr.savepoint():
+                    activated |= subscription._activate_paid_subscriptions(notes)
+            except Exception as e:
+                _logger.error(f"Failed to activate subscription {subscription.name}: {e}")
+                subscription.message_post(
+                    body=_("⚠️ Automatic activation failed: %s. Please activate manually.") % e,
+                    message_type='notification'
+                )
+        return activated
+
+    def _activate_paid_subscriptions(self, notes=None):
+        """
+        Move draft subscriptions to trial or active in bulk
+        
+        Memberships failing the primary membership requirement are skipped and
+        flagged in their chatter. Member numbers and join dates are set first,
+        then each target state is one write, and welcome emails are queued in
+        one batch. Same outcome as action_start_trial/action_activate per record.
+        
+        Returns:
+            recordset: the activated subscriptions
+        """
+        subscriptions = self
+        
+        rejected = {}
+        for subscription in subscriptions.filtered('is_membership'):
+            is_valid, error_msg = subscription._check_primary_membership_requirement()
+            if not is_valid:
+                rejected[subscription.id] = _("⚠️ Automatic activation failed: %s. Please activate manually.") % error_msg
+        if rejected:
+            rejected_subs = self.browse(list(rejected))
+            rejected_subs._message_log_batch(bodies=rejected)
+            _logger.warning(f"Skipped activation of {len(rejected_subs)} memberships missing a primary membership")
+            subscriptions -= rejected_subs
+        
+        if not subscriptions:
+            return subscriptions
+        
+        # Member numbers and join dates first, so the state writes find them set
+        memberships = subscriptions.filtered('is_membership')
+        for partner in memberships.partner_id.filtered(lambda p: not p.member_number):
+            partner.member_number = self.env['ir.sequence'].next_by_code('member.number')
+        
+        today = fields.Date.today()
+        subs_by_join_date = defaultdict(lambda: self.browse())
+        for subscription in memberships.filtered(lambda s: not s.join_date):
+            subs_by_join_date[subscription.date_start or today] |= subscription
+        for join_date, subs in subs_by_join_date.items():
+            subs.write({'join_date': join_date})
+        
+        trial_subs = subscriptions.filtered(lambda s: s.plan_id.trial_period > 0)
+        active_subs = subscriptions - trial_subs
+        if trial_subs:
+            trial_subs.write({'state': 'trial'})
+        if active_subs:
+            active_subs.write({
+                'state': 'active',
+                'dunning_level': 'none',
+                'payment_retry_count': 0,
+            })
+        
+        for subscription in trial_subs | active_subs.filtered(lambda s: not s.last_invoice_date):
+            subscription._create_initial_invoice()
+        
+        noted_subs = subscriptions.filtered(lambda s: s.id in (notes or {}))
+        if noted_subs:
+            noted_subs._message_log_batch(bodies={
+                subscription.id: notes[subscription.id] for subscription in noted_subs
+            })
+        
+        subscriptions._send_membership_welcome_emails()
+        
+        _logger.info(f"Activated {len(active_subs)} subscriptions and started {len(trial_subs)} trials after payment")
+        return subscriptions
 
     # ==========================================
     # ORGANIZATIONAL MEMBERSHIP - SEAT METHODS
@@ -469,54 +586,111 @@ class SubscriptionSubscription(models.Model):
             subscription.subscription: The created seat subscription
         """
         self.ensure_one()
+        return self._allocate_seats(self.env['res.partner'].browse(employee_partner_id))
+    
+    def _allocate_seats(self, employees, organizational_role=False):
+        """
+        Allocate seats to several employees in one transaction
+        
+        Capacity is checked once against the seat counter with the
+        organization row locked, seat subscriptions are created with one
+        multi-create and the employees are linked with grouped writes, so
+        their membership fields are recomputed once for the whole batch.
+        
+        Args:
+            employees: res.partner recordset to assign seats to
+            organizational_role: role written on the employees, if any
+            
+        Returns:
+            subscription.subscription: The created seat subscriptions
+        """
+        self.ensure_one()
         
         if not self.plan_id.supports_seats:
             raise UserError(_("This subscription plan does not support multiple seats"))
         
-        if self.available_seat_count <= 0:
+        # Refresh the counter while holding the organization row lock
+        self._update_seat_counts(self.ids)
+        if len(employees) > self.available_seat_count:
+            if not self.available_seat_count:
+                raise UserError(_(
+                    "No available seats. Maximum seats: %s, Allocated: %s"
+                ) % (self.max_seats, self.allocated_seat_count))
             raise UserError(_(
-                "No available seats. Maximum seats: %s, Allocated: %s"
-            ) % (self.max_seats, self.allocated_seat_count))
-        
-        # Get employee
-        employee = self.env['res.partner'].browse(employee_partner_id)
-        
-        # Check if employee already has a seat
-        existing_seat = self.child_subscription_ids.filtered(
-            lambda s: s.seat_holder_id == employee
-        )
-        if existing_seat:
+                "Cannot allocate %s seats. Only %s seats available."
+            ) % (len(employees), self.available_seat_count))
+        
+        # Check if employees already have a seat
+        existing_seats = self.search([
+            ('parent_subscription_id', '=', self.id),
+            ('seat_holder_id', 'in', employees.ids),
+            ('state', 'not in', ('cancelled', 'expired')),
+        ])
+        if existing_seats:
             raise UserError(_(
                 "%s already has a seat subscription (%s)"
-            ) % (employee.name, existing_seat.name))
+            ) % (', '.join(existing_seats.seat_holder_id.mapped('name')), ', '.join(existing_seats.mapped('name'))))
+        
+        # Create seat subscriptions
+        seat_subs = self.env['subscription.subscription'].create([
+            self._prepare_seat_vals(employee) for employee in employees
+        ])
+        
+        # Link employees to organization
+        partner_vals = {'parent_organization_id': self.partner_id.id}
+        if organizational_role:
+            partner_vals['organizational_role'] = organizational_role
+        employees.write(partner_vals)
+        self._link_seat_holders(seat_subs)
+        
+        if len(seat_subs) == 1:
+            body = _("Seat allocated to %s") % seat_subs.seat_holder_id.name
+        else:
+            body = _("%s seats allocated") % len(seat_subs)
+        self.message_post(body=body, message_type='notification')
         
-        # Create seat subscription
-        seat_sub = self.env['subscription.subscription'].create({
-            'partner_id': employee_partner_id,
+        _logger.info(f"Allocated {len(seat_subs)} seats under {self.name}")
+        
+        return seat_subs
+    
+    def _prepare_seat_vals(self, employee):
+        """Values of the seat subscription of an employee under this organization"""
+        self.ensure_one()
+        return {
+            'partner_id': employee.id,
             'plan_id': self.plan_id.id,
             'parent_subscription_id': self.id,
-            'seat_holder_id': employee_partner_id,
+            'seat_holder_id': employee.id,
             'membership_category_id': self.membership_category_id.id,
             'date_start': self.date_start,
             'date_end': self.date_end,
             'state': 'active' if self.state == 'active' else 'draft',
             'price': 0.0,  # Seat price is covered by parent
-        })
-        
-        # Link employee to organization
-        employee.write({
-            'parent_organization_id': self.partner_id.id,
-            'seat_subscription_id': seat_sub.id,
-        })
-        
-        self.message_post(
-            body=_("Seat allocated to %s") % employee.name,
-            message_type='notification'
-        )
-        
-        _logger.info(f"Allocated seat {seat_sub.name} to {employee.name} under {self.name}")
-        
-        return seat_sub
+        }
+    
+    @api.model
+    def _link_seat_holders(self, seat_subs):
+        """Point each seat holder to their seat subscription with one UPDATE"""
+        holders = seat_subs.seat_holder_id
+        if not holders:
+            return
+        holders.flush_recordset(['seat_subscription_id'])
+        self.env.cr.execute("""
+            UPDATE res_partner p
+               SET seat_subscription_id = v.seat_id,
+                   write_uid = %s,
+                   write_date = NOW() AT TIME ZONE 'UTC'
+              FROM unnest(%s::int[], %s::int[]) AS v(partner_id, seat_id)
+             WHERE p.id = v.partner_id
+        """, (
+            self.env.uid,
+            [seat.seat_holder_id.id for seat in seat_subs if seat.seat_holder_id],
+            [seat.id for seat in seat_subs if seat.seat_holder_id],
+        ))
+        holders.invalidate_recordset(['seat_subscription_id', 'write_uid', 'write_date'])
+        # Membership fields depending on the seat are recomputed once, at the next flush
+        holders.modified(['seat_subscription_id'])
+        self.env['membership.entitlement']._refresh_partners(holders.ids)
     
     def action_deallocate_seat(self, seat_subscription_id):
         """
@@ -529,29 +703,50 @@ class SubscriptionSubscription(models.Model):
             bool: True if successful
         """
         self.ensure_one()
+        return self._deallocate_seats(self.env['subscription.subscription'].browse(seat_subscription_id))
+    
+    def _deallocate_seats(self, seat_subs, seat_action='cancel'):
+        """
+        Release several seats in one transaction
         
-        seat_sub = self.env['subscription.subscription'].browse(seat_subscription_id)
+        Seat holders are unlinked with one grouped write and the seat
+        subscriptions are cancelled (or expired) with one write.
         
-        if seat_sub.parent_subscription_id != self:
-            raise UserError(_("This seat does not belong to this subscription"))
+        Args:
+            seat_subs: seat subscriptions of this organization to release
+            seat_action: 'cancel' or 'expire'
+            
+        Returns:
+            bool: True if successful
+        """
+        self.ensure_one()
         
-        employee_name = seat_sub.seat_holder_id.name if seat_sub.seat_holder_id else 'Unknown'
+        if seat_subs.filtered(lambda s: s.parent_subscription_id != self):
+            raise UserError(_("This seat does not belong to this subscription"))
         
         # Remove seat holder link
-        if seat_sub.seat_holder_id:
-            seat_sub.seat_holder_id.write({
-                'seat_subscription_id': False,
-            })
+        seat_subs.seat_holder_id.write({
+            'seat_subscription_id': False,
+        })
         
-        # Cancel seat subscription
-        seat_sub.action_cancel()
+        # Cancel seat subscriptions
+        if seat_action == 'expire':
+            seat_subs.write({'state': 'expired'})
+        else:
+            seat_subs.filtered('is_lifetime').write({'state': 'cancelled'})
+            seat_subs.filtered(lambda s: not s.is_lifetime).write({
+                'state': 'cancelled',
+                'date_end': fields.Date.today(),
+            })
         
-        self.message_post(
-            body=_("Seat deallocated from %s") % employee_name,
-            message_type='notification'
-        )
+        if len(seat_subs) == 1:
+            employee_name = seat_subs.seat_holder_id.name if seat_subs.seat_holder_id else 'Unknown'
+            body = _("Seat deallocated from %s") % employee_name
+        else:
+            body = _("%s seats deallocated") % len(seat_subs)
+        self.message_post(body=body, message_type='notification')
         
-        _logger.info(f"Deallocated seat {seat_sub.name} from {employee_name}")
+        _logger.info(f"Deallocated {len(seat_subs)} seats from {self.name}")
         
         return True
     
@@ -643,12 +838,39 @@ class SubscriptionSubscription(models.Model):
         
         return result
 
+    def _after_lifecycle_transition(self, transition):
+        """Cascade set-based suspensions to child seats, as action_suspend does"""
+        result = super()._after_lifecycle_transition(transition)
+        
+        if transition == 'suspend':
+            children = self.child_subscription_ids.filtered(
+                lambda c: c.state in ('active', 'trial')
+            )
+            if children:
+                children.write({'state': 'suspended'})
+                children._message_log_batch(
+                    bodies={child.id: _("Suspended due to parent organization suspension") for child in children},
+                    message_type='notification',
+                )
+                _logger.info(f"Suspended {len(children)} child seats under {len(self)} organizations")
+        
+        return result
+
     # ==========================================
     # EMAIL TEMPLATE OVERRIDES
     # Override parent methods to use membership-specific templates
     # These methods are called by subscription_management cron jobs
     # ==========================================
     
+    def _get_lifecycle_email_template(self, transition):
+        """Use membership-specific templates for set-based lifecycle transitions"""
+        template_map = {
+            'grace': 'membership_community.email_template_grace_period',
+            'suspend': 'membership_community.email_template_suspended_from_grace',
+            'terminate': 'membership_community.email_template_terminated',
+        }
+        return self.env.ref(template_map[transition], raise_if_not_found=False)
+    
     def _send_grace_period_email(self):
         """Send membership-specific grace period notification"""
         template = self.env.ref(
@@ -738,15 +960,19 @@ class SubscriptionSubscription(models.Model):
                     "A subscription cannot be both a parent and a child (seat)"
                 ))
     
-    @api.constrains('max_seats', 'child_subscription_ids')
+    @api.constrains('max_seats', 'allocated_seat_count')
     def _check_seat_allocation_limit(self):
-        """Ensure we don't exceed max seats"""
+        """Ensure we don't exceed max seats
+        
+        Checked against the seat counter, which _update_seat_counts refreshes
+        while holding a lock on the parent row.
+        """
         for subscription in self:
             if subscription.max_seats > 0:
-                if len(subscription.child_subscription_ids) > subscription.max_seats:
+                if subscription.allocated_seat_count > subscription.max_seats:
                     raise ValidationError(_(
                         "Cannot allocate more than %s seats. Currently allocated: %s"
-                    ) % (subscription.max_seats, len(subscription.child_subscription_ids)))
+                    ) % (subscription.max_seats, subscription.allocated_seat_count))
     
     @api.constrains('primary_subscription_id', 'partner_id')
     def _check_primary_subscription_partner(self):
@@ -208,30 +208,17 @@ class SeatAllocationWizard(models.TransientModel):
                 'Cannot allocate %s seats. Only %s seats available.'
             ) % (len(employees), self.available_seat_count))
         
-        # Allocate seats
-        allocated_subscriptions = []
-        failed_allocations = []
+        # Allocate all seats in one batch
+        seat_subscriptions = self.subscription_id._allocate_seats(
+            employees, organizational_role=self.organizational_role
+        )
         
-        for employee in employees:
-            try:
-                seat_sub = self.subscription_id.action_allocate_seat(employee.id)
-                
-                # Set organizational role
-                if seat_sub:
-                    employee.write({
-                        'organizational_role': self.organizational_role,
-                    })
-                    allocated_subscriptions.append(seat_sub)
-                    
-                    # Send notification email
-                    if self.send_notification_email:
-                        self._send_seat_notification_email(employee, seat_sub)
-                        
-            except Exception as e:
-                failed_allocations.append((employee.name, str(e)))
+        # Queue notification emails
+        if self.send_notification_email:
+            self._send_seat_notification_emails(seat_subscriptions)
         
         # Prepare result message
-        return self._show_allocation_result(allocated_subscriptions, failed_allocations)
+        return self._show_allocation_result(seat_subscriptions, [])
     
     def _get_employees_to_allocate(self):
         """Get list of employees to allocate seats to"""
@@ -278,25 +265,21 @@ class SeatAllocationWizard(models.TransientModel):
                 'Please remove them from the selection or deallocate their existing seats first.'
             ) % '\n'.join(existing_seats))
     
-    def _send_seat_notification_email(self, employee, seat_subscription):
-        """Send notification email to employee"""
+    def _send_seat_notification_emails(self, seat_subscriptions):
+        """Queue the notification emails of the employees of these seats"""
         template = self.env.ref(
             'membership_community.email_template_seat_allocated',
             raise_if_not_found=False
         )
+        seat_subscriptions = seat_subscriptions.filtered(lambda s: s.seat_holder_id.email)
         
-        if template and employee.email:
+        if template and seat_subscriptions:
             try:
-                # Temporarily set context with employee
-                template.with_context(
-                    employee_id=employee.id,
-                    seat_subscription_id=seat_subscription.id,
-                    organization_id=self.partner_id.id
-                ).send_mail(seat_subscription.id, force_send=False)
+                template.send_mail_batch(seat_subscriptions.ids, force_send=False)
             except Exception as e:
                 # Don't fail allocation if email fails
                 self.subscription_id.message_post(
-                    body=_('Warning: Could not send notification email to %s: %s') % (employee.name, str(e)),
+                    body=_('Warning: Could not send notification emails to %s employees: %s') % (len(seat_subscriptions), str(e)),
                     message_type='comment'
                 )
     
@@ -307,8 +290,10 @@ class SeatAllocationWizard(models.TransientModel):
         if allocated_subscriptions:
             message += f'✅ Successfully allocated {len(allocated_subscriptions)} seat(s)!\n\n'
             message += 'Allocated to:\n'
-            for sub in allocated_subscriptions:
+            for sub in allocated_subscriptions[:20]:  # Show first 20
                 message += f'• {sub.seat_holder_id.name} ({sub.name})\n'
+            if len(allocated_subscriptions) > 20:
+                message += f'...and {len(allocated_subscriptions) - 20} more\n'
         
         if failed_allocations:
             message += f'\n❌ Failed to allocate {len(failed_allocations)} seat(s):\n'
@@ -221,35 +221,23 @@ class SeatDeallocationWizard(models.TransientModel):
         if not seat_subscriptions:
             raise UserError(_('No seat subscriptions selected for deallocation.'))
         
-        # Deallocate seats
-        deallocated_count = 0
-        failed_deallocations = []
+        # Queue notification emails before deallocation
+        if self.send_notification_email:
+            self._send_seat_deallocation_emails(seat_subscriptions)
         
-        for seat_sub in seat_subscriptions:
-            try:
-                seat_holder_name = seat_sub.seat_holder_id.name if seat_sub.seat_holder_id else 'Unknown'
-                
-                # Send notification email before deallocation
-                if self.send_notification_email and seat_sub.seat_holder_id:
-                    self._send_seat_deallocation_email(seat_sub.seat_holder_id, seat_sub)
-                
-                # Deallocate
-                self.subscription_id.action_deallocate_seat(seat_sub.id)
-                
-                # Log deallocation reason
-                if self.reason_notes:
-                    self.subscription_id.message_post(
-                        body=_('Seat deallocated from %s. Reason: %s') % (seat_holder_name, self.reason_notes),
-                        message_type='comment'
-                    )
-                
-                deallocated_count += 1
-                    
-            except Exception as e:
-                failed_deallocations.append((seat_holder_name, str(e)))
+        # Deallocate all seats in one batch
+        self.subscription_id._deallocate_seats(seat_subscriptions, seat_action=self.seat_action)
+        
+        # Log deallocation reason
+        if self.reason_notes:
+            holder_names = [sub.seat_holder_id.name or 'Unknown' for sub in seat_subscriptions]
+            self.subscription_id.message_post(
+                body=_('Seat deallocated from %s. Reason: %s') % (', '.join(holder_names), self.reason_notes),
+                message_type='comment'
+            )
         
         # Prepare result message
-        return self._show_deallocation_result(deallocated_count, failed_deallocations)
+        return self._show_deallocation_result(len(seat_subscriptions), [])
     
     def _get_seat_subscriptions_to_deallocate(self):
         """Get list of seat subscriptions to deallocate"""
@@ -279,27 +267,25 @@ class SeatDeallocationWizard(models.TransientModel):
                     'Seat subscription %s does not belong to organization subscription %s'
                 ) % (seat_sub.name, self.subscription_id.name))
     
-    def _send_seat_deallocation_email(self, employee, seat_subscription):
-        """Send notification email to employee"""
+    def _send_seat_deallocation_emails(self, seat_subscriptions):
+        """Queue the notification emails of the employees of these seats"""
         template = self.env.ref(
             'membership_community.email_template_seat_deallocated',
             raise_if_not_found=False
         )
+        seat_subscriptions = seat_subscriptions.filtered(lambda s: s.seat_holder_id.email)
         
-        if template and employee.email:
+        if template and seat_subscriptions:
             try:
-                # Temporarily set context with employee
                 template.with_context(
-                    employee_id=employee.id,
-                    seat_subscription_id=seat_subscription.id,
                     organization_id=self.partner_id.id,
                     reason=dict(self._fields['reason'].selection).get(self.reason, 'Other'),
                     reason_notes=self.reason_notes or ''
-                ).send_mail(seat_subscription.id, force_send=False)
+                ).send_mail_batch(seat_subscriptions.ids, force_send=False)
             except Exception as e:
                 # Don't fail deallocation if email fails
                 self.subscription_id.message_post(
-                    body=_('Warning: Could not send notification email to %s: %s') % (employee.name, str(e)),
+                    body=_('Warning: Could not send notification emails to %s employees: %s') % (len(seat_subscriptions), str(e)),
                     message_type='comment'
                 )
     
@@ -71,12 +71,16 @@ def uninstall_hook(env):
     
     # Disable cron jobs
     cron_jobs = [
+        'subscription_management.cron_subscription_lifecycle_dispatcher',
         'subscription_management.cron_subscription_billing',
         'subscription_management.cron_subscription_trial_expiry',
         'subscription_management.cron_subscription_expiry',
         'subscription_management.cron_subscription_auto_renew',
         'subscription_management.cron_subscription_billing_reminders',
         'subscription_management.cron_subscription_usage_update',
+        'subscription_management.cron_subscription_metrics_snapshot',
+        'subscription_management.cron_subscription_bulk_jobs',
+        'subscription_management.cron_subscription_payment_retry_queue',
     ]
     
     for cron_ref in cron_jobs:
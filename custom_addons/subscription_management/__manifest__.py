@@ -45,6 +45,10 @@ This module provides a complete subscription management system for Odoo Communit
         'views/subscription_subscription_views.xml',
         'views/subscription_line_views.xml',
         'views/subscription_usage_views.xml',
+        'views/subscription_billing_schedule_views.xml',
+        'views/subscription_metrics_snapshot_views.xml',
+        'views/subscription_bulk_job_views.xml',
+        'views/subscription_payment_retry_views.xml',
         'views/subscription_menus.xml',
         'views/product_template_views.xml',
         'views/res_partner_views.xml',
@@ -2,6 +2,7 @@
 
 from odoo import http
 from odoo.http import request
+import hmac
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -65,4 +66,55 @@ class SubscriptionWebsiteController(http.Controller):
             
         except Exception as e:
             _logger.error(f"Webhook error: {e}")
-            return {'error': 'Internal server error'}
\ No newline at end of file
+            return {'error': 'Internal server error'}
+
+    @http.route(['/subscription/webhook/usage/batch'], 
+                type='json', auth='none', csrf=False, website=True)
+    def subscription_usage_batch_webhook(self, events=None, idempotency_key=None, token=None, **kw):
+        """Bulk webhook endpoint: ingest many usage events in one call
+        
+        Payload: {"idempotency_key": "...", "events": [{"subscription_ref": "SUB00001",
+        "usage_type": "api_calls", "quantity": 10, "date": "2025-01-31"}, ...]}
+        
+        Replaying a batch with the same idempotency key is a no-op.
+        """
+        ICP = request.env['ir.config_parameter'].sudo()
+        
+        # Shared secret, the endpoint stays closed until one is configured
+        expected_token = ICP.get_param('subscription.usage_webhook_token')
+        if not expected_token or not isinstance(token, str) \
+                or not hmac.compare_digest(token.encode(), expected_token.encode()):
+            return {'error': 'Access denied'}
+        
+        if not isinstance(events, list) or not events:
+            return {'error': 'Missing required parameters'}
+        
+        max_events = int(ICP.get_param('subscription.usage_batch_max_events', '10000'))
+        if len(events) > max_events:
+            return {'error': f'Too many events in batch (maximum {max_events})'}
+        
+        try:
+            return request.env['subscription.usage'].sudo()._ingest_usage_batch(
+                events, idempotency_key=idempotency_key
+            )
+        except Exception as e:
+            _logger.error(f"Batch usage webhook error: {e}")
+            return {'error': 'Internal server error'}
+
+    @http.route(['/subscription/metrics'], type='json', auth='user')
+    def subscription_metrics(self, date_from=None, date_to=None, plan_ids=None, **kw):
+        """Pre-aggregated daily MRR/ARR/churn rows per plan and company for dashboards"""
+        if not request.env.user.has_group('subscription_management.group_subscription_manager'):
+            return {'error': 'Access denied'}
+        
+        try:
+            snapshots = request.env['subscription.metrics.snapshot']._get_metrics_data(
+                date_from=date_from,
+                date_to=date_to,
+                plan_ids=plan_ids,
+                company_ids=request.env.companies.ids,
+            )
+            return {'success': True, 'snapshots': snapshots}
+        except Exception as e:
+            _logger.error(f"Error reading subscription metrics: {e}")
+            return {'error': str(e)}
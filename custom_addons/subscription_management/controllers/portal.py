@@ -5,6 +5,7 @@ from odoo.exceptions import AccessError, MissingError
 from odoo.http import request
 from odoo.addons.portal.controllers.portal import CustomerPortal, pager as portal_pager
 from collections import OrderedDict
+from urllib.parse import urlencode
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -12,6 +13,8 @@ _logger = logging.getLogger(__name__)
 
 class SubscriptionPortal(CustomerPortal):
 
+    _ACTIVE_SUBSCRIPTION_STATES = ('active', 'trial')
+
     def _prepare_home_portal_values(self, counters):
         """Add subscription count to portal home"""
         values = super()._prepare_home_portal_values(counters)
@@ -32,7 +35,7 @@ class SubscriptionPortal(CustomerPortal):
                 type='http', auth="user", website=True)
     def portal_my_subscriptions(self, page=1, date_begin=None, date_end=None, 
                                sortby=None, search=None, search_in='content', 
-                               filterby=None, **kw):
+                               filterby=None, tab=None, **kw):
         """Display user's subscriptions"""
         values = self._prepare_portal_layout_values()
         partner = request.env.user.partner_id
@@ -81,34 +84,34 @@ class SubscriptionPortal(CustomerPortal):
                 search_domain = [('plan_id.name', 'ilike', search)]
             domain += search_domain
 
-        # Count for pager
-        subscription_count = SubscriptionSudo.search_count(domain)
+        # Active/inactive counts from one grouped query
+        state_counts = dict(SubscriptionSudo._read_group(domain, ['state'], ['__count']))
+        tab_counts = {
+            'active': sum(count for state, count in state_counts.items() if state in self._ACTIVE_SUBSCRIPTION_STATES),
+            'inactive': sum(count for state, count in state_counts.items() if state not in self._ACTIVE_SUBSCRIPTION_STATES),
+        }
+        
+        # Only the selected tab is loaded; the other one is fetched when opened
+        if tab not in tab_counts:
+            tab = 'active' if tab_counts['active'] or not tab_counts['inactive'] else 'inactive'
+        tab_domain = [('state', 'in' if tab == 'active' else 'not in', list(self._ACTIVE_SUBSCRIPTION_STATES))]
         
         # Pager
+        pager_url_args = {'date_begin': date_begin, 'date_end': date_end, 'sortby': sortby, 
+                          'filterby': filterby, 'search_in': search_in, 'search': search}
         pager = portal_pager(
             url="/my/subscriptions",
-            url_args={'date_begin': date_begin, 'date_end': date_end, 'sortby': sortby, 
-                     'filterby': filterby, 'search_in': search_in, 'search': search},
-            total=subscription_count,
+            url_args=dict(pager_url_args, tab=tab),
+            total=tab_counts[tab],
             page=page,
             step=self._items_per_page
         )
 
-        # Content - Get all subscriptions and separate by status
-        all_subscriptions = SubscriptionSudo.search(domain, order=order)
-        
-        # Separate active and inactive subscriptions
-        active_subscriptions = all_subscriptions.filtered(
-            lambda s: s.state in ('active', 'trial')
+        # Content - fetch only the requested page of the selected tab
+        subscriptions = SubscriptionSudo.search(
+            domain + tab_domain, order=f'{order}, id desc',
+            limit=self._items_per_page, offset=pager['offset']
         )
-        inactive_subscriptions = all_subscriptions.filtered(
-            lambda s: s.state not in ('active', 'trial')
-        )
-        
-        # Apply pagination to combined results
-        start = pager['offset']
-        end = start + self._items_per_page
-        subscriptions = all_subscriptions[start:end]
         
         request.session['my_subscriptions_history'] = subscriptions.ids[:100]
 
@@ -116,8 +119,15 @@ class SubscriptionPortal(CustomerPortal):
             'date': date_begin,
             'date_end': date_end,
             'subscriptions': subscriptions,
-            'active_subscriptions': active_subscriptions,
-            'inactive_subscriptions': inactive_subscriptions,
+            'tab': tab,
+            'tab_urls': {
+                tab_name: '/my/subscriptions?' + urlencode({
+                    key: value for key, value in dict(pager_url_args, tab=tab_name).items() if value
+                })
+                for tab_name in tab_counts
+            },
+            'active_count': tab_counts['active'],
+            'inactive_count': tab_counts['inactive'],
             'page_name': 'subscription',
             'archive_groups': [],
             'default_url': '/my/subscriptions',
@@ -142,18 +152,41 @@ class SubscriptionPortal(CustomerPortal):
         except (AccessError, MissingError):
             return request.redirect('/my')
 
-        # Get recent usage records
-        usage_records = request.env['subscription.usage'].sudo().search([
+        # Get recent daily usage totals
+        usage_rollups = request.env['subscription.usage.rollup'].sudo().search([
             ('subscription_id', '=', subscription_id)
-        ], order='date desc', limit=10)
+        ], order='date desc, usage_type', limit=10)
 
         values = {
             'subscription': subscription_sudo,
-            'usage_records': usage_records,
+            'usage_rollups': usage_rollups,
+            'usage_charges': subscription_sudo._rate_usage().get(subscription_sudo.id, []),
             'page_name': 'subscription',
         }
         return request.render("subscription_management.portal_subscription_detail", values)
 
+    @http.route(['/my/subscriptions/<int:subscription_id>/usage/preview'], 
+                type='json', auth="public", website=True)
+    def portal_subscription_usage_preview(self, subscription_id, access_token=None, **kw):
+        """Preview the usage charges of the current period, rated as the next invoice would be"""
+        try:
+            subscription_sudo = self._document_check_access('subscription.subscription', 
+                                                          subscription_id, access_token)
+        except (AccessError, MissingError):
+            return {'error': 'Access denied'}
+        
+        charges = subscription_sudo._rate_usage().get(subscription_sudo.id, [])
+        return {
+            'subscription': subscription_sudo.name,
+            'currency': subscription_sudo.currency_id.name,
+            'charges': [{
+                'name': charge['name'],
+                'quantity': charge['quantity'],
+                'amount': charge['quantity'] * charge['price_unit'],
+            } for charge in charges],
+            'total': sum(charge['quantity'] * charge['price_unit'] for charge in charges),
+        }
+
     @http.route(['/my/subscriptions/<int:subscription_id>/suspend'], 
                 type='http', auth="user", website=True, methods=['GET'])
     def portal_subscription_suspend(self, subscription_id, **kw):
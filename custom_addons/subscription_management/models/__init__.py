@@ -1,9 +1,19 @@
 # -*- coding: utf-8 -*-
 
 from . import subscription_plan
+from . import subscription_plan_usage_tier
 from . import subscription_subscription
 from . import subscription_line
 from . import subscription_usage
+from . import subscription_usage_idempotency
+from . import subscription_usage_rollup
+from . import subscription_reminder_log
+from . import subscription_billing_schedule
+from . import subscription_metrics_contribution
+from . import subscription_metrics_snapshot
+from . import subscription_bulk_job
+from . import subscription_payment_retry
+from . import subscription_benchmark
 from . import subscription_tag
 from . import account_move
 from . import product_template
@@ -61,4 +61,50 @@ class ResConfigSettings(models.TransientModel):
         default=True,
         config_parameter='subscription.suspend_send_email',
         help='Automatically send email when subscription is suspended'
-    )
\ No newline at end of file
+    )
+    
+    # Billing
+    subscription_billing_batch_mode = fields.Boolean(
+        string='Batch Billing',
+        default=False,
+        config_parameter='subscription.billing_batch_mode',
+        help='Invoice due subscriptions in chunks: one multi-create and bulk post per chunk, '
+             'committed with a resume checkpoint. Invoice emails are queued.'
+    )
+    
+    subscription_billing_batch_size = fields.Integer(
+        string='Billing Batch Size',
+        default=500,
+        config_parameter='subscription.billing_batch_size',
+        help='Number of subscriptions invoiced per chunk in batch billing mode'
+    )
+    
+    # Payment Retries
+    subscription_payment_retry_adapter = fields.Selection([
+        ('stub', 'Stub (testing, no payment made)'),
+        ('payment_token', 'Saved Payment Method'),
+    ], string='Payment Retry Adapter',
+       config_parameter='subscription.payment_retry_adapter',
+       help='How queued payment retries are charged. Leave empty to only track the queue.')
+    
+    subscription_payment_retry_batch_size = fields.Integer(
+        string='Retries per Batch',
+        default=50,
+        config_parameter='subscription.payment_retry_batch_size',
+        help='Number of payment retries charged together before committing'
+    )
+    
+    subscription_payment_retry_base_hours = fields.Integer(
+        string='First Retry Delay (Hours)',
+        default=24,
+        config_parameter='subscription.payment_retry_base_hours',
+        help='Delay before the first retry; it doubles after each failed attempt'
+    )
+    
+    def set_values(self):
+        """Reschedule grace reminders when their frequency changes"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        previous_frequency = ICP.get_param('subscription.grace_email_frequency', 'weekly')
+        super().set_values()
+        if ICP.get_param('subscription.grace_email_frequency', 'weekly') != previous_frequency:
+            self.env['subscription.subscription']._recompute_grace_reminders()
@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+from odoo.tools import split_every
+from datetime import timedelta
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+_logger = logging.getLogger(__name__)
+
+BENCHMARK_SCALES = (1000, 10000, 100000)
+
+# Share of generated subscriptions per state
+SUBSCRIPTION_STATE_WEIGHTS = [
+    ('active', 60),
+    ('trial', 10),
+    ('suspended', 10),
+    ('cancelled', 10),
+    ('expired', 5),
+    ('draft', 5),
+]
+
+USAGE_TYPES = ('api_calls', 'emails', 'storage')
+
+
+class SubscriptionBenchmark(models.AbstractModel):
+    """
+    Load benchmark of the subscription lifecycle
+    
+    Generates a reproducible synthetic dataset (partners, plans, subscriptions
+    in every state, usage and invoices) and times the subscription crons, the
+    portal list queries, usage ingestion and billing on it, recording wall
+    time, SQL query count and peak Python memory of each step.
+    
+    Meant for a disposable database, from an Odoo shell:
+        
+        env['subscription.benchmark']._run_benchmarks(scales=[1000, 10000])
+    
+    Every step runs in a savepoint that is rolled back afterwards, so all
+    steps see the same dataset; the dataset itself is rolled back after each
+    scale unless keep_data is set.
+    """
+    _name = 'subscription.benchmark'
+    _description = 'Subscription Benchmark'
+    
+    # ==========================================
+    # SYNTHETIC DATA
+    # ==========================================
+    
+    @api.model
+    def _generate_synthetic_data(self, scale, seed=42, usage_per_subscription=5, invoice_ratio=0.5):
+        """
+        Create a synthetic dataset of `scale` subscriptions
+        
+        The same scale and seed always produce the same dataset. Partners
+        hold four subscriptions each, on distinct plans.
+        
+        Returns:
+            dict: ids of the generated partners, plans and subscriptions,
+                and the number of usage records and invoices
+        """
+        rng = random.Random(seed)
+        today = fields.Date.today()
+        tag = f"BENCH-{seed}-{scale}"
+        env = self.with_context(
+            tracking_disable=True, mail_create_nolog=True, mail_notrack=True,
+            subscription_benchmark=True,
+        ).env
+        
+        product = env['product.template'].create({
+            'name': f"{tag} Subscription",
+            'type': 'service',
+            'is_subscription': True,
+        })
+        plan_vals_list = []
+        for index, billing_period in enumerate(['monthly', 'monthly', 'quarterly', 'yearly'] * 2):
+            plan_vals = {
+                'name': f"{tag} Plan {index}",
+                'code': f"{tag}-{index}",
+                'price': rng.choice([9.0, 19.0, 49.0, 99.0, 199.0]),
+                'billing_period': billing_period,
+                'trial_period': 14 if index % 4 == 1 else 0,
+                'product_template_id': product.id,
+            }
+            if index % 2 == 0:
+                plan_vals.update({
+                    'usage_based': True,
+                    'usage_unit': 'units',
+                    'usage_price': 0.01,
+                    'included_usage': 1000,
+                    'usage_pricing': ['flat', 'tiered', 'volume', 'flat'][index // 2],
+                    'usage_tier_ids': [(0, 0, {'from_quantity': from_quantity, 'unit_price': unit_price})
+                                       for from_quantity, unit_price in ((0, 0.01), (1000, 0.008), (10000, 0.005))],
+                })
+            plan_vals_list.append(plan_vals)
+        plan_ids = env['subscription.plan'].create(plan_vals_list).ids
+        
+        partner_count = max(1, scale // 4)
+        partner_ids = []
+        for chunk in split_every(1000, range(partner_count)):
+            partner_ids += env['res.partner'].create([{
+                'name': f"{tag} Customer {index}",
+                'email': f"customer{index}@{tag.lower()}.example.com",
+            } for index in chunk]).ids
+            env.invalidate_all()
+        
+        states = [state for state, weight in SUBSCRIPTION_STATE_WEIGHTS]
+        weights = [weight for state, weight in SUBSCRIPTION_STATE_WEIGHTS]
+        subscription_ids = []
+        for chunk in split_every(500, range(scale)):
+            subscription_ids += env['subscription.subscription'].create([{
+                'partner_id': partner_ids[index % partner_count],
+                'plan_id': plan_ids[(index % partner_count + index // partner_count) % len(plan_ids)],
+                'state': rng.choices(states, weights)[0],
+                'date_start': today - timedelta(days=rng.randint(0, 400)),
+            } for index in chunk]).ids
+            env.invalidate_all()
+        
+        Subscription = env['subscription.subscription']
+        usage_count = self._generate_synthetic_usage(
+            Subscription.search([('id', 'in', subscription_ids), ('state', 'in', ('active', 'trial')),
+                                 ('plan_id.usage_based', '=', True)]).ids,
+            rng, usage_per_subscription,
+        )
+        invoice_count = self._generate_synthetic_invoices(
+            Subscription.search([('id', 'in', subscription_ids),
+                                 ('state', 'in', ('active', 'suspended', 'cancelled'))]).ids,
+            rng, invoice_ratio,
+        )
+        
+        _logger.info(f"Generated benchmark dataset {tag}: {len(partner_ids)} partners, "
+                     f"{len(subscription_ids)} subscriptions, {usage_count} usage records, "
+                     f"{invoice_count} invoices")
+        return {
+            'partner_ids': partner_ids,
+            'plan_ids': plan_ids,
+            'subscription_ids': subscription_ids,
+            'usage_count': usage_count,
+            'invoice_count': invoice_count,
+        }
+    
+    @api.model
+    def _generate_synthetic_usage(self, subscription_ids, rng, usage_per_subscription):
+        """Create usage records of the last 30 days, through the rollup-maintaining create"""
+        today = fields.Date.today()
+        env = self.with_context(tracking_disable=True, subscription_benchmark=True).env
+        vals_list = [{
+            'subscription_id': subscription_id,
+            'date': today - timedelta(days=rng.randint(0, 29)),
+            'usage_type': rng.choice(USAGE_TYPES),
+            'quantity': rng.randint(1, 500),
+        } for subscription_id in subscription_ids
+            for __ in range(rng.randint(0, 2 * usage_per_subscription))]
+        
+        for chunk in split_every(10000, vals_list):
+            env['subscription.usage'].create(list(chunk))
+            quantities = {}
+            for vals in chunk:
+                quantities[vals['subscription_id']] = quantities.get(vals['subscription_id'], 0.0) + vals['quantity']
+            env['subscription.subscription']._increment_current_usage(quantities)
+            env.invalidate_all()
+        return len(vals_list)
+    
+    @api.model
+    def _generate_synthetic_invoices(self, subscription_ids, rng, invoice_ratio):
+        """Create posted, unpaid invoices of the last 60 days for a share of the subscriptions"""
+        today = fields.Date.today()
+        env = self.with_context(tracking_disable=True, mail_create_nolog=True, mail_notrack=True,
+                                subscription_benchmark=True).env
+        invoiced_ids = [subscription_id for subscription_id in subscription_ids
+                        if rng.random() < invoice_ratio]
+        invoice_dates = {subscription_id: today - timedelta(days=rng.randint(0, 60))
+                         for subscription_id in invoiced_ids}
+        
+        for chunk_ids in split_every(500, invoiced_ids):
+            vals_list = []
+            for subscription in env['subscription.subscription'].browse(chunk_ids):
+                vals = subscription._prepare_invoice_vals()
+                vals['invoice_date'] = invoice_dates[subscription.id]
+                vals_list.append(vals)
+            env['account.move'].create(vals_list).action_post()
+            env.invalidate_all()
+        return len(invoiced_ids)
+    
+    # ==========================================
+    # BENCHMARK RUNNER
+    # ==========================================
+    
+    @api.model
+    def _get_benchmark_steps(self, data, seed=42):
+        """
+        Steps to time on a generated dataset
+        
+        Returns:
+            list: (step name, callable) tuples
+        """
+        Subscription = self.env['subscription.subscription']
+        steps = [
+            (f"cron:{method}", getattr(self.env[model], method))
+            for model, method in [
+                ('subscription.subscription', '_cron_dispatch_lifecycle_events'),
+                ('subscription.subscription', '_cron_process_billing'),
+                ('subscription.subscription', '_cron_check_trial_expiry'),
+                ('subscription.subscription', '_cron_check_expiry'),
+                ('subscription.subscription', '_cron_auto_renew'),
+                ('subscription.subscription', '_cron_send_billing_reminders'),
+                ('subscription.subscription', '_cron_update_usage_metrics'),
+                ('subscription.subscription', '_cron_retry_failed_payments'),
+                ('subscription.subscription', '_cron_check_renewals'),
+                ('subscription.subscription', '_cron_process_grace_periods'),
+                ('subscription.subscription', '_cron_process_suspensions'),
+                ('subscription.subscription', '_cron_process_terminations'),
+                ('subscription.usage.rollup', '_cron_compact_usage'),
+                ('subscription.metrics.snapshot', '_cron_snapshot_metrics'),
+                ('subscription.bulk.job', '_cron_run_jobs'),
+                ('subscription.payment.retry', '_cron_process_retries'),
+            ]
+        ]
+        steps += [
+            ('billing:batch', Subscription._cron_process_billing_batch),
+            ('portal:list', lambda: self._benchmark_portal_list(data['partner_ids'], seed)),
+            ('usage:ingest', lambda: self._benchmark_usage_ingestion(data['subscription_ids'], seed)),
+        ]
+        return steps
+    
+    @api.model
+    def _benchmark_portal_list(self, partner_ids, seed, sample_size=100):
+        """Run the queries of the /my/subscriptions page for a sample of partners"""
+        rng = random.Random(seed)
+        SubscriptionSudo = self.env['subscription.subscription'].sudo()
+        active_states = ['active', 'trial']
+        for partner_id in rng.sample(partner_ids, min(sample_size, len(partner_ids))):
+            domain = [('partner_id', 'child_of', partner_id)]
+            SubscriptionSudo._read_group(domain, ['state'], ['__count'])
+            subscriptions = SubscriptionSudo.search(
+                domain + [('state', 'in', active_states)], order='date_start desc, id desc', limit=20
+            )
+            subscriptions.read(['name', 'plan_id', 'state', 'date_start', 'next_billing_date', 'price'])
+            self.env.invalidate_all()
+    
+    @api.model
+    def _benchmark_usage_ingestion(self, subscription_ids, seed, batch_size=1000):
+        """Ingest one usage event per generated subscription through the batch webhook path"""
+        rng = random.Random(seed)
+        Usage = self.env['subscription.usage'].sudo()
+        names = {
+            rec['id']: rec['name']
+            for rec in self.env['subscription.subscription'].browse(subscription_ids).read(['name'])
+        }
+        for batch_index, chunk_ids in enumerate(split_every(batch_size, subscription_ids)):
+            Usage._ingest_usage_batch([{
+                'subscription_ref': names[subscription_id],
+                'usage_type': rng.choice(USAGE_TYPES),
+                'quantity': rng.randint(1, 500),
+            } for subscription_id in chunk_ids], idempotency_key=f"benchmark-{seed}-{batch_index}")
+            self.env.invalidate_all()
+    
+    @api.model
+    def _measure(self, name, scale, func, rollback=True):
+        """
+        Run a benchmark step in a savepoint, rolled back afterwards unless rollback is False
+        
+        Returns:
+            dict: wall time (seconds), SQL query count and peak traced Python
+                memory (bytes) of the step
+        """
+        cr = self.env.cr
+        self.env.flush_all()
+        self.env.invalidate_all()
+        savepoint = cr.savepoint()
+        error = False
+        query_count = cr.sql_log_count
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            func()
+            self.env.flush_all()
+        except Exception as e:
+            error = str(e)
+            _logger.exception(f"Benchmark step {name} failed at scale {scale}")
+        finally:
+            wall_time = time.perf_counter() - start
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            query_count = cr.sql_log_count - query_count
+            savepoint.close(rollback=rollback or bool(error))
+            self.env.invalidate_all()
+        
+        _logger.info(f"Benchmark {name} @ {scale}: {wall_time:.3f}s, {query_count} queries, "
+                     f"{peak_memory / 1024 / 1024:.1f} MiB peak")
+        return {
+            'step': name,
+            'scale': scale,
+            'wall_time': round(wall_time, 4),
+            'query_count': query_count,
+            'peak_memory': peak_memory,
+            'error': error,
+        }
+    
+    @api.model
+    def _run_benchmarks(self, scales=None, seed=42, output_path=None, baseline_path=None,
+                        tolerance=0.2, keep_data=False):
+        """
+        Generate a dataset per scale, time every step on it and write the results
+        
+        Args:
+            scales: numbers of subscriptions to generate (default 1k/10k/100k)
+            seed: random seed of the generated datasets
+            output_path: JSON results file (default: a timestamped file in the temp directory)
+            baseline_path: previous results file to compare against
+            tolerance: relative wall time or query count increase reported as a regression
+            keep_data: keep the generated datasets instead of rolling them back
+        
+        Returns:
+            dict: results file path, measurements and regressions
+        """
+        self = self.with_context(subscription_benchmark=True)
+        cr = self.env.cr
+        measurements = []
+        for scale in scales or BENCHMARK_SCALES:
+            scale_savepoint = cr.savepoint()
+            try:
+                data = {}
+                measurement = self._measure(
+                    'generate', scale, lambda: data.update(self._generate_synthetic_data(scale, seed=seed)),
+                    rollback=False,
+                )
+                measurements.append(measurement)
+                if measurement['error']:
+                    continue
+                for name, func in self._get_benchmark_steps(data, seed=seed):
+                    measurements.append(self._measure(name, scale, func))
+            finally:
+                scale_savepoint.close(rollback=not keep_data)
+                self.env.invalidate_all()
+        
+        regressions = self._compare_benchmark_results(measurements, baseline_path, tolerance) if baseline_path else []
+        
+        output_path = output_path or os.path.join(
+            tempfile.gettempdir(),
+            f"subscription_benchmark_{fields.Datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+        with open(output_path, 'w') as results_file:
+            json.dump({
+                'date': fields.Datetime.to_string(fields.Datetime.now()),
+                'database': cr.dbname,
+                'seed': seed,
+                'measurements': measurements,
+                'regressions': regressions,
+            }, results_file, indent=2)
+        
+        _logger.info(f"Benchmark results written to {output_path}")
+        return {'output_path': output_path, 'measurements': measurements, 'regressions': regressions}
+    
+    @api.model
+    def _compare_benchmark_results(self, measurements, baseline_path, tolerance=0.2):
+        """
+        Compare measurements with a previous results file
+        
+        Returns:
+            list: steps whose wall time or query count grew by more than tolerance
+        """
+        with open(baseline_path) as baseline_file:
+            baseline = {
+                (measurement['step'], measurement['scale']): measurement
+                for measurement in json.load(baseline_file).get('measurements', [])
+            }
+        
+        regressions = []
+        for measurement in measurements:
+            previous = baseline.get((measurement['step'], measurement['scale']))
+            if not previous or measurement['error']:
+                continue
+            for metric in ('wall_time', 'query_count'):
+                if previous[metric] and measurement[metric] > previous[metric] * (1 + tolerance):
+                    regressions.append({
+                        'step': measurement['step'],
+                        'scale': measurement['scale'],
+                        'metric': metric,
+                        'baseline': previous[metric],
+                        'value': measurement[metric],
+                    })
+                    _logger.warning(f"Benchmark regression in {measurement['step']} @ {measurement['scale']}: "
+                                    f"{metric} {previous[metric]} -> {measurement[metric]}")
+        return regressions
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, _
+from odoo.tools import split_every
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Failure lines kept on the job; the rest are only counted
+MAX_LOGGED_FAILURES = 200
+
+
+class SubscriptionBulkJob(models.Model):
+    """
+    Bulk subscription action processed in the background
+    
+    Subscriptions are handled in id order, chunk by chunk, with a commit
+    and a cursor update after each chunk. A job interrupted by a worker
+    restart resumes after its last committed chunk on the next cron run.
+    """
+    _name = 'subscription.bulk.job'
+    _description = 'Subscription Bulk Action Job'
+    _order = 'create_date desc, id desc'
+    
+    name = fields.Char('Name', required=True, readonly=True)
+    action = fields.Selection([
+        ('suspend', 'Suspend Subscriptions'),
+        ('activate', 'Activate Subscriptions'),
+        ('cancel', 'Cancel Subscriptions'),
+        ('send_reminder', 'Send Billing Reminders'),
+        ('update_price', 'Update Prices'),
+    ], string='Action', required=True, readonly=True)
+    user_id = fields.Many2one('res.users', 'Requested By', required=True, readonly=True,
+                              default=lambda self: self.env.user)
+    
+    subscription_ids = fields.Many2many('subscription.subscription',
+                                        'subscription_bulk_job_subscription_rel',
+                                        'job_id', 'subscription_id',
+                                        string='Subscriptions', readonly=True)
+    reason = fields.Text('Reason', readonly=True)
+    new_price = fields.Float('New Price', readonly=True)
+    price_increase_percent = fields.Float('Price Increase (%)', readonly=True)
+    send_email = fields.Boolean('Send Email Notifications', readonly=True)
+    chunk_size = fields.Integer('Subscriptions per Chunk', default=500)
+    
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('cancelled', 'Cancelled'),
+    ], string='Status', default='pending', required=True, index=True, readonly=True)
+    last_processed_id = fields.Integer('Last Processed Subscription', readonly=True,
+                                       help='Processing resumes after this subscription id')
+    total_count = fields.Integer('Total', readonly=True)
+    processed_count = fields.Integer('Processed', readonly=True)
+    success_count = fields.Integer('Updated', readonly=True)
+    failed_count = fields.Integer('Failed', readonly=True)
+    progress = fields.Float('Progress', compute='_compute_progress')
+    failure_log = fields.Text('Failures', readonly=True)
+    date_started = fields.Datetime('Started', readonly=True)
+    date_done = fields.Datetime('Finished', readonly=True)
+    
+    @api.depends('processed_count', 'total_count')
+    def _compute_progress(self):
+        for job in self:
+            job.progress = 100.0 * job.processed_count / job.total_count if job.total_count else 0.0
+    
+    def action_cancel(self):
+        """Stop a job; chunks already committed are kept"""
+        self.filtered(lambda j: j.state in ('pending', 'running')).write({
+            'state': 'cancelled',
+            'date_done': fields.Datetime.now(),
+        })
+    
+    def _enqueue(self):
+        """Wake the job runner up instead of waiting for its next scheduled run"""
+        cron = self.env.ref('subscription_management.cron_subscription_bulk_jobs', raise_if_not_found=False)
+        if cron:
+            cron._trigger()
+    
+    @api.model
+    def _cron_run_jobs(self):
+        """Run pending jobs and resume the ones interrupted by a restart"""
+        for job in self.search([('state', 'in', ['pending', 'running'])], order='id'):
+            job._run(commit=True)
+    
+    def _run(self, commit=False):
+        """
+        Process the remaining subscriptions of this job chunk by chunk
+        
+        Args:
+            commit: Commit after each chunk (background runs only)
+        """
+        self.ensure_one()
+        if self.state not in ('pending', 'running'):
+            return
+        
+        if self.state == 'pending':
+            self.write({
+                'state': 'running',
+                'date_started': fields.Datetime.now(),
+                'total_count': len(self.subscription_ids),
+            })
+        
+        # Run the action with the rights of the user who requested it
+        job = self.with_user(self.user_id)
+        Subscription = job.env['subscription.subscription']
+        remaining_ids = Subscription.search([
+            ('id', 'in', self.subscription_ids.ids),
+            ('id', '>', self.last_processed_id),
+        ], order='id').ids
+        
+        for chunk_ids in split_every(max(self.chunk_size, 1), remaining_ids):
+            if commit:
+                # Pick up a cancellation made while the previous chunk ran
+                self.invalidate_recordset(['state'])
+                if self.state == 'cancelled':
+                    return
+            
+            success_count, failures = job._process_chunk(Subscription.browse(chunk_ids))
+            
+            failure_log = self.failure_log or ''
+            logged = failure_log.count('\n') + 1 if failure_log else 0
+            new_lines = failures[:max(MAX_LOGGED_FAILURES - logged, 0)]
+            if new_lines:
+                failure_log = '\n'.join(filter(None, [failure_log] + new_lines))
+            
+            self.write({
+                'last_processed_id': chunk_ids[-1],
+                'processed_count': self.processed_count + len(chunk_ids),
+                'success_count': self.success_count + success_count,
+                'failed_count': self.failed_count + len(failures),
+                'failure_log': failure_log,
+            })
+            if commit:
+                self.env['subscription.subscription']._cron_commit()
+                self.env.invalidate_all()
+        
+        self.write({'state': 'done', 'date_done': fields.Datetime.now()})
+        if commit:
+            self.env['subscription.subscription']._cron_commit()
+        _logger.info(f"Bulk job {self.name}: {self.success_count} updated, {self.failed_count} failed")
+    
+    def _process_chunk(self, subscriptions):
+        """
+        Apply the job action to one chunk
+        
+        The chunk runs in a savepoint; if it fails, its subscriptions are
+        retried one by one so a single bad record does not block the rest.
+        
+        Returns:
+            tuple: (number of subscriptions updated, list of failure messages)
+        """
+        try:
+            with self.env.cr.savepoint():
+                return self._apply_action(subscriptions), []
+        except Exception as e:
+            _logger.warning(f"Bulk job {self.name}: chunk starting at subscription id "
+                            f"{subscriptions[:1].id} failed, retrying one by one: {e}")
+        
+        success_count = 0
+        failures = []
+        for subscription in subscriptions:
+            try:
+                with self.env.cr.savepoint():
+                    success_count += self._apply_action(subscription)
+            except Exception as e:
+                failures.append(f"{subscription.name}: {e}")
+        return success_count, failures
+    
+    def _apply_action(self, subscriptions):
+        """Apply the job action to subscriptions and return how many were updated"""
+        return getattr(self, f'_action_{self.action}')(subscriptions)
+    
+    def _action_suspend(self, subscriptions):
+        """Suspend active and trial subscriptions"""
+        to_suspend = subscriptions.filtered(lambda s: s.state in ('active', 'trial'))
+        for subscription in to_suspend:
+            subscription.action_suspend()
+        if self.reason and to_suspend:
+            to_suspend._message_log_batch(
+                bodies={subscription.id: f"Bulk suspension: {self.reason}" for subscription in to_suspend},
+            )
+        return len(to_suspend)
+    
+    def _action_activate(self, subscriptions):
+        """Activate draft and suspended subscriptions"""
+        to_activate = subscriptions.filtered(lambda s: s.state in ('draft', 'suspended'))
+        for subscription in to_activate:
+            subscription.action_activate()
+        return len(to_activate)
+    
+    def _action_cancel(self, subscriptions):
+        """Cancel subscriptions that are not already cancelled or expired"""
+        to_cancel = subscriptions.filtered(lambda s: s.state not in ('cancelled', 'expired'))
+        for subscription in to_cancel:
+            subscription.action_cancel()
+        if self.reason and to_cancel:
+            to_cancel._message_log_batch(
+                bodies={subscription.id: f"Bulk cancellation: {self.reason}" for subscription in to_cancel},
+            )
+        return len(to_cancel)
+    
+    def _action_send_reminder(self, subscriptions):
+        """Queue billing reminders for active subscriptions"""
+        template = self.env.ref('subscription_management.email_template_subscription_billing_reminder',
+                                raise_if_not_found=False)
+        to_remind = subscriptions.filtered(lambda s: s.state == 'active')
+        if not template or not to_remind:
+            return 0
+        template.send_mail_batch(to_remind.ids, force_send=False)
+        return len(to_remind)
+    
+    def _action_update_price(self, subscriptions):
+        """Update subscription prices"""
+        for subscription in subscriptions:
+            if self.new_price > 0:
+                subscription.write({'price': self.new_price})
+            elif self.price_increase_percent != 0:
+                new_price = subscription.price * (1 + self.price_increase_percent / 100)
+                subscription.write({'price': new_price})
+        subscriptions._message_log_batch(
+            bodies={subscription.id: "Price updated via bulk action" for subscription in subscriptions},
+        )
+        return len(subscriptions)
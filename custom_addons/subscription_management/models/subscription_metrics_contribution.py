@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields
+
+
+class SubscriptionMetricsContribution(models.Model):
+    """
+    What each subscription counted for in the last metrics snapshot
+    
+    Lets the snapshot job apply deltas for changed subscriptions only,
+    instead of re-aggregating every subscription each night.
+    """
+    _name = 'subscription.metrics.contribution'
+    _description = 'Subscription Metrics Contribution'
+    
+    subscription_id = fields.Many2one('subscription.subscription', 'Subscription',
+                                      ondelete='set null', index=True, readonly=True)
+    plan_id = fields.Many2one('subscription.plan', 'Plan', ondelete='set null', readonly=True)
+    company_id = fields.Many2one('res.company', 'Company', ondelete='set null', readonly=True)
+    is_active = fields.Boolean('Active', readonly=True)
+    mrr = fields.Float('MRR', readonly=True)
+    seat_count = fields.Integer('Seats', readonly=True)
+    
+    _sql_constraints = [
+        ('subscription_unique', 'UNIQUE(subscription_id)',
+         'Only one metrics contribution per subscription!'),
+    ]
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+from odoo.tools import split_every
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class SubscriptionMetricsSnapshot(models.Model):
+    """
+    Daily MRR/ARR/churn figures per plan and company
+    
+    Written by a nightly job that only looks at subscriptions changed since
+    its previous run, so dashboards read pre-aggregated rows instead of
+    iterating subscriptions and invoices.
+    """
+    _name = 'subscription.metrics.snapshot'
+    _description = 'Subscription Metrics Snapshot'
+    _order = 'date desc, plan_id'
+    _rec_name = 'date'
+    
+    date = fields.Date('Date', required=True, index=True, readonly=True)
+    plan_id = fields.Many2one('subscription.plan', 'Plan', required=True,
+                              ondelete='cascade', readonly=True)
+    company_id = fields.Many2one('res.company', 'Company', required=True,
+                                 ondelete='cascade', readonly=True)
+    currency_id = fields.Many2one(related='plan_id.currency_id', store=True)
+    
+    active_count = fields.Integer('Active Subscriptions', readonly=True)
+    new_count = fields.Integer('New', readonly=True)
+    churned_count = fields.Integer('Churned', readonly=True)
+    mrr = fields.Monetary('MRR', currency_field='currency_id', readonly=True)
+    arr = fields.Monetary('ARR', currency_field='currency_id', readonly=True)
+    seat_count = fields.Integer('Seats', readonly=True)
+    
+    _sql_constraints = [
+        ('date_plan_company_unique', 'UNIQUE(date, plan_id, company_id)',
+         'Only one metrics snapshot per day, plan and company!'),
+    ]
+    
+    @api.model
+    def _cron_snapshot_metrics(self):
+        """
+        Write today's snapshot rows from the latest snapshot plus the changes
+        
+        Each changed subscription moves the totals by the difference between
+        what it counts for now and what it counted for in the previous run
+        (subscription.metrics.contribution). The first run counts everything.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        Contribution = self.env['subscription.metrics.contribution']
+        Subscription = self.env['subscription.subscription'].with_context(active_test=False)
+        today = fields.Date.today()
+        run_start = fields.Datetime.now()
+        
+        last_run = ICP.get_param('subscription.metrics_last_run')
+        bootstrap = not last_run
+        domain = [] if bootstrap else [
+            '|', ('write_date', '>', last_run), ('plan_id.write_date', '>', last_run),
+        ]
+        changed_ids = Subscription.search(domain, order='id').ids
+        
+        totals, counts = self._get_latest_totals(today)
+        
+        def apply(old, new):
+            old_active = bool(old and old[2])
+            new_active = bool(new and new[2])
+            for row, sign in ((old, -1), (new, 1)):
+                if row and row[0] and row[1]:
+                    values = totals.setdefault((row[0], row[1]), [0, 0.0, 0])
+                    values[0] += sign * int(row[2])
+                    values[1] += sign * row[3]
+                    values[2] += sign * row[4]
+            if bootstrap or old_active == new_active:
+                return
+            key = new[:2] if new_active else old[:2]
+            if key[0] and key[1]:
+                key_counts = counts.setdefault((key[0], key[1]), [0, 0])
+                key_counts[0 if new_active else 1] += 1
+        
+        # Subscriptions deleted since the previous run
+        Contribution.flush_model()
+        self.env.cr.execute("""
+            DELETE FROM subscription_metrics_contribution
+             WHERE subscription_id IS NULL
+         RETURNING plan_id, company_id, is_active, mrr, seat_count
+        """)
+        for old in self.env.cr.fetchall():
+            apply(old, None)
+        
+        for chunk_ids in split_every(1000, changed_ids):
+            self.env.cr.execute("""
+                SELECT subscription_id, plan_id, company_id, is_active, mrr, seat_count
+                  FROM subscription_metrics_contribution
+                 WHERE subscription_id = ANY(%s)
+            """, (list(chunk_ids),))
+            previous = {row[0]: row[1:] for row in self.env.cr.fetchall()}
+            
+            rows = []
+            for subscription in Subscription.browse(chunk_ids):
+                new = subscription._get_metrics_contribution()
+                apply(previous.get(subscription.id), new)
+                rows.append((subscription.id,) + new)
+            self._write_contributions(rows)
+            self.env.invalidate_all()
+        
+        self._write_snapshot(today, totals, counts)
+        ICP.set_param('subscription.metrics_last_run', fields.Datetime.to_string(run_start))
+        _logger.info(f"Metrics snapshot for {today}: {len(changed_ids)} changed subscriptions processed")
+    
+    @api.model
+    def _get_latest_totals(self, today):
+        """
+        Totals carried over from the most recent snapshot up to today
+        
+        Returns:
+            tuple: ({(plan_id, company_id): [active_count, mrr, seat_count]},
+                    {(plan_id, company_id): [new_count, churned_count]} for a rerun of today)
+        """
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT date, plan_id, company_id, active_count, mrr, seat_count, new_count, churned_count
+              FROM subscription_metrics_snapshot
+             WHERE date = (SELECT MAX(date) FROM subscription_metrics_snapshot WHERE date <= %s)
+        """, (today,))
+        totals = {}
+        counts = {}
+        for snapshot_date, plan_id, company_id, active, mrr, seats, new, churned in self.env.cr.fetchall():
+            totals[(plan_id, company_id)] = [active, mrr, seats]
+            if snapshot_date == today:
+                counts[(plan_id, company_id)] = [new, churned]
+        return totals, counts
+    
+    @api.model
+    def _write_contributions(self, rows):
+        """Upsert (subscription, plan, company, is_active, mrr, seats) contribution rows"""
+        if not rows:
+            return
+        row_sql = "(%s, %s, %s, %s, %s, %s, %s, NOW() AT TIME ZONE 'UTC', %s, NOW() AT TIME ZONE 'UTC')"
+        params = []
+        for row in rows:
+            params.extend(row)
+            params.extend([self.env.uid, self.env.uid])
+        self.env.cr.execute("""
+            INSERT INTO subscription_metrics_contribution
+                (subscription_id, plan_id, company_id, is_active, mrr, seat_count,
+                 create_uid, create_date, write_uid, write_date)
+            VALUES %s
+            ON CONFLICT (subscription_id) DO UPDATE SET
+                plan_id = EXCLUDED.plan_id,
+                company_id = EXCLUDED.company_id,
+                is_active = EXCLUDED.is_active,
+                mrr = EXCLUDED.mrr,
+                seat_count = EXCLUDED.seat_count,
+                write_uid = EXCLUDED.write_uid,
+                write_date = EXCLUDED.write_date
+        """ % ', '.join([row_sql] * len(rows)), params)
+        self.env['subscription.metrics.contribution'].invalidate_model()
+    
+    @api.model
+    def _write_snapshot(self, snapshot_date, totals, counts):
+        """Replace the snapshot rows of a day, skipping plans with nothing to report"""
+        self.env.cr.execute("DELETE FROM subscription_metrics_snapshot WHERE date = %s", (snapshot_date,))
+        self.invalidate_model()
+        
+        vals_list = []
+        for key in set(totals) | set(counts):
+            active, mrr, seats = totals.get(key, [0, 0.0, 0])
+            new, churned = counts.get(key, [0, 0])
+            if not (active or new or churned or round(mrr, 2) or seats):
+                continue
+            vals_list.append({
+                'date': snapshot_date,
+                'plan_id': key[0],
+                'company_id': key[1],
+                'active_count': active,
+                'new_count': new,
+                'churned_count': churned,
+                'mrr': mrr,
+                'arr': mrr * 12,
+                'seat_count': seats,
+            })
+        self.create(vals_list)
+    
+    @api.model
+    def _get_metrics_data(self, date_from=None, date_to=None, plan_ids=None, company_ids=None):
+        """Snapshot rows as plain dicts for dashboards and the JSON endpoint"""
+        domain = []
+        if date_from:
+            domain.append(('date', '>=', date_from))
+        if date_to:
+            domain.append(('date', '<=', date_to))
+        if plan_ids:
+            domain.append(('plan_id', 'in', plan_ids))
+        if company_ids:
+            domain.append(('company_id', 'in', company_ids))
+        
+        snapshots = self.search_read(domain, [
+            'date', 'plan_id', 'company_id', 'currency_id', 'active_count',
+            'new_count', 'churned_count', 'mrr', 'arr', 'seat_count',
+        ])
+        for snapshot in snapshots:
+            snapshot['date'] = fields.Date.to_string(snapshot['date'])
+            for field_name in ('plan_id', 'company_id', 'currency_id'):
+                snapshot[field_name] = snapshot[field_name] and {
+                    'id': snapshot[field_name][0], 'name': snapshot[field_name][1],
+                }
+        return snapshots
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, _
+from datetime import timedelta
+import random
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class SubscriptionPaymentRetry(models.Model):
+    """
+    Queue of payment retries for unpaid subscription invoices
+    
+    Due retries are picked by an indexed query on next_attempt_at and
+    charged in small batches through the configured payment adapter
+    (subscription.payment_retry_adapter). Each failure pushes the next
+    attempt back exponentially, with jitter so retries do not pile up.
+    
+    Adapters are plain methods named _charge_batch_<adapter>; modules add
+    one with selection_add on the adapter setting and a matching method.
+    """
+    _name = 'subscription.payment.retry'
+    _description = 'Subscription Payment Retry'
+    _order = 'next_attempt_at, id'
+    _rec_name = 'invoice_id'
+    
+    invoice_id = fields.Many2one('account.move', 'Invoice', required=True,
+                                 ondelete='cascade', index=True, readonly=True)
+    subscription_id = fields.Many2one('subscription.subscription', 'Subscription',
+                                      required=True, ondelete='cascade', index=True,
+                                      readonly=True)
+    attempt = fields.Integer('Attempts', default=0, readonly=True)
+    next_attempt_at = fields.Datetime('Next Attempt', required=True, readonly=True,
+                                      default=fields.Datetime.now)
+    last_attempt_at = fields.Datetime('Last Attempt', readonly=True)
+    last_error = fields.Text('Last Error', readonly=True)
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('done', 'Paid'),
+        ('failed', 'Exhausted'),
+        ('cancelled', 'Cancelled'),
+    ], string='Status', default='queued', required=True, readonly=True)
+    
+    def init(self):
+        # Due-time scan only ever reads queued retries
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS subscription_payment_retry_due_idx
+                ON subscription_payment_retry (next_attempt_at)
+             WHERE state = 'queued'
+        """)
+        # At most one queued retry per invoice
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS subscription_payment_retry_invoice_queued_uniq
+                ON subscription_payment_retry (invoice_id)
+             WHERE state = 'queued'
+        """)
+    
+    # ==========================================
+    # Queueing
+    # ==========================================
+    
+    @api.model
+    def _enqueue_invoices(self, invoices, immediate=False):
+        """
+        Queue a retry for unpaid posted invoices that have none queued yet
+        
+        Args:
+            invoices: account.move recordset linked to subscriptions
+            immediate: Make the retry due now instead of after the first backoff
+        
+        Returns:
+            subscription.payment.retry: The created queue entries
+        """
+        invoices = invoices.filtered(
+            lambda inv: inv.subscription_id and inv.state == 'posted' and inv.payment_state == 'not_paid'
+        )
+        if not invoices:
+            return self.browse()
+        
+        queued_invoice_ids = set(self.search([
+            ('invoice_id', 'in', invoices.ids),
+            ('state', '=', 'queued'),
+        ]).invoice_id.ids)
+        
+        now = fields.Datetime.now()
+        return self.create([{
+            'invoice_id': invoice.id,
+            'subscription_id': invoice.subscription_id.id,
+            'next_attempt_at': now if immediate else self._get_next_attempt_at(1, now),
+        } for invoice in invoices if invoice.id not in queued_invoice_ids])
+    
+    @api.model
+    def _get_next_attempt_at(self, attempt, from_datetime=None):
+        """
+        Exponential backoff with jitter
+        
+        The delay doubles from subscription.payment_retry_base_hours for
+        each attempt, is capped at subscription.payment_retry_max_hours and
+        is spread by +/- subscription.payment_retry_jitter (a fraction).
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        base_hours = float(ICP.get_param('subscription.payment_retry_base_hours', '24'))
+        max_hours = float(ICP.get_param('subscription.payment_retry_max_hours', '168'))
+        jitter = float(ICP.get_param('subscription.payment_retry_jitter', '0.2'))
+        
+        delay_hours = min(base_hours * 2 ** max(attempt - 1, 0), max_hours)
+        delay_hours *= 1 + random.uniform(-jitter, jitter)
+        return (from_datetime or fields.Datetime.now()) + timedelta(hours=delay_hours)
+    
+    # ==========================================
+    # Processing
+    # ==========================================
+    
+    @api.model
+    def _enqueue_overdue_invoices(self):
+        """Queue a first retry for overdue invoices of running subscriptions never queued before"""
+        overdue = self.env['account.move'].search([
+            ('move_type', '=', 'out_invoice'),
+            ('state', '=', 'posted'),
+            ('payment_state', '=', 'not_paid'),
+            ('invoice_date_due', '<', fields.Date.today()),
+            ('subscription_id.state', 'in', ['active', 'trial']),
+        ])
+        if not overdue:
+            return self.browse()
+        known_invoice_ids = set(self.search([('invoice_id', 'in', overdue.ids)]).invoice_id.ids)
+        return self._enqueue_invoices(overdue.filtered(lambda inv: inv.id not in known_invoice_ids))
+    
+    @api.model
+    def _cron_process_retries(self):
+        """Queue newly overdue invoices, then charge due retries in batches"""
+        self._enqueue_overdue_invoices()
+        self.env['subscription.subscription']._cron_commit()
+        return self._process_due_retries()
+    
+    @api.model
+    def _process_due_retries(self):
+        """
+        Serve the due part of the queue
+        
+        At most subscription.payment_retry_max_per_run retries are charged per
+        run, subscription.payment_retry_batch_size at a time, which keeps the
+        load on the payment provider flat. Retries only polled for a pending
+        charge do not count toward that limit.
+        
+        Returns:
+            int: Number of retries charged
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        adapter = ICP.get_param('subscription.payment_retry_adapter')
+        batch_size = int(ICP.get_param('subscription.payment_retry_batch_size', '50'))
+        max_per_run = int(ICP.get_param('subscription.payment_retry_max_per_run', '500'))
+        
+        self._close_settled()
+        if not adapter:
+            _logger.info("No payment retry adapter configured, queued retries are left as they are")
+            return 0
+        
+        charged = 0
+        last_id = 0
+        while charged < max_per_run:
+            entries = self.search([
+                ('state', '=', 'queued'),
+                ('next_attempt_at', '<=', fields.Datetime.now()),
+                ('id', '>', last_id),
+            ], order='id', limit=min(batch_size, max_per_run - charged))
+            if not entries:
+                break
+            last_id = entries[-1].id
+            
+            try:
+                with self.env.cr.savepoint():
+                    charged += entries._charge_batch(adapter)
+            except Exception as e:
+                _logger.error(f"Payment retry batch starting at entry {entries[0].id} failed: {e}")
+                charged += len(entries)
+            self.env['subscription.subscription']._cron_commit()
+        
+        _logger.info(f"Payment retry run completed: {charged} retries charged with adapter '{adapter}'")
+        return charged
+    
+    @api.model
+    def _close_settled(self):
+        """Close queued retries whose invoice was paid or cancelled in the meantime"""
+        settled = self.search([
+            ('state', '=', 'queued'),
+            '|',
+            ('invoice_id.payment_state', 'in', ['paid', 'in_payment', 'reversed']),
+            ('invoice_id.state', '=', 'cancel'),
+        ])
+        settled.filtered(lambda e: e.invoice_id.state == 'cancel').write({'state': 'cancelled'})
+        settled.filtered(lambda e: e.invoice_id.state != 'cancel').write({'state': 'done'})
+    
+    def _charge_batch(self, adapter):
+        """
+        Charge a batch through an adapter and apply the outcomes
+        
+        The adapter returns a dict mapping entry id to an error message, to
+        False when the charge went through, or to None when the provider has
+        not settled it yet. Pending entries stay queued without counting an
+        attempt and are polled again after subscription.payment_retry_poll_minutes.
+        
+        Returns:
+            int: Number of entries actually charged (pending ones excluded)
+        """
+        charge_method = getattr(self, f'_charge_batch_{adapter}', None)
+        if not charge_method:
+            raise ValueError(f"Unknown payment retry adapter '{adapter}'")
+        
+        now = fields.Datetime.now()
+        errors = charge_method()
+        ICP = self.env['ir.config_parameter'].sudo()
+        max_retries = int(ICP.get_param('subscription.settings.max_billing_retries', '3'))
+        poll_minutes = int(ICP.get_param('subscription.payment_retry_poll_minutes', '60'))
+        
+        charged = 0
+        for entry in self:
+            error = errors.get(entry.id, _("No response from payment adapter"))
+            if error is None:
+                entry.write({
+                    'last_attempt_at': now,
+                    'next_attempt_at': now + timedelta(minutes=poll_minutes),
+                })
+                continue
+            charged += 1
+            attempt = entry.attempt + 1
+            if not error:
+                entry.write({
+                    'attempt': attempt,
+                    'last_attempt_at': now,
+                    'last_error': False,
+                    'state': 'done',
+                })
+                entry.subscription_id._process_successful_payment(entry.invoice_id)
+                continue
+            
+            exhausted = attempt >= max_retries
+            entry.write({
+                'attempt': attempt,
+                'last_attempt_at': now,
+                'last_error': error,
+                'state': 'failed' if exhausted else 'queued',
+                'next_attempt_at': entry.next_attempt_at if exhausted else self._get_next_attempt_at(attempt, now),
+            })
+            entry.subscription_id._process_failed_payment(entry.invoice_id)
+            if not exhausted:
+                entry.subscription_id.payment_retry_date = entry.next_attempt_at.date()
+        return charged
+    
+    # ==========================================
+    # Adapters
+    # ==========================================
+    
+    def _charge_batch_stub(self):
+        """
+        Local adapter for testing: no payment is made
+        
+        Every charge succeeds, or fails when subscription.payment_retry_stub_outcome
+        is set to 'failure'.
+        """
+        outcome = self.env['ir.config_parameter'].sudo().get_param(
+            'subscription.payment_retry_stub_outcome', 'success'
+        )
+        error = outcome == 'failure' and _("Stub adapter: payment declined")
+        return {entry.id: error for entry in self}
+    
+    def _charge_batch_payment_token(self):
+        """
+        Charge the customer's saved payment token with an offline payment transaction
+        
+        Only done transactions count as paid, and authorized ones when the
+        provider captures them by itself. Pending transactions, and authorized
+        ones waiting for a manual capture, are left to the provider; later
+        runs wait for them instead of charging the invoice again.
+        """
+        errors = {}
+        Transaction = self.env['payment.transaction'].sudo()
+        tokens = self.env['payment.token'].sudo().search([
+            ('partner_id', 'in', self.invoice_id.partner_id.commercial_partner_id.ids),
+        ], order='id desc')
+        pending_invoice_ids = set(Transaction.search([
+            ('invoice_ids', 'in', self.invoice_id.ids),
+            ('state', 'in', ['pending', 'authorized']),
+        ]).filtered(lambda t: t.state == 'pending' or t.provider_id.capture_manually).invoice_ids.ids)
+        
+        for entry in self:
+            invoice = entry.invoice_id
+            if invoice.id in pending_invoice_ids:
+                errors[entry.id] = None
+                continue
+            partner = invoice.partner_id.commercial_partner_id
+            token = tokens.filtered(lambda t: t.partner_id == partner)[:1]
+            if not token:
+                errors[entry.id] = _("No saved payment method for %s", partner.display_name)
+                continue
+            try:
+                with self.env.cr.savepoint():
+                    transaction = Transaction.create({
+                        'provider_id': token.provider_id.id,
+                        'payment_method_id': token.payment_method_id.id,
+                        'reference': Transaction._compute_reference(
+                            token.provider_id.code, prefix=invoice.name
+                        ),
+                        'amount': invoice.amount_residual,
+                        'currency_id': invoice.currency_id.id,
+                        'partner_id': partner.id,
+                        'token_id': token.id,
+                        'operation': 'offline',
+                        'invoice_ids': [(6, 0, invoice.ids)],
+                    })
+                    transaction._send_payment_request()
+                if transaction.state == 'done':
+                    errors[entry.id] = False
+                elif transaction.state == 'authorized':
+                    errors[entry.id] = None if token.provider_id.capture_manually else False
+                elif transaction.state == 'pending':
+                    errors[entry.id] = None
+                elif transaction.state == 'cancel':
+                    errors[entry.id] = transaction.state_message or _("Payment cancelled")
+                else:
+                    errors[entry.id] = transaction.state_message or _("Payment refused")
+            except Exception as e:
+                errors[entry.id] = str(e)
+        return errors
@@ -4,6 +4,8 @@ from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
 from dateutil.relativedelta import relativedelta
 from datetime import datetime, date
+from bisect import bisect_right
+from odoo.tools import split_every
 
 
 class SubscriptionPlan(models.Model):
@@ -69,6 +71,15 @@ class SubscriptionPlan(models.Model):
     usage_price = fields.Float('Price per Usage Unit')
     included_usage = fields.Float('Included Usage', 
                                   help='Usage included in base price')
+    usage_pricing = fields.Selection([
+        ('flat', 'Flat Overage'),
+        ('tiered', 'Tiered'),
+        ('volume', 'Volume'),
+    ], string='Usage Pricing', default='flat', required=True,
+       help='Flat: usage above the included usage at the price per unit.\n'
+            'Tiered: each unit at the price of the tier it falls in.\n'
+            'Volume: all units at the price of the tier the total reaches.')
+    usage_tier_ids = fields.One2many('subscription.plan.usage.tier', 'plan_id', 'Usage Tiers')
     
     # Product Configuration
     product_template_id = fields.Many2one('product.template', 'Product Template',
@@ -154,30 +165,41 @@ class SubscriptionPlan(models.Model):
         help='Number of active seat subscriptions'
     )
     
-    @api.depends('subscription_ids', 'subscription_ids.allocated_seat_count',
-                 'subscription_ids.child_subscription_ids')
+    @api.depends('supports_seats', 'subscription_ids.allocated_seat_count', 'subscription_ids.state')
     def _compute_seat_statistics(self):
-        """Calculate seat allocation statistics"""
-        for plan in self:
-            if plan.supports_seats:
-                active_subs = plan.subscription_ids.filtered(
-                    lambda s: s.state in ('active', 'trial')
-                )
-                plan.total_allocated_seats = sum(active_subs.mapped('allocated_seat_count'))
-                
-                # Count all child subscriptions (seat subscriptions)
-                plan.active_seat_subscriptions = len(
-                    active_subs.mapped('child_subscription_ids')
+        """Calculate seat allocation statistics from the stored seat counters"""
+        seat_plans = self.filtered('supports_seats')
+        seat_totals = {}
+        if seat_plans.ids:
+            seat_totals = {
+                plan.id: seats
+                for plan, seats in self.env['subscription.subscription'].sudo()._read_group(
+                    [('plan_id', 'in', seat_plans.ids), ('state', 'in', ('active', 'trial'))],
+                    ['plan_id'], ['allocated_seat_count:sum'],
                 )
-            else:
-                plan.total_allocated_seats = 0
-                plan.active_seat_subscriptions = 0
+            }
+        for plan in self:
+            # Each allocated seat is one seat subscription
+            plan.total_allocated_seats = seat_totals.get(plan.id, 0)
+            plan.active_seat_subscriptions = seat_totals.get(plan.id, 0)
     
     @api.depends('subscription_ids')
     def _compute_subscription_count(self):
         for plan in self:
             plan.subscription_count = len(plan.subscription_ids)
     
+    def write(self, vals):
+        result = super().write(vals)
+        # Planned billing periods carry the price they will be invoiced at
+        if 'price' in vals or 'trial_price' in vals:
+            subscription_ids = self.env['subscription.subscription'].search([
+                ('plan_id', 'in', self.ids),
+                ('state', 'in', ('active', 'trial')),
+            ]).ids
+            for chunk_ids in split_every(1000, subscription_ids):
+                self.env['subscription.subscription'].browse(chunk_ids)._generate_billing_schedule()
+        return result
+    
     @api.constrains('billing_interval')
     def _check_billing_interval(self):
         for plan in self:
@@ -321,6 +343,190 @@ class SubscriptionPlan(models.Model):
         
         return start_date
     
+    def _get_billing_schedule(self, billing_date, count):
+        """
+        Upcoming billing periods starting from a billing date
+        
+        Anniversary periods start on their billing date. Calendar periods
+        are billed at the end of the previous period and start the day after.
+        
+        Returns:
+            list: (billing_date, period_start, period_end) tuples
+        """
+        self.ensure_one()
+        
+        if self.is_lifetime or self.billing_period == 'lifetime' or not billing_date:
+            return []
+        
+        calendar = self.billing_type == 'calendar' and self.billing_period != 'daily'
+        schedule = []
+        for _i in range(count):
+            if calendar:
+                period_start = billing_date + relativedelta(days=1)
+                period_end = self._get_calendar_based_billing_date(period_start)
+            else:
+                period_start = billing_date
+                period_end = self._get_anniversary_based_billing_date(period_start) - relativedelta(days=1)
+            
+            if period_end < period_start:
+                break
+            schedule.append((billing_date, period_start, period_end))
+            billing_date = period_end if calendar else period_end + relativedelta(days=1)
+        
+        return schedule
+    
+    def _get_monthly_price_factor(self):
+        """Factor turning one billing period's price into a monthly recurring amount"""
+        self.ensure_one()
+        
+        if self.is_lifetime or self.billing_period == 'lifetime':
+            return 0.0
+        
+        interval = self.billing_interval or 1
+        months_per_period = {
+            'daily': 12.0 / 365,
+            'weekly': 12.0 / 52,
+            'monthly': 1.0,
+            'quarterly': 3.0,
+            'yearly': 12.0,
+        }.get(self.billing_period)
+        if not months_per_period:
+            return 0.0
+        return 1.0 / (months_per_period * interval)
+    
+    def action_simulate_price_change(self):
+        """Open the proration simulator for this plan"""
+        self.ensure_one()
+        return {
+            'name': _('Simulate Plan Change'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'subscription.proration.simulator',
+            'view_mode': 'form',
+            'target': 'new',
+            'context': {'active_model': self._name, 'active_id': self.id},
+        }
+    
+    def _get_usage_rating_tables(self):
+        """
+        Tier tables of this plan prepared for rating many quantities
+        
+        Each table holds the tier lower bounds, unit prices and the
+        cumulative tiered price at each bound, so rating a quantity is a
+        bisect plus one multiplication.
+        
+        Returns:
+            dict: usage type (False for the default table) -> (bounds, prices, cumulative)
+        """
+        self.ensure_one()
+        tiers_by_type = {}
+        for tier in self.usage_tier_ids.sorted('from_quantity'):
+            tiers_by_type.setdefault(tier.usage_type or False, []).append(tier)
+        
+        tables = {}
+        for usage_type, tiers in tiers_by_type.items():
+            bounds = [tier.from_quantity for tier in tiers]
+            prices = [tier.unit_price for tier in tiers]
+            cumulative = [0.0]
+            for index in range(1, len(tiers)):
+                cumulative.append(cumulative[-1] + (bounds[index] - bounds[index - 1]) * prices[index - 1])
+            tables[usage_type] = (bounds, prices, cumulative)
+        return tables
+    
+    def _rate_usage_quantity(self, table, quantity):
+        """Price of a usage quantity with a rating table (see _get_usage_rating_tables)"""
+        self.ensure_one()
+        bounds, prices, cumulative = table
+        index = bisect_right(bounds, quantity) - 1
+        if index < 0 or quantity <= 0:
+            return 0.0
+        if self.usage_pricing == 'volume':
+            return quantity * prices[index]
+        return cumulative[index] + (quantity - bounds[index]) * prices[index]
+    
+    def _get_proration_period_days(self):
+        """Days in one billing period, as used for proration"""
+        self.ensure_one()
+        return 365 if self.billing_period == 'yearly' else 30
+    
+    def _simulate_price_change(self, new_price=None, new_plan=None, effective_date=None):
+        """
+        Proration impact of a price or plan change on every running subscription of this plan
+        
+        Nothing is written. Remaining days and proration amounts for all
+        subscriptions are computed by one query, so simulating a plan with
+        many subscriptions costs the same as simulating one.
+        
+        Args:
+            new_price: New price of this plan (price change)
+            new_plan: Plan the subscriptions would move to (plan change)
+            effective_date: Date the change takes effect (default today)
+        
+        Returns:
+            dict: {'summary': {...}, 'lines': [{...} per subscription]}
+        """
+        self.ensure_one()
+        effective_date = effective_date or fields.Date.today()
+        target_price = new_plan.price if new_plan else new_price
+        if target_price is None:
+            raise ValidationError(_('Provide a new price or a new plan to simulate.'))
+        
+        self.env['subscription.subscription'].flush_model()
+        self.env['res.partner'].flush_model(['name'])
+        self.env.cr.execute("""
+            SELECT s.id, s.name, p.name, s.state, s.next_billing_date, s.price,
+                   CASE WHEN s.next_billing_date IS NULL THEN NULL
+                        ELSE GREATEST(s.next_billing_date - %(effective_date)s, 0) END AS remaining_days
+              FROM subscription_subscription s
+              JOIN res_partner p ON p.id = s.partner_id
+             WHERE s.plan_id = %(plan_id)s
+               AND s.state IN ('active', 'trial')
+               AND COALESCE(s.is_lifetime, FALSE) = FALSE
+             ORDER BY s.id
+        """, {'effective_date': effective_date, 'plan_id': self.id})
+        
+        period_days = self._get_proration_period_days()
+        lines = []
+        total_charge = total_credit = 0.0
+        for sub_id, sub_name, partner_name, state, next_billing_date, price, remaining_days in self.env.cr.fetchall():
+            price = price or 0.0
+            factor = 1.0 if remaining_days is None else remaining_days / period_days
+            amount = self.currency_id.round((target_price - price) * factor)
+            if amount > 0:
+                total_charge += amount
+            else:
+                total_credit -= amount
+            lines.append({
+                'subscription_id': sub_id,
+                'subscription': sub_name,
+                'customer': partner_name,
+                'state': state,
+                'next_billing_date': next_billing_date,
+                'remaining_days': remaining_days,
+                'current_price': price,
+                'new_price': target_price,
+                'proration_amount': amount,
+            })
+        
+        price_delta = sum(target_price - line['current_price'] for line in lines)
+        monthly_factor = (new_plan or self)._get_monthly_price_factor()
+        current_monthly_factor = self._get_monthly_price_factor()
+        mrr_delta = sum(
+            target_price * monthly_factor - line['current_price'] * current_monthly_factor
+            for line in lines
+        )
+        return {
+            'summary': {
+                'affected_count': len(lines),
+                'total_charge': total_charge,
+                'total_credit': total_credit,
+                'net_proration': total_charge - total_credit,
+                'price_delta_per_period': price_delta,
+                'mrr_delta': mrr_delta,
+                'arr_delta': mrr_delta * 12,
+            },
+            'lines': lines,
+        }
+    
     def get_subscription_end_date(self, start_date):
         """Calculate subscription end date based on billing type"""
         self.ensure_one()
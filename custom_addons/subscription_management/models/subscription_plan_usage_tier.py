@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+
+
+class SubscriptionPlanUsageTier(models.Model):
+    """
+    Usage price tier of a plan
+    
+    A tier applies from its from_quantity up to the next tier's. Tiers
+    without usage type apply to every usage type that has no tiers of its own.
+    """
+    _name = 'subscription.plan.usage.tier'
+    _description = 'Subscription Plan Usage Tier'
+    _order = 'plan_id, usage_type, from_quantity'
+    
+    plan_id = fields.Many2one('subscription.plan', 'Plan', required=True,
+                              ondelete='cascade', index=True)
+    usage_type = fields.Char('Usage Type', help='Leave empty to apply to all usage types')
+    from_quantity = fields.Float('From Quantity', required=True, default=0.0)
+    unit_price = fields.Float('Unit Price', required=True, default=0.0)
+    
+    _sql_constraints = [
+        ('plan_type_from_unique', 'UNIQUE(plan_id, usage_type, from_quantity)',
+         'Two tiers of a plan cannot start at the same quantity for the same usage type!'),
+    ]
+    
+    @api.constrains('from_quantity')
+    def _check_from_quantity(self):
+        for tier in self:
+            if tier.from_quantity < 0:
+                raise ValidationError(_('Tier quantities cannot be negative.'))
+    
+    @api.constrains('plan_id', 'usage_type', 'from_quantity')
+    def _check_default_tier_unique(self):
+        """plan_type_from_unique does not cover default tiers: NULL usage types never compare equal"""
+        defaults = self.filtered(lambda t: not t.usage_type)
+        if not defaults:
+            return
+        duplicates = self._read_group(
+            [('plan_id', 'in', defaults.plan_id.ids), ('usage_type', '=', False)],
+            ['plan_id', 'from_quantity'], having=[('__count', '>', 1)],
+        )
+        if duplicates:
+            plan, from_quantity = duplicates[0]
+            raise ValidationError(_(
+                'Plan %s has two default tiers starting at %s.'
+            ) % (plan.name, from_quantity))
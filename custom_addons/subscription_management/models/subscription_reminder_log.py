@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, tools
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class SubscriptionReminderLog(models.Model):
+    """
+    Ledger of reminders sent for subscriptions
+    
+    Lets reminder crons find the subscriptions that still need a reminder
+    with one indexed query instead of scanning chatter message bodies.
+    """
+    _name = 'subscription.reminder.log'
+    _description = 'Subscription Reminder Log'
+    _order = 'sent_at desc, id desc'
+    
+    subscription_id = fields.Many2one('subscription.subscription', 'Subscription',
+                                      required=True, ondelete='cascade', readonly=True)
+    reminder_type = fields.Selection([
+        ('renewal', 'Renewal Reminder'),
+    ], string='Reminder Type', required=True, readonly=True)
+    sent_at = fields.Datetime('Sent At', required=True, default=fields.Datetime.now, readonly=True)
+    
+    def init(self):
+        tools.create_index(
+            self._cr, 'subscription_reminder_log_lookup_idx', self._table,
+            ['subscription_id', 'reminder_type', 'sent_at']
+        )
+    
+    @api.model
+    def _backfill_from_chatter(self):
+        """Seed the ledger with renewal reminders logged in chatter during the last week (install/upgrade)"""
+        self.env.cr.execute("SELECT 1 FROM subscription_reminder_log LIMIT 1")
+        if self.env.cr.fetchone():
+            return
+        
+        self.env['mail.message'].flush_model()
+        self.env.cr.execute("""
+            INSERT INTO subscription_reminder_log
+                (subscription_id, reminder_type, sent_at, create_uid, create_date, write_uid, write_date)
+            SELECT m.res_id, 'renewal', MAX(m.date),
+                   %s, NOW() AT TIME ZONE 'UTC', %s, NOW() AT TIME ZONE 'UTC'
+              FROM mail_message m
+              JOIN subscription_subscription s ON s.id = m.res_id
+             WHERE m.model = 'subscription.subscription'
+               AND m.date > (NOW() AT TIME ZONE 'UTC') - INTERVAL '7 days'
+               AND m.body::text LIKE '%%Renewal reminder sent%%'
+             GROUP BY m.res_id
+        """, (self.env.uid, self.env.uid))
+        _logger.info(f"Backfilled {self.env.cr.rowcount} renewal reminders from chatter")
@@ -2,9 +2,16 @@
 
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError, UserError
+from odoo.osv import expression
+from odoo.tools import split_every
+from odoo.tools.sql import constraint_definition
 from dateutil.relativedelta import relativedelta
 from datetime import datetime, date, timedelta
+from collections import defaultdict
+from contextlib import contextmanager
 import logging
+import psycopg2
+import re
 
 _logger = logging.getLogger(__name__)
 
@@ -91,6 +98,8 @@ class SubscriptionSubscription(models.Model):
     current_usage = fields.Float('Current Usage')
     usage_limit = fields.Float('Usage Limit', related='plan_id.included_usage')
     usage_overage = fields.Float('Usage Overage', compute='_compute_usage_overage')
+    period_usage = fields.Float('Period Usage', compute='_compute_usage_overage',
+                                help='Billable usage since the last invoice, from the daily usage rollup')
     
     # Relations
     line_ids = fields.One2many('subscription.line', 'subscription_id',
@@ -99,7 +108,11 @@ class SubscriptionSubscription(models.Model):
                                 'Usage Records')
     invoice_ids = fields.One2many('account.move', 'subscription_id',
                                   'Invoices')
+    billing_schedule_ids = fields.One2many('subscription.billing.schedule', 'subscription_id',
+                                           'Billing Schedule')
     tag_ids = fields.Many2many('subscription.tag', string='Tags')
+    payment_retry_ids = fields.One2many('subscription.payment.retry', 'subscription_id',
+                                        'Payment Retries')
     
     # ==========================================
     # SEAT MANAGEMENT (BASE - for organizational subscriptions)
@@ -144,14 +157,13 @@ class SubscriptionSubscription(models.Model):
     
     allocated_seat_count = fields.Integer(
         string='Allocated Seats',
-        compute='_compute_seat_counts',
-        store=True,
-        help='Number of seats currently allocated'
+        readonly=True,
+        help='Number of seats currently allocated (maintained by _update_seat_counts)'
     )
     
     available_seat_count = fields.Integer(
         string='Available Seats',
-        compute='_compute_seat_counts',
+        compute='_compute_available_seat_count',
         store=True,
         help='Number of seats still available'
     )
@@ -159,6 +171,7 @@ class SubscriptionSubscription(models.Model):
     seat_utilization = fields.Float(
         string='Seat Utilization %',
         compute='_compute_seat_utilization',
+        store=True,
         help='Percentage of seats currently in use'
     )
     
@@ -305,47 +318,154 @@ class SubscriptionSubscription(models.Model):
         help='Last date grace period email was sent'
     )
     
+    # ==========================================
+    # LIFECYCLE EVENT SCHEDULING
+    # ==========================================
+    
+    next_lifecycle_event_at = fields.Date(
+        string='Next Lifecycle Event',
+        compute='_compute_next_lifecycle_event',
+        store=True,
+        index=True,
+        help='Earliest date a scheduled cron handler has work for this subscription'
+    )
+    
+    next_lifecycle_event_type = fields.Selection([
+        ('trial_expiry', 'Trial Expiry'),
+        ('billing', 'Billing'),
+        ('auto_renew', 'Auto Renewal'),
+        ('expiry', 'Expiry'),
+        ('renewal_reminder', 'Renewal Reminder'),
+        ('billing_reminder', 'Billing Reminder'),
+        ('grace_reminder', 'Grace Reminder'),
+        ('payment_retry', 'Payment Retry'),
+    ], string='Next Lifecycle Event Type',
+       compute='_compute_next_lifecycle_event',
+       store=True)
+    
+    lifecycle_checked_date = fields.Date(
+        string='Lifecycle Events Checked On',
+        readonly=True,
+        copy=False,
+        help='Last date the lifecycle event dispatcher processed this subscription'
+    )
+    
     # SQL Constraints
+    # A partial unique index on (partner_id, plan_id) over running subscriptions,
+    # written as an exclusion constraint so it can carry a WHERE clause
     _sql_constraints = [
         ('unique_active_subscription',
-         'CHECK(1=1)',
+         "EXCLUDE USING btree (partner_id WITH =, plan_id WITH =) WHERE (state IN ('active', 'trial'))",
          'Customer already has an active subscription for this plan!')
     ]
     
+    def init(self):
+        # Odoo skips the constraint with a warning when existing rows violate it
+        if not self._has_unique_active_constraint():
+            self.env.cr.execute("""
+                SELECT partner_id, plan_id, ARRAY_AGG(name ORDER BY id)
+                  FROM subscription_subscription
+                 WHERE state IN ('active', 'trial')
+                 GROUP BY partner_id, plan_id
+                HAVING COUNT(*) > 1
+            """)
+            for partner_id, plan_id, names in self.env.cr.fetchall():
+                _logger.warning(f"Partner {partner_id} has several running subscriptions for plan {plan_id}: "
+                                f"{', '.join(names)}. Close all but one so unique_active_subscription can be added.")
+    
+    def _has_unique_active_constraint(self):
+        return bool(constraint_definition(
+            self.env.cr, self._table, 'subscription_subscription_unique_active_subscription'
+        ))
+    
     @api.constrains('partner_id', 'plan_id', 'state')
-    def _check_duplicate_active_subscription(self):
-        """Prevent duplicate active subscriptions for the same partner and plan"""
-        for subscription in self:
-            if subscription.state in ('active', 'trial'):
+    def _check_duplicate_without_constraint(self):
+        """Fallback for databases where unique_active_subscription could not be added yet"""
+        running = self.filtered(lambda s: s.state in ('active', 'trial'))
+        if not running or self._has_unique_active_constraint():
+            return
+        counts = {
+            (partner.id, plan.id): count
+            for partner, plan, count in self._read_group(
+                [('partner_id', 'in', running.partner_id.ids),
+                 ('plan_id', 'in', running.plan_id.ids),
+                 ('state', 'in', ('active', 'trial'))],
+                ['partner_id', 'plan_id'], ['__count'],
+            )
+        }
+        for subscription in running:
+            if counts.get((subscription.partner_id.id, subscription.plan_id.id), 0) > 1:
                 duplicate = self.search([
                     ('partner_id', '=', subscription.partner_id.id),
                     ('plan_id', '=', subscription.plan_id.id),
                     ('state', 'in', ('active', 'trial')),
-                    ('id', '!=', subscription.id)
+                    ('id', '!=', subscription.id),
                 ], limit=1)
-                
-                if duplicate:
-                    raise ValidationError(_(
-                        'Customer %s already has an active subscription (%s) for plan %s. '
-                        'Please cancel or modify the existing subscription instead.'
-                    ) % (subscription.partner_id.name, duplicate.name, subscription.plan_id.name))
+                raise ValidationError(_(
+                    'Customer %s already has an active subscription (%s) for plan %s. '
+                    'Please cancel or modify the existing subscription instead.'
+                ) % (subscription.partner_id.name, duplicate.name, subscription.plan_id.name))
     
-    @api.model
-    def create(self, vals):
+    @contextmanager
+    def _check_duplicate_active_subscription(self):
+        """Turn violations of unique_active_subscription into a ValidationError naming the duplicate"""
+        try:
+            with self.env.cr.savepoint(flush=False):
+                yield
+        except psycopg2.IntegrityError as e:
+            if e.diag.constraint_name != 'subscription_subscription_unique_active_subscription':
+                raise
+            match = re.search(r'=\((\d+), (\d+)\)', e.diag.message_detail or '')
+            if not match:
+                raise ValidationError(self._sql_constraints[0][2]) from e
+            partner = self.env['res.partner'].browse(int(match.group(1)))
+            plan = self.env['subscription.plan'].browse(int(match.group(2)))
+            duplicate = self.search([
+                ('partner_id', '=', partner.id),
+                ('plan_id', '=', plan.id),
+                ('state', 'in', ('active', 'trial')),
+            ], limit=1)
+            raise ValidationError(_(
+                'Customer %s already has an active subscription (%s) for plan %s. '
+                'Please cancel or modify the existing subscription instead.'
+            ) % (partner.name, duplicate.name, plan.name)) from e
+    
+    @api.model_create_multi
+    def create(self, vals_list):
         """Override create to set dates based on billing type"""
-        if vals.get('name', _('New')) == _('New'):
-            vals['name'] = self.env['ir.sequence'].next_by_code('subscription.subscription') or _('New')
+        for vals in vals_list:
+            if vals.get('name', _('New')) == _('New'):
+                vals['name'] = self.env['ir.sequence'].next_by_code('subscription.subscription') or _('New')
         
-        subscription = super(SubscriptionSubscription, self).create(vals)
+        with self._check_duplicate_active_subscription():
+            subscriptions = super(SubscriptionSubscription, self).create(vals_list)
         
         # Set subscription dates after creation
-        subscription._set_subscription_dates()
+        for subscription in subscriptions:
+            subscription._set_subscription_dates()
+        
+        subscriptions.filtered(lambda s: s.state in ('active', 'trial'))._generate_billing_schedule()
         
-        return subscription
+        self._update_seat_counts(subscriptions.parent_subscription_id.ids)
+        
+        return subscriptions
     
     def write(self, vals):
         """Override write to update dates when plan changes"""
-        result = super(SubscriptionSubscription, self).write(vals)
+        seat_parent_ids = []
+        if {'parent_subscription_id', 'state'} & set(vals):
+            seat_parent_ids = self.parent_subscription_id.ids
+        
+        if {'partner_id', 'plan_id', 'state'} & set(vals):
+            with self._check_duplicate_active_subscription():
+                result = super(SubscriptionSubscription, self).write(vals)
+                self.flush_recordset(['partner_id', 'plan_id', 'state'])
+        else:
+            result = super(SubscriptionSubscription, self).write(vals)
+        
+        # Seats moved, allocated or released
+        if seat_parent_ids or vals.get('parent_subscription_id'):
+            self._update_seat_counts(seat_parent_ids + self.parent_subscription_id.ids)
         
         # If plan changed, recalculate dates
         if 'plan_id' in vals or 'date_start' in vals:
@@ -357,8 +477,115 @@ class SubscriptionSubscription(models.Model):
                             subscription.date_start
                         )
         
+        # Activation, plan and start date changes move the upcoming billing periods
+        if {'plan_id', 'state', 'date_start', 'is_lifetime'} & set(vals):
+            self._generate_billing_schedule()
+        
         return result
     
+    def unlink(self):
+        seat_parent_ids = (self.parent_subscription_id - self).ids
+        result = super().unlink()
+        self._update_seat_counts(seat_parent_ids)
+        return result
+    
+    def _get_metrics_contribution(self):
+        """
+        What this subscription counts for in the metrics snapshots
+        
+        Returns:
+            tuple: (plan_id, company_id, is_active, mrr, seat_count)
+        """
+        self.ensure_one()
+        is_active = self.state == 'active'
+        mrr = self.price * self.plan_id._get_monthly_price_factor() if is_active and self.plan_id else 0.0
+        return (self.plan_id.id, self.company_id.id, is_active, mrr, self.max_seats if is_active else 0)
+    
+    def _generate_billing_schedule(self):
+        """
+        Regenerate the planned billing periods of these subscriptions in bulk
+        
+        Planned periods are replaced with the next N periods from
+        next_billing_date; invoiced periods are kept. Subscriptions that are
+        not running just lose their planned periods.
+        """
+        if not self:
+            return
+        
+        Schedule = self.env['subscription.billing.schedule']
+        Schedule.flush_model()
+        self.env.cr.execute("""
+            DELETE FROM subscription_billing_schedule
+             WHERE subscription_id = ANY(%s) AND state = 'planned'
+        """, (self.ids,))
+        self.env.cr.execute("""
+            SELECT subscription_id, period_start
+              FROM subscription_billing_schedule
+             WHERE subscription_id = ANY(%s)
+        """, (self.ids,))
+        invoiced_periods = set(self.env.cr.fetchall())
+        Schedule.invalidate_model()
+        
+        count = Schedule._get_schedule_length()
+        vals_list = []
+        for subscription in self:
+            if subscription.state not in ('active', 'trial') or subscription.is_lifetime:
+                continue
+            plan = subscription.plan_id
+            for billing_date, period_start, period_end in plan._get_billing_schedule(
+                subscription.next_billing_date, count
+            ):
+                if (subscription.id, period_start) in invoiced_periods:
+                    continue
+                vals_list.append({
+                    'subscription_id': subscription.id,
+                    'plan_id': plan.id,
+                    'billing_date': billing_date,
+                    'period_start': period_start,
+                    'period_end': period_end,
+                    'amount': subscription._get_billing_price(billing_date),
+                })
+        
+        if vals_list:
+            Schedule.create(vals_list)
+    
+    def _mark_billing_schedule_invoiced(self, invoices):
+        """
+        Mark the billed period as invoiced and roll the schedule forward
+        
+        Each invoice bills a single period, so only the earliest due planned
+        period of each subscription is marked. Older periods missed by
+        billing stay uninvoiced and are dropped when the schedule is
+        regenerated from the new next_billing_date.
+        
+        Args:
+            invoices: account.move recordset aligned with self
+        """
+        if not self:
+            return
+        
+        self.env['subscription.billing.schedule'].flush_model()
+        self.env.cr.execute("""
+            UPDATE subscription_billing_schedule AS schedule
+               SET state = 'invoiced',
+                   invoice_id = due.invoice_id,
+                   write_uid = %s,
+                   write_date = NOW() AT TIME ZONE 'UTC'
+              FROM (
+                    SELECT DISTINCT ON (b.subscription_id) b.id, data.invoice_id
+                      FROM subscription_billing_schedule b
+                      JOIN unnest(%s::int[], %s::int[]) AS data(subscription_id, invoice_id)
+                        ON data.subscription_id = b.subscription_id
+                     WHERE b.state = 'planned'
+                       AND b.billing_date <= %s
+                     ORDER BY b.subscription_id, b.billing_date
+                   ) AS due
+             WHERE schedule.id = due.id
+        """, (self.env.uid, self.ids, invoices.ids, fields.Date.today()))
+        self.env['subscription.billing.schedule'].invalidate_model()
+        
+        self._generate_billing_schedule()
+    
     @api.depends('plan_id.trial_period', 'date_start')
     def _compute_trial_end_date(self):
         for subscription in self:
@@ -393,12 +620,102 @@ class SubscriptionSubscription(models.Model):
     
     @api.depends('current_usage', 'usage_limit')
     def _compute_usage_overage(self):
+        period_usage = self._get_period_usage()
         for subscription in self:
+            subscription.period_usage = period_usage.get(subscription.id, 0.0)
             if subscription.usage_limit > 0:
-                subscription.usage_overage = max(0, subscription.current_usage - subscription.usage_limit)
+                subscription.usage_overage = max(0, subscription.period_usage - subscription.usage_limit)
             else:
                 subscription.usage_overage = 0
     
+    def _get_period_usage(self):
+        """
+        Billable usage not invoiced yet for all subscriptions in self
+        
+        Reads the daily usage rollup with one grouped query instead of
+        scanning raw usage records. Days are selected by what was invoiced,
+        not by date, so usage recorded after a billing run for that day or
+        backdated into an invoiced period is billed with the next invoice.
+        
+        Returns:
+            dict: subscription id -> billable quantity
+        """
+        subscription_ids = [sub_id for sub_id in self.ids if isinstance(sub_id, int)]
+        if not subscription_ids:
+            return {}
+        
+        self.env['subscription.usage.rollup'].flush_model()
+        self.env.cr.execute("""
+            SELECT subscription_id, SUM(billable_quantity - invoiced_billable_quantity)
+              FROM subscription_usage_rollup
+             WHERE subscription_id = ANY(%s)
+               AND billable_quantity <> invoiced_billable_quantity
+             GROUP BY subscription_id
+        """, (subscription_ids,))
+        return dict(self.env.cr.fetchall())
+    
+    def _get_period_usage_by_type(self):
+        """
+        Billable usage not invoiced yet per usage type, with one grouped query
+        
+        Returns:
+            dict: (subscription id, usage type) -> billable quantity
+        """
+        subscription_ids = [sub_id for sub_id in self.ids if isinstance(sub_id, int)]
+        if not subscription_ids:
+            return {}
+        
+        self.env['subscription.usage.rollup'].flush_model()
+        self.env.cr.execute("""
+            SELECT subscription_id, usage_type, SUM(billable_quantity - invoiced_billable_quantity)
+              FROM subscription_usage_rollup
+             WHERE subscription_id = ANY(%s)
+               AND billable_quantity <> invoiced_billable_quantity
+             GROUP BY subscription_id, usage_type
+        """, (subscription_ids,))
+        return {(sub_id, usage_type): quantity for sub_id, usage_type, quantity in self.env.cr.fetchall()}
+    
+    def _rate_usage(self):
+        """
+        Rate the current period's usage of all subscriptions in self
+        
+        Usage totals come from one grouped query on the daily rollup and the
+        tier tables of each plan are prepared once for all its subscriptions.
+        Plans with flat usage pricing keep the single overage line.
+        
+        Returns:
+            dict: subscription id -> list of invoice line vals
+        """
+        lines = {}
+        flat = self.filtered(lambda s: s.plan_id.usage_pricing == 'flat')
+        for subscription in flat:
+            overage_line = subscription._prepare_usage_overage_line_vals()
+            if overage_line:
+                lines[subscription.id] = [overage_line]
+        
+        rated = (self - flat).filtered(lambda s: s.plan_id.usage_based)
+        if not rated:
+            return lines
+        
+        tables = {plan.id: plan._get_usage_rating_tables() for plan in rated.plan_id}
+        pricing_labels = dict(self.env['subscription.plan']._fields['usage_pricing'].selection)
+        for (sub_id, usage_type), quantity in sorted(rated._get_period_usage_by_type().items()):
+            plan = self.browse(sub_id).plan_id
+            table = tables[plan.id].get(usage_type) or tables[plan.id].get(False)
+            if not table:
+                continue
+            amount = plan.currency_id.round(plan._rate_usage_quantity(table, quantity))
+            if not amount:
+                continue
+            lines.setdefault(sub_id, []).append({
+                'product_id': plan.product_template_id.product_variant_id.id,
+                'name': f"Usage {usage_type}: {quantity} {plan.usage_unit or ''} "
+                        f"({pricing_labels[plan.usage_pricing]} pricing)",
+                'quantity': 1,
+                'price_unit': amount,
+            })
+        return lines
+    
     @api.depends('invoice_ids')
     def _compute_invoice_count(self):
         for subscription in self:
@@ -419,13 +736,70 @@ class SubscriptionSubscription(models.Model):
         for sub in self:
             sub.is_seat_subscription = bool(sub.parent_subscription_id)
     
-    @api.depends('child_subscription_ids', 'max_seats')
-    def _compute_seat_counts(self):
-        """Calculate allocated and available seat counts"""
+    @api.depends('allocated_seat_count', 'max_seats')
+    def _compute_available_seat_count(self):
+        """Calculate available seats from the allocated seat counter"""
         for sub in self:
-            sub.allocated_seat_count = len(sub.child_subscription_ids)
             sub.available_seat_count = max(0, sub.max_seats - sub.allocated_seat_count)
     
+    @api.model
+    def _update_seat_counts(self, parent_ids):
+        """
+        Recount the allocated seats of these parent subscriptions
+        
+        The parent rows are locked first, so concurrent allocations on the
+        same organization are serialized and the seat limit is checked
+        against an up-to-date counter. Seats are counted with one grouped
+        query; cancelled and expired seats are released.
+        """
+        parent_ids = sorted({parent_id for parent_id in parent_ids if parent_id})
+        if not parent_ids:
+            return
+        
+        self.flush_model(['parent_subscription_id', 'state'])
+        self.env.cr.execute("""
+            SELECT id FROM subscription_subscription
+             WHERE id = ANY(%s)
+             ORDER BY id
+               FOR NO KEY UPDATE
+        """, (parent_ids,))
+        parent_ids = [row[0] for row in self.env.cr.fetchall()]
+        
+        Subscription = self.sudo()
+        seat_counts = {
+            parent.id: count
+            for parent, count in Subscription._read_group(
+                [('parent_subscription_id', 'in', parent_ids),
+                 ('state', 'not in', ('cancelled', 'expired'))],
+                ['parent_subscription_id'], ['__count'],
+            )
+        }
+        
+        # Parents sharing a count are written together
+        ids_by_count = defaultdict(list)
+        for parent in Subscription.browse(parent_ids):
+            count = seat_counts.get(parent.id, 0)
+            if parent.allocated_seat_count != count:
+                ids_by_count[count].append(parent.id)
+        for count, ids in ids_by_count.items():
+            Subscription.browse(ids).write({'allocated_seat_count': count})
+    
+    @api.model
+    def _backfill_seat_counts(self):
+        """Recount the seat counters of every organizational subscription (install/upgrade)"""
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT parent_subscription_id FROM subscription_subscription
+             WHERE parent_subscription_id IS NOT NULL
+             UNION
+            SELECT id FROM subscription_subscription
+             WHERE allocated_seat_count <> 0
+        """)
+        parent_ids = [row[0] for row in self.env.cr.fetchall()]
+        for chunk_ids in split_every(1000, parent_ids):
+            self._update_seat_counts(chunk_ids)
+        _logger.info(f"Recounted seats of {len(parent_ids)} organizational subscriptions")
+    
     @api.depends('allocated_seat_count', 'max_seats')
     def _compute_seat_utilization(self):
         """Calculate seat utilization percentage"""
@@ -599,6 +973,95 @@ class SubscriptionSubscription(models.Model):
                 subscription.days_until_suspension = 0
                 subscription.days_until_termination = 0
     
+    @api.depends('state', 'is_lifetime', 'next_billing_date', 'trial_end_date', 'date_end',
+                 'plan_id.auto_renew', 'plan_id.billing_type', 'plan_id.billing_period',
+                 'payment_retry_date', 'payment_retry_count', 'is_in_grace_period',
+                 'grace_period_start_date', 'last_grace_email_date', 'lifecycle_checked_date')
+    def _compute_next_lifecycle_event(self):
+        """Earliest pending lifecycle event, used by the dispatcher cron index range"""
+        for subscription in self:
+            events = [event for event in subscription._get_lifecycle_events() if event[1]]
+            if events:
+                event_type, event_date = min(events, key=lambda event: event[1])
+                subscription.next_lifecycle_event_at = event_date
+                subscription.next_lifecycle_event_type = event_type
+            else:
+                subscription.next_lifecycle_event_at = False
+                subscription.next_lifecycle_event_type = False
+    
+    def _get_lifecycle_events(self):
+        """
+        Pending lifecycle events of this subscription
+        
+        Events that stay pending until their handler changes the subscription
+        (billing, trial activation, expiry, auto-renew, grace reminders) keep
+        their date. One-off and repeating notices are skipped, or moved to the
+        next day, once the dispatcher has processed them (lifecycle_checked_date).
+        
+        Returns:
+            list: (event_type, date or False) tuples
+        """
+        self.ensure_one()
+        checked = self.lifecycle_checked_date
+        
+        def notice(event_date, repeat_until=None):
+            if not event_date or not checked or event_date > checked:
+                return event_date
+            if repeat_until and checked < repeat_until:
+                return checked + timedelta(days=1)
+            return False
+        
+        events = []
+        if self.is_lifetime:
+            return events
+        
+        if self.state in ('active', 'trial'):
+            events.append(('billing', self.next_billing_date))
+            if self.date_end:
+                events.append(('renewal_reminder', notice(self.get_renewal_date(), repeat_until=self.date_end)))
+            if self.payment_retry_date and 0 < self.payment_retry_count < 3:
+                events.append(('payment_retry', notice(self.payment_retry_date)))
+        
+        if self.state == 'trial' and self.trial_end_date:
+            trial_notice = notice(self.trial_end_date - timedelta(days=1))
+            events.append(('trial_expiry', min(trial_notice or self.trial_end_date, self.trial_end_date)))
+        
+        if self.state == 'active':
+            if self.next_billing_date:
+                events.append(('billing_reminder', notice(self.next_billing_date - timedelta(days=3))))
+            if self.date_end and self.plan_id.auto_renew:
+                events.append(('auto_renew', self.date_end - timedelta(days=7)))
+            if self.is_in_grace_period:
+                events.append(('grace_reminder', self._get_next_grace_reminder_date()))
+        
+        if self.state in ('active', 'suspended') and self.date_end:
+            events.append(('expiry', self.date_end))
+        
+        return events
+    
+    def _get_next_grace_reminder_date(self):
+        """Date the next grace reminder is due, following the configured frequency"""
+        self.ensure_one()
+        if not self.last_grace_email_date:
+            return self.grace_period_start_date or self.paid_through_date
+        
+        frequency = self.env['ir.config_parameter'].sudo().get_param(
+            'subscription.grace_email_frequency', 'weekly'
+        )
+        if frequency == 'daily':
+            return self.last_grace_email_date + timedelta(days=1)
+        elif frequency == 'weekly':
+            return self.last_grace_email_date + timedelta(days=7)
+        return False
+    
+    @api.model
+    def _recompute_grace_reminders(self):
+        """Reschedule the next lifecycle event of subscriptions in grace period (grace email frequency changed)"""
+        subscriptions = self.search([('is_in_grace_period', '=', True)])
+        for field_name in ('next_lifecycle_event_at', 'next_lifecycle_event_type'):
+            self.env.add_to_compute(self._fields[field_name], subscriptions)
+        subscriptions.flush_recordset(['next_lifecycle_event_at', 'next_lifecycle_event_type'])
+    
     @api.onchange('plan_id', 'date_start')
     def _onchange_plan_set_end_date(self):
         """Automatically set end date when plan or start date changes"""
@@ -924,23 +1387,23 @@ class SubscriptionSubscription(models.Model):
         """Manually retry payment for failed invoices"""
         self.ensure_one()
         
-        for invoice in self.failed_invoice_ids:
-            if invoice.state == 'posted' and invoice.payment_state == 'not_paid':
-                _logger.info(f"Manual payment retry requested for invoice {invoice.name}")
-                
-                # Create activity for follow-up
-                self.activity_schedule(
-                    'mail.mail_activity_data_todo',
-                    summary=f'Follow up on payment for {invoice.name}',
-                    user_id=self.env.user.id
-                )
+        retries = self.env['subscription.payment.retry']._enqueue_invoices(
+            self.failed_invoice_ids, immediate=True
+        )
+        if retries:
+            _logger.info(f"Manual payment retry queued for invoices {', '.join(retries.invoice_id.mapped('name'))}")
+            cron = self.env.ref('subscription_management.cron_subscription_payment_retry_queue',
+                                raise_if_not_found=False)
+            if cron:
+                cron._trigger()
         
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
             'params': {
                 'title': _('Payment Retry'),
-                'message': _('Payment retry has been initiated. Please follow up manually.'),
+                'message': _('Payment retry has been queued for %s invoice(s).', len(retries))
+                           if retries else _('No unpaid invoice to retry, or a retry is already queued.'),
                 'type': 'info',
                 'sticky': False,
             }
@@ -956,6 +1419,7 @@ class SubscriptionSubscription(models.Model):
         
         self.last_invoice_id = invoice.id
         self.last_invoice_date = fields.Date.today()
+        self._mark_billing_schedule_invoiced(invoice)
         
         return invoice
     
@@ -971,10 +1435,23 @@ class SubscriptionSubscription(models.Model):
                 'product_id': self.plan_id.product_template_id.product_variant_id.id,
                 'name': f"Subscription: {self.plan_id.name}",
                 'quantity': 1,
-                'price_unit': self.plan_id.trial_price if self.state == 'trial' else self.plan_id.price,
+                'price_unit': self._get_billing_price(),
             })],
         }
     
+    def _get_billing_price(self, billing_date=None):
+        """
+        Price of the plan line of an invoice
+        
+        Trial subscriptions are billed the trial price. For a future billing
+        date that only holds while it is not past the end of the trial.
+        """
+        self.ensure_one()
+        in_trial = self.state == 'trial' and not (
+            billing_date and self.trial_end_date and billing_date > self.trial_end_date
+        )
+        return self.plan_id.trial_price if in_trial else self.plan_id.price
+    
     def add_usage(self, usage_type, quantity, description=None, price_unit=0.0):
         """Add usage record to subscription"""
         self.ensure_one()
@@ -988,10 +1465,33 @@ class SubscriptionSubscription(models.Model):
         usage = self.env['subscription.usage'].create(usage_vals)
         
         # Update current usage
-        self.current_usage += quantity
+        self._increment_current_usage({self.id: quantity})
         
         return usage
     
+    @api.model
+    def _increment_current_usage(self, quantities):
+        """
+        Atomically add usage quantities to current_usage
+        
+        A single UPDATE increments the column in the database instead of a
+        read-modify-write, so concurrent usage reports are never lost.
+        
+        Args:
+            quantities: dict mapping subscription id to quantity to add
+        """
+        if not quantities:
+            return
+        
+        self.flush_model(['current_usage'])
+        self.env.cr.execute("""
+            UPDATE subscription_subscription s
+               SET current_usage = COALESCE(s.current_usage, 0) + d.quantity
+              FROM unnest(%s::int[], %s::float8[]) AS d(id, quantity)
+             WHERE s.id = d.id
+        """, (list(quantities.keys()), list(quantities.values())))
+        self.browse(list(quantities.keys())).invalidate_recordset(['current_usage'])
+    
     # ==========================================
     # Payment Failure & Dunning Methods
     # ==========================================
@@ -1100,10 +1600,9 @@ class SubscriptionSubscription(models.Model):
             ('grace_period_end_date', '>=', today),
         ])
         
-        for subscription in entering_grace:
-            subscription.action_enter_grace_period()
+        moved = entering_grace._run_lifecycle_transition('grace')
         
-        _logger.info(f"Processed {len(entering_grace)} subscriptions entering grace period")
+        _logger.info(f"Processed {moved} subscriptions entering grace period")
         
         # Send reminders for subscriptions in grace period
         send_reminders = self.env['ir.config_parameter'].sudo().get_param(
@@ -1124,10 +1623,9 @@ class SubscriptionSubscription(models.Model):
             ('actual_suspend_date', '=', False),
         ])
         
-        for subscription in to_suspend:
-            subscription.action_suspend_from_grace()
+        moved = to_suspend._run_lifecycle_transition('suspend')
         
-        _logger.info(f"Suspended {len(to_suspend)} subscriptions after grace period")
+        _logger.info(f"Suspended {moved} subscriptions after grace period")
     
     @api.model
     def _cron_process_terminations(self):
@@ -1141,10 +1639,109 @@ class SubscriptionSubscription(models.Model):
             ('actual_terminate_date', '=', False),
         ])
         
-        for subscription in to_terminate:
-            subscription.action_terminate_from_suspension()
+        moved = to_terminate._run_lifecycle_transition('terminate')
         
-        _logger.info(f"Terminated {len(to_terminate)} subscriptions after suspension period")
+        _logger.info(f"Terminated {moved} subscriptions after suspension period")
+    
+    # ==========================================
+    # SET-BASED LIFECYCLE TRANSITIONS
+    # ==========================================
+    
+    def _run_lifecycle_transition(self, transition):
+        """
+        Apply a lifecycle transition to self chunk by chunk, committing each chunk
+        
+        Args:
+            transition: 'grace', 'suspend' or 'terminate'
+            
+        Returns:
+            int: Number of subscriptions moved
+        """
+        batch_size = int(self.env['ir.config_parameter'].sudo().get_param(
+            'subscription.lifecycle_batch_size', '1000'
+        ))
+        
+        moved = 0
+        for chunk_ids in split_every(batch_size, self.ids):
+            try:
+                with self.env.cr.savepoint():
+                    moved += self.browse(chunk_ids)._apply_lifecycle_transition(transition)
+            except Exception as e:
+                _logger.error(f"Lifecycle transition '{transition}' failed for chunk starting at "
+                              f"subscription id {chunk_ids[0]}: {e}")
+            self._cron_commit()
+        
+        return moved
+    
+    def _apply_lifecycle_transition(self, transition):
+        """
+        Set-based counterpart of action_enter_grace_period,
+        action_suspend_from_grace and action_terminate_from_suspension
+        
+        Moves all eligible subscriptions in self with one write, so dependent
+        lifecycle fields are recomputed once for the batch, then logs chatter
+        messages and queues emails in batch.
+        
+        Returns:
+            int: Number of subscriptions moved
+        """
+        source_state = 'suspended' if transition == 'terminate' else 'active'
+        subscriptions = self.filtered(lambda s: s.state == source_state)
+        if transition == 'grace':
+            subscriptions = subscriptions.filtered(lambda s: not s.is_in_grace_period)
+        if not subscriptions:
+            return 0
+        
+        today = fields.Date.today()
+        vals = {
+            'grace': {'grace_period_start_date': today},
+            'suspend': {'state': 'suspended', 'actual_suspend_date': today},
+            'terminate': {'state': 'expired', 'actual_terminate_date': today},
+        }[transition]
+        
+        template = subscriptions._get_lifecycle_email_template(transition)
+        if transition == 'suspend':
+            send_email = self.env['ir.config_parameter'].sudo().get_param(
+                'subscription.suspend_send_email', 'True'
+            )
+            if send_email != 'True':
+                template = None
+        if template and transition == 'grace':
+            vals['last_grace_email_date'] = today
+        
+        subscriptions.write(vals)
+        subscriptions._after_lifecycle_transition(transition)
+        
+        if template:
+            try:
+                template.send_mail_batch(subscriptions.ids, force_send=False)
+            except Exception as e:
+                _logger.error(f"Failed to queue '{transition}' emails for {len(subscriptions)} subscriptions: {e}")
+        
+        messages = {
+            'grace': lambda s: f"Entered grace period. Grace ends on {s.grace_period_end_date}",
+            'suspend': lambda s: f"Suspended after grace period ended. Suspension ends on {s.suspend_end_date}",
+            'terminate': lambda s: "Subscription terminated after suspension period ended.",
+        }[transition]
+        subscriptions._message_log_batch(
+            bodies={subscription.id: messages(subscription) for subscription in subscriptions},
+            message_type='notification',
+        )
+        
+        return len(subscriptions)
+    
+    def _after_lifecycle_transition(self, transition):
+        """Hook called with the subscriptions moved by a set-based lifecycle transition"""
+        return
+    
+    def _get_lifecycle_email_template(self, transition):
+        """Email template sent for a lifecycle transition ('grace', 'suspend', 'terminate')"""
+        template_map = {
+            'grace': 'subscription_management.email_template_grace_period',
+            'suspend': 'subscription_management.email_template_suspended_from_grace',
+            'terminate': 'subscription_management.email_template_terminated',
+        }
+        return self.env.ref(template_map[transition], raise_if_not_found=False)
     
     @api.model
     def _send_grace_reminders(self):
@@ -1171,26 +1768,25 @@ class SubscriptionSubscription(models.Model):
             domain.append(('last_grace_email_date', '=', False))
             domain.append(('last_grace_email_date', '<', today))
         
-        subscriptions = self.search(domain)
+        subscriptions = self._search_lifecycle_candidates(domain)
         
         template = self.env.ref(
             'subscription_management.email_template_grace_reminder',
             raise_if_not_found=False
         )
         
-        if template:
-            for subscription in subscriptions:
-                template.send_mail(subscription.id, force_send=False)
-                subscription.last_grace_email_date = today
+        if template and subscriptions:
+            template.send_mail_batch(subscriptions.ids, force_send=False)
+            subscriptions.write({'last_grace_email_date': today})
         
         _logger.info(f"Sent grace reminders to {len(subscriptions)} subscriptions")
     
     @api.model
     def _cron_retry_failed_payments(self):
-        """Cron job to retry failed payments"""
+        """Cron job to retry failed payments through the payment retry queue"""
         today = fields.Date.today()
         
-        subscriptions = self.search([
+        subscriptions = self._search_lifecycle_candidates([
             ('payment_retry_date', '<=', today),
             ('payment_retry_count', '>', 0),
             ('payment_retry_count', '<', 3),
@@ -1199,78 +1795,102 @@ class SubscriptionSubscription(models.Model):
         
         _logger.info(f"Retrying payments for {len(subscriptions)} subscriptions")
         
-        for subscription in subscriptions:
-            try:
-                failed_invoice = subscription.failed_invoice_ids[:1]
-                if failed_invoice:
-                    _logger.info(f"Retrying payment for subscription {subscription.name}, invoice {failed_invoice.name}")
-                    
-            except Exception as e:
-                _logger.error(f"Error retrying payment for subscription {subscription.name}: {e}")
+        Retry = self.env['subscription.payment.retry']
+        Retry._enqueue_invoices(subscriptions.failed_invoice_ids, immediate=True)
+        return Retry._process_due_retries()
     
     @api.model
     def _cron_check_renewals(self):
         """Check for subscriptions that need renewal and send reminders"""
         today = fields.Date.today()
         
-        subscriptions = self.search([
+        # Renewal is offered at most 2 months before date_end (see get_renewal_date)
+        subscriptions = self._search_lifecycle_candidates([
             ('state', 'in', ['active', 'trial']),
             ('date_end', '!=', False),
+            ('date_end', '<=', today + relativedelta(months=2)),
             ('is_lifetime', '=', False),  # NEW: Skip lifetime subscriptions
         ])
         
-        renewal_count = 0
-        reminder_count = 0
+        # One indexed ledger lookup instead of scanning chatter per subscription
+        reminded_ids = subscriptions._get_recently_reminded_ids('renewal', today - relativedelta(days=6))
+        due = subscriptions.filtered(
+            lambda s: s.id not in reminded_ids and s.should_offer_renewal()
+        )
+        if not due:
+            _logger.info("Renewal check completed: 0 subscriptions due for renewal, 0 reminders sent")
+            return
         
-        for subscription in subscriptions:
+        # Only subscriptions whose reminder was actually queued are logged,
+        # the others are picked up again by the next run
+        reminded = self.browse()
+        template = self.env.ref(
+            'subscription_management.email_template_subscription_renewal_reminder',
+            raise_if_not_found=False
+        )
+        if template:
             try:
-                if subscription.should_offer_renewal():
-                    last_message = subscription.message_ids.filtered(
-                        lambda m: 'Renewal reminder sent' in (m.body or '')
-                    )[:1]
-                    
-                    send_reminder = True
-                    if last_message:
-                        days_since_last = (today - last_message.date.date()).days
-                        if days_since_last < 7:
-                            send_reminder = False
-                    
-                    if send_reminder:
-                        template = self.env.ref(
-                            'subscription_management.email_template_subscription_renewal_reminder',
-                            raise_if_not_found=False
-                        )
-                        if template:
-                            template.send_mail(subscription.id, force_send=False)
-                            subscription.message_post(
-                                body=f"Renewal reminder sent for subscription ending on {subscription.date_end}",
-                                message_type='notification'
-                            )
-                            reminder_count += 1
-                        
-                        subscription.activity_schedule(
-                            'mail.mail_activity_data_call',
-                            summary=f'Follow up on renewal for {subscription.partner_id.name}',
-                            note=f'Subscription {subscription.name} is due for renewal on {subscription.date_end}. Contact customer to confirm renewal.',
-                            date_deadline=subscription.date_end - relativedelta(days=3),
-                            user_id=self.env.ref('base.user_admin').id
-                        )
-                        renewal_count += 1
-                        
+                with self.env.cr.savepoint():
+                    template.send_mail_batch(due.ids, force_send=False)
+                    due._message_log_batch(
+                        bodies={
+                            subscription.id: f"Renewal reminder sent for subscription ending on {subscription.date_end}"
+                            for subscription in due
+                        },
+                        message_type='notification',
+                    )
+                reminded = due
             except Exception as e:
-                _logger.error(f"Error checking renewal for subscription {subscription.name}: {e}")
-        
-        _logger.info(f"Renewal check completed: {renewal_count} subscriptions due for renewal, {reminder_count} reminders sent")
+                _logger.error(f"Failed to queue renewal reminders for {len(due)} subscriptions: {e}")
+        else:
+            _logger.warning("Renewal reminder template not found, no reminders queued")
+        
+        activity_type = self.env.ref('mail.mail_activity_data_call', raise_if_not_found=False)
+        if activity_type:
+            res_model_id = self.env['ir.model']._get_id(self._name)
+            user_id = self.env.ref('base.user_admin').id
+            self.env['mail.activity'].create([{
+                'res_model_id': res_model_id,
+                'res_id': subscription.id,
+                'activity_type_id': activity_type.id,
+                'summary': f'Follow up on renewal for {subscription.partner_id.name}',
+                'note': f'Subscription {subscription.name} is due for renewal on {subscription.date_end}. Contact customer to confirm renewal.',
+                'date_deadline': subscription.date_end - relativedelta(days=3),
+                'user_id': user_id,
+            } for subscription in due])
+        
+        self.env['subscription.reminder.log'].create([{
+            'subscription_id': subscription.id,
+            'reminder_type': 'renewal',
+        } for subscription in reminded])
+        
+        _logger.info(f"Renewal check completed: {len(due)} subscriptions due for renewal, {len(reminded)} reminders sent")
+    
+    def _get_recently_reminded_ids(self, reminder_type, since_date):
+        """Return the ids of these subscriptions with a reminder of this type logged on or after since_date"""
+        if not self:
+            return set()
+        self.env['subscription.reminder.log'].flush_model()
+        self.env.cr.execute("""
+            SELECT DISTINCT subscription_id
+              FROM subscription_reminder_log
+             WHERE subscription_id = ANY(%s)
+               AND reminder_type = %s
+               AND sent_at >= %s
+        """, (self.ids, reminder_type, since_date))
+        return {row[0] for row in self.env.cr.fetchall()}
     
     @api.model
     def _cron_process_billing(self):
         """Process billing for subscriptions due today"""
-        today = fields.Date.today()
-        subscriptions = self.search([
-            ('state', 'in', ['active', 'trial']),
-            ('next_billing_date', '<=', today),
-            ('is_lifetime', '=', False),  # NEW: Skip lifetime subscriptions
-        ])
+        # Batch mode invoices whole chunks at once (see _cron_process_billing_batch)
+        batch_mode = self.env['ir.config_parameter'].sudo().get_param(
+            'subscription.billing_batch_mode', 'False'
+        )
+        if batch_mode == 'True':
+            return self._cron_process_billing_batch()
+        
+        subscriptions = self._search_lifecycle_candidates(self._get_billing_due_domain())
         
         _logger.info(f"Processing billing for {len(subscriptions)} subscriptions")
         
@@ -1280,29 +1900,179 @@ class SubscriptionSubscription(models.Model):
             except Exception as e:
                 _logger.error(f"Error processing billing for subscription {subscription.name}: {e}")
     
-    def _process_billing(self):
-        """Process billing for this subscription"""
-        self.ensure_one()
+    @api.model
+    def _get_billing_due_domain(self):
+        """Domain of subscriptions due for billing today"""
+        return [
+            ('state', 'in', ['active', 'trial']),
+            ('next_billing_date', '<=', fields.Date.today()),
+            ('is_lifetime', '=', False),  # Skip lifetime subscriptions
+        ]
+    
+    @api.model
+    def _cron_process_billing_batch(self, batch_size=None):
+        """
+        Set-based billing for subscriptions due today
+        
+        Due subscriptions are invoiced chunk by chunk: one account.move
+        multi-create and one bulk post per chunk, followed by a commit and a
+        checkpoint so an interrupted run resumes after the last committed chunk.
+        Invoice emails are queued for the mail queue instead of sent inline.
+        
+        Returns:
+            int: Number of invoices created
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        today = fields.Date.today()
         
-        if self.state not in ('active', 'trial'):
-            return
+        if not batch_size:
+            batch_size = int(ICP.get_param('subscription.billing_batch_size', '500'))
         
-        invoice_vals = self._prepare_invoice_vals()
+        # Resume today's run after the last committed chunk
+        last_id = 0
+        checkpoint = ICP.get_param('subscription.billing_checkpoint', '')
+        if checkpoint:
+            checkpoint_date, _sep, checkpoint_id = checkpoint.partition(':')
+            if checkpoint_date == str(today) and checkpoint_id.isdigit():
+                last_id = int(checkpoint_id)
+        
+        subscription_ids = self._search_lifecycle_candidates(
+            self._get_billing_due_domain() + [('id', '>', last_id)],
+            order='id'
+        ).ids
+        
+        _logger.info(f"Batch billing {len(subscription_ids)} subscriptions "
+                     f"in chunks of {batch_size} (resuming after id {last_id})")
+        
+        invoice_count = 0
+        for chunk_ids in split_every(batch_size, subscription_ids):
+            chunk = self.browse(chunk_ids)
+            try:
+                with self.env.cr.savepoint():
+                    invoices = chunk._process_billing_batch()
+            except Exception as e:
+                # Isolate the failing subscriptions instead of losing the whole chunk
+                _logger.error(f"Batch billing failed for chunk starting at subscription id "
+                              f"{chunk_ids[0]}, retrying one by one: {e}")
+                invoices = self.env['account.move']
+                for subscription in chunk:
+                    try:
+                        with self.env.cr.savepoint():
+                            invoices |= subscription._process_billing_batch()
+                    except Exception as e:
+                        _logger.error(f"Error processing billing for subscription {subscription.name}: {e}")
+            
+            invoice_count += len(invoices)
+            ICP.set_param('subscription.billing_checkpoint', f"{today}:{chunk_ids[-1]}")
+            self._cron_commit()
+        
+        # Run completed, the next run starts from scratch
+        ICP.set_param('subscription.billing_checkpoint', '')
+        
+        _logger.info(f"Batch billing completed: {invoice_count} invoices created")
+        return invoice_count
+    
+    def _process_billing_batch(self):
+        """
+        Batch counterpart of _process_billing for a chunk of subscriptions
+        
+        Returns:
+            account.move: The created invoices
+        """
+        subscriptions = self.filtered(lambda s: s.state in ('active', 'trial'))
+        if not subscriptions:
+            return self.env['account.move']
+        
+        Rollup = self.env['subscription.usage.rollup']
+        rollup_ids = Rollup._lock_uninvoiced(subscriptions.ids)
+        usage_lines = subscriptions._rate_usage()
+        vals_list = []
+        for subscription in subscriptions:
+            invoice_vals = subscription._prepare_invoice_vals()
+            for usage_line in usage_lines.get(subscription.id, []):
+                invoice_vals['invoice_line_ids'].append((0, 0, usage_line))
+            vals_list.append(invoice_vals)
+        
+        invoices = self.env['account.move'].create(vals_list)
+        
+        for subscription, invoice in zip(subscriptions, invoices):
+            subscription.last_invoice_id = invoice
+        subscriptions.write({'last_invoice_date': fields.Date.today()})
+        subscriptions._mark_billing_schedule_invoiced(invoices)
+        Rollup._mark_invoiced(rollup_ids)
+        
+        # Reset usage for next period
+        usage_based = subscriptions.filtered(lambda s: s.plan_id.usage_based)
+        if usage_based:
+            usage_based.write({'current_usage': 0})
+        
+        # Post all invoices at once, fall back to one by one if any fails
+        try:
+            with self.env.cr.savepoint():
+                invoices.action_post()
+        except Exception as e:
+            _logger.warning(f"Bulk posting of {len(invoices)} invoices failed, posting individually: {e}")
+            for invoice in invoices:
+                try:
+                    with self.env.cr.savepoint():
+                        invoice.action_post()
+                except Exception as e:
+                    _logger.warning(f"Could not auto-post invoice {invoice.name}: {e}")
+        
+        self._queue_invoice_emails(invoices)
+        
+        return invoices
+    
+    def _prepare_usage_overage_line_vals(self):
+        """Prepare the usage overage invoice line, or None if nothing to bill"""
+        self.ensure_one()
         
-        # Add usage overage if applicable
         if self.usage_overage > 0 and self.plan_id.usage_price > 0:
-            overage_line = {
+            return {
                 'product_id': self.plan_id.product_template_id.product_variant_id.id,
                 'name': f"Usage overage: {self.usage_overage} {self.plan_id.usage_unit}",
                 'quantity': self.usage_overage,
                 'price_unit': self.plan_id.usage_price,
             }
-            invoice_vals['invoice_line_ids'].append((0, 0, overage_line))
+        return None
+    
+    @api.model
+    def _queue_invoice_emails(self, invoices):
+        """Queue invoice emails for the mail queue cron instead of sending inline"""
+        template = self.env.ref('account.email_template_edi_invoice', raise_if_not_found=False)
+        if template and invoices:
+            try:
+                template.send_mail_batch(invoices.ids, force_send=False)
+            except Exception as e:
+                _logger.error(f"Failed to queue invoice emails for {len(invoices)} invoices: {e}")
+    
+    @api.model
+    def _cron_commit(self):
+        """Commit the progress of a long-running cron (no-op in test mode and benchmark runs)"""
+        if not self.env.registry.in_test_mode() and not self.env.context.get('subscription_benchmark'):
+            self.env.cr.commit()
+    
+    def _process_billing(self):
+        """Process billing for this subscription"""
+        self.ensure_one()
+        
+        if self.state not in ('active', 'trial'):
+            return
+        
+        invoice_vals = self._prepare_invoice_vals()
+        
+        # Add usage charges if applicable
+        Rollup = self.env['subscription.usage.rollup']
+        rollup_ids = Rollup._lock_uninvoiced(self.ids)
+        for usage_line in self._rate_usage().get(self.id, []):
+            invoice_vals['invoice_line_ids'].append((0, 0, usage_line))
         
         invoice = self.env['account.move'].create(invoice_vals)
         
         self.last_invoice_id = invoice.id
         self.last_invoice_date = fields.Date.today()
+        self._mark_billing_schedule_invoiced(invoice)
+        Rollup._mark_invoiced(rollup_ids)
         
         # Reset usage for next period
         if self.plan_id.usage_based:
@@ -1334,7 +2104,7 @@ class SubscriptionSubscription(models.Model):
         today = fields.Date.today()
         tomorrow = today + relativedelta(days=1)
         
-        trials_expiring = self.search([
+        trials_expiring = self._search_lifecycle_candidates([
             ('state', '=', 'trial'),
             ('trial_end_date', '=', tomorrow)
         ])
@@ -1348,7 +2118,7 @@ class SubscriptionSubscription(models.Model):
                 except Exception as e:
                     _logger.error(f"Failed to send trial expiry email for {subscription.name}: {e}")
         
-        trials_expired = self.search([
+        trials_expired = self._search_lifecycle_candidates([
             ('state', '=', 'trial'),
             ('trial_end_date', '<=', today)
         ])
@@ -1362,7 +2132,7 @@ class SubscriptionSubscription(models.Model):
         """Check for subscriptions that have expired - skip lifetime"""
         today = fields.Date.today()
         
-        expired_subscriptions = self.search([
+        expired_subscriptions = self._search_lifecycle_candidates([
             ('state', 'in', ['active', 'suspended']),
             ('date_end', '<=', today),
             ('date_end', '!=', False),
@@ -1378,7 +2148,7 @@ class SubscriptionSubscription(models.Model):
         today = fields.Date.today()
         renew_date = today + relativedelta(days=7)
         
-        subscriptions_to_renew = self.search([
+        subscriptions_to_renew = self._search_lifecycle_candidates([
             ('state', '=', 'active'),
             ('date_end', '<=', renew_date),
             ('date_end', '!=', False),
@@ -1395,7 +2165,7 @@ class SubscriptionSubscription(models.Model):
         today = fields.Date.today()
         reminder_date = today + relativedelta(days=3)
         
-        subscriptions = self.search([
+        subscriptions = self._search_lifecycle_candidates([
             ('state', '=', 'active'),
             ('next_billing_date', '=', reminder_date),
             ('is_lifetime', '=', False),  # NEW: Skip lifetime subscriptions
@@ -1418,6 +2188,77 @@ class SubscriptionSubscription(models.Model):
         for subscription in active_subscriptions:
             pass
     
+    # ==========================================
+    # LIFECYCLE EVENT DISPATCHER
+    # ==========================================
+    
+    @api.model
+    def _search_lifecycle_candidates(self, domain, **kwargs):
+        """Search for a cron handler, restricted to the dispatcher's due subscriptions if any"""
+        candidate_ids = self.env.context.get('lifecycle_event_ids')
+        if candidate_ids is not None:
+            domain = expression.AND([domain, [('id', 'in', candidate_ids)]])
+        return self.search(domain, **kwargs)
+    
+    @api.model
+    def _get_lifecycle_event_handlers(self):
+        """Cron handler for each lifecycle event type, in execution order"""
+        return [
+            ('trial_expiry', '_cron_check_trial_expiry'),
+            ('billing', '_cron_process_billing'),
+            ('auto_renew', '_cron_auto_renew'),
+            ('expiry', '_cron_check_expiry'),
+            ('renewal_reminder', '_cron_check_renewals'),
+            ('billing_reminder', '_cron_send_billing_reminders'),
+            ('grace_reminder', '_send_grace_reminders'),
+            ('payment_retry', '_cron_retry_failed_payments'),
+        ]
+    
+    @api.model
+    def _cron_dispatch_lifecycle_events(self):
+        """
+        Single scheduler for the subscription lifecycle crons
+        
+        Pulls only the subscriptions whose next_lifecycle_event_at is due
+        (index range scan) and routes them to the existing cron handlers,
+        each restricted to the subscriptions that have that event due.
+        """
+        today = fields.Date.today()
+        due = self.search([('next_lifecycle_event_at', '<=', today)])
+        
+        ids_by_type = defaultdict(list)
+        for subscription in due:
+            for event_type, event_date in subscription._get_lifecycle_events():
+                if event_date and event_date <= today:
+                    ids_by_type[event_type].append(subscription.id)
+        
+        _logger.info(f"Dispatching lifecycle events for {len(due)} subscriptions: "
+                     f"{ {event_type: len(ids) for event_type, ids in ids_by_type.items()} }")
+        
+        failed_ids = set()
+        for event_type, handler in self._get_lifecycle_event_handlers():
+            candidate_ids = ids_by_type.get(event_type)
+            if not candidate_ids:
+                continue
+            try:
+                getattr(self.with_context(lifecycle_event_ids=candidate_ids), handler)()
+                self._cron_commit()
+            except Exception as e:
+                _logger.error(f"Lifecycle event handler {handler} failed: {e}")
+                if not self.env.registry.in_test_mode():
+                    self.env.cr.rollback()
+                # Their work was rolled back, their notices must stay due
+                failed_ids.update(candidate_ids)
+        
+        # Mark processed so one-off notices move past today, leaving rows
+        # already stamped untouched (write_date drives the metrics pass)
+        processed = due.exists().filtered(
+            lambda s: s.id not in failed_ids and s.lifecycle_checked_date != today
+        )
+        for chunk_ids in split_every(1000, processed.ids):
+            self.browse(chunk_ids).write({'lifecycle_checked_date': today})
+            self._cron_commit()
+    
     def _get_portal_return_action(self):
         """Return the action to display when returning from payment"""
         return {
@@ -23,4 +23,154 @@ class SubscriptionUsage(models.Model):
     @api.depends('quantity', 'price_unit')
     def _compute_price_total(self):
         for usage in self:
-            usage.price_total = usage.quantity * usage.price_unit
\ No newline at end of file
+            usage.price_total = usage.quantity * usage.price_unit
+    
+    # ==========================================
+    # DAILY ROLLUP MAINTENANCE
+    # ==========================================
+    
+    _ROLLUP_FIELDS = ('subscription_id', 'usage_type', 'date', 'quantity', 'price_unit', 'billable')
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        usages = super().create(vals_list)
+        usages._update_usage_rollup(sign=1)
+        return usages
+    
+    def write(self, vals):
+        track = not self.env.context.get('skip_usage_rollup') and any(
+            field in vals for field in self._ROLLUP_FIELDS
+        )
+        if track:
+            self._update_usage_rollup(sign=-1)
+        result = super().write(vals)
+        if track:
+            self._update_usage_rollup(sign=1)
+        return result
+    
+    def unlink(self):
+        self._update_usage_rollup(sign=-1)
+        return super().unlink()
+    
+    def _update_usage_rollup(self, sign):
+        """Add (sign=1) or remove (sign=-1) these records from the daily rollup"""
+        if self.env.context.get('skip_usage_rollup') or not self:
+            return
+        
+        deltas = {}
+        for usage in self:
+            key = (usage.subscription_id.id, usage.usage_type, usage.date)
+            delta = deltas.setdefault(key, [0.0, 0.0, 0.0, 0.0, 0])
+            delta[0] += sign * usage.quantity
+            delta[1] += sign * usage.price_total
+            if usage.billable:
+                delta[2] += sign * usage.quantity
+                delta[3] += sign * usage.price_total
+            delta[4] += sign
+        
+        self.env['subscription.usage.rollup'].sudo()._apply_deltas(deltas)
+    
+    # ==========================================
+    # BATCH INGESTION
+    # ==========================================
+    
+    @api.model
+    def _ingest_usage_batch(self, events, idempotency_key=None):
+        """
+        Ingest a batch of usage events in a constant number of queries
+        
+        Subscription references are resolved with one search, usage rows are
+        inserted with one multi-create and current_usage is incremented once
+        per subscription with an atomic UPDATE, so concurrent meter reports
+        do not overwrite each other.
+        
+        Args:
+            events: list of dicts with subscription_ref, usage_type, quantity
+                and optionally description, date, price_unit
+            idempotency_key: batch key; a replayed batch is ignored
+            
+        Returns:
+            dict: ingestion summary with created count and per-event errors
+        """
+        # The key claim and the usage rows commit or roll back together, so a
+        # batch that failed to ingest can be replayed with the same key
+        with self.env.cr.savepoint():
+            key_id = False
+            if idempotency_key:
+                key_id = self.env['subscription.usage.idempotency']._claim(
+                    idempotency_key, len(events)
+                )
+                if not key_id:
+                    return {'success': True, 'duplicate': True, 'created': 0, 'errors': []}
+            
+            result = self._create_usage_events(events)
+            
+            if key_id:
+                self.env['subscription.usage.idempotency'].browse(key_id).write({
+                    'created_count': result['created'],
+                })
+        
+        return result
+    
+    @api.model
+    def _create_usage_events(self, events):
+        """Validate events and create their usage rows (body of _ingest_usage_batch)"""
+        errors = []
+        valid_events = []
+        for index, event in enumerate(events):
+            if not isinstance(event, dict):
+                errors.append({'index': index, 'error': 'Invalid event'})
+                continue
+            try:
+                quantity = float(event.get('quantity') or 0)
+            except (TypeError, ValueError):
+                errors.append({'index': index, 'error': 'Invalid quantity'})
+                continue
+            if not event.get('subscription_ref') or not event.get('usage_type') or not quantity:
+                errors.append({'index': index, 'error': 'Missing required parameters'})
+                continue
+            valid_events.append((index, event, quantity))
+        
+        # Resolve all references in one query
+        refs = list({event['subscription_ref'] for index, event, quantity in valid_events})
+        subscription_by_ref = {
+            rec['name']: rec['id']
+            for rec in self.env['subscription.subscription'].search_read(
+                [('name', 'in', refs)], ['name']
+            )
+        } if refs else {}
+        
+        vals_list = []
+        usage_by_subscription = {}
+        today = fields.Date.today()
+        for index, event, quantity in valid_events:
+            subscription_id = subscription_by_ref.get(event['subscription_ref'])
+            if not subscription_id:
+                errors.append({'index': index, 'error': 'Subscription not found'})
+                continue
+            try:
+                usage_date = fields.Date.to_date(event.get('date')) or today
+                price_unit = float(event.get('price_unit') or 0.0)
+            except (TypeError, ValueError):
+                errors.append({'index': index, 'error': 'Invalid date or price'})
+                continue
+            vals_list.append({
+                'subscription_id': subscription_id,
+                'usage_type': event['usage_type'],
+                'quantity': quantity,
+                'description': event.get('description') or f"{event['usage_type']}: {quantity}",
+                'date': usage_date,
+                'price_unit': price_unit,
+            })
+            usage_by_subscription[subscription_id] = usage_by_subscription.get(subscription_id, 0.0) + quantity
+        
+        usages = self.create(vals_list) if vals_list else self.browse()
+        self.env['subscription.subscription']._increment_current_usage(usage_by_subscription)
+        
+        return {
+            'success': True,
+            'duplicate': False,
+            'created': len(usages),
+            'subscriptions': len(usage_by_subscription),
+            'errors': errors,
+        }
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+from datetime import timedelta
+
+
+class SubscriptionUsageIdempotency(models.Model):
+    _name = 'subscription.usage.idempotency'
+    _description = 'Usage Ingestion Idempotency Key'
+    _order = 'create_date desc'
+    
+    key = fields.Char('Idempotency Key', required=True, index=True, readonly=True)
+    event_count = fields.Integer('Events Received', readonly=True)
+    created_count = fields.Integer('Usage Records Created', readonly=True)
+    
+    _sql_constraints = [
+        ('key_unique', 'UNIQUE(key)', 'Idempotency key must be unique!'),
+    ]
+    
+    @api.model
+    def _claim(self, key, event_count=0):
+        """
+        Atomically register an idempotency key
+        
+        Uses INSERT ... ON CONFLICT so concurrent replays of the same batch
+        cannot both pass, without a prior SELECT.
+        
+        Returns:
+            int: id of the new key record, or False if the key was already used
+        """
+        self.env.cr.execute("""
+            INSERT INTO subscription_usage_idempotency
+                (key, event_count, created_count, create_uid, create_date, write_uid, write_date)
+            VALUES (%s, %s, 0, %s, NOW() AT TIME ZONE 'UTC', %s, NOW() AT TIME ZONE 'UTC')
+            ON CONFLICT (key) DO NOTHING
+            RETURNING id
+        """, (key, event_count, self.env.uid, self.env.uid))
+        row = self.env.cr.fetchone()
+        return row[0] if row else False
+    
+    @api.autovacuum
+    def _gc_expired_keys(self):
+        """Drop keys older than the retention window (replays are only expected shortly after)"""
+        retention_days = int(self.env['ir.config_parameter'].sudo().get_param(
+            'subscription.usage_idempotency_days', '30'
+        ))
+        limit_date = fields.Datetime.now() - timedelta(days=retention_days)
+        self.search([('create_date', '<', limit_date)]).unlink()
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, tools
+from odoo.tools import split_every
+from datetime import timedelta
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class SubscriptionUsageRollup(models.Model):
+    """
+    Daily usage totals per subscription and usage type
+    
+    Maintained incrementally by subscription.usage create/write/unlink, so
+    overage, billing and the portal read one row per day instead of every
+    raw usage record.
+    """
+    _name = 'subscription.usage.rollup'
+    _description = 'Subscription Daily Usage'
+    _order = 'date desc, usage_type'
+    
+    subscription_id = fields.Many2one('subscription.subscription', 'Subscription',
+                                      required=True, ondelete='cascade', index=True,
+                                      readonly=True)
+    usage_type = fields.Char('Usage Type', required=True, readonly=True)
+    date = fields.Date('Date', required=True, index=True, readonly=True)
+    
+    quantity = fields.Float('Quantity', readonly=True)
+    amount = fields.Float('Amount', readonly=True)
+    billable_quantity = fields.Float('Billable Quantity', readonly=True)
+    billable_amount = fields.Float('Billable Amount', readonly=True)
+    invoiced_billable_quantity = fields.Float('Invoiced Billable Quantity', readonly=True,
+                                              help='Part of the billable quantity already invoiced')
+    usage_count = fields.Integer('Usage Records', readonly=True)
+    
+    _sql_constraints = [
+        ('subscription_type_date_unique', 'UNIQUE(subscription_id, usage_type, date)',
+         'Only one usage rollup per subscription, usage type and day!'),
+    ]
+    
+    def init(self):
+        # Billing and overage only ever read days with usage not invoiced yet
+        tools.create_index(
+            self._cr, 'subscription_usage_rollup_uninvoiced_idx', self._table,
+            ['subscription_id'], where='billable_quantity <> invoiced_billable_quantity'
+        )
+    
+    @api.model
+    def _apply_deltas(self, deltas):
+        """
+        Upsert rollup deltas
+        
+        Args:
+            deltas: dict mapping (subscription_id, usage_type, date) to
+                [quantity, amount, billable_quantity, billable_amount, count]
+        """
+        if not deltas:
+            return
+        
+        row_sql = "(%s, %s, %s, %s, %s, %s, %s, %s, 0, %s, NOW() AT TIME ZONE 'UTC', %s, NOW() AT TIME ZONE 'UTC')"
+        for keys in split_every(1000, list(deltas)):
+            params = []
+            for key in keys:
+                params.extend(key)
+                params.extend(deltas[key])
+                params.extend([self.env.uid, self.env.uid])
+            self.env.cr.execute("""
+                INSERT INTO subscription_usage_rollup
+                    (subscription_id, usage_type, date, quantity, amount,
+                     billable_quantity, billable_amount, usage_count, invoiced_billable_quantity,
+                     create_uid, create_date, write_uid, write_date)
+                VALUES %s
+                ON CONFLICT (subscription_id, usage_type, date) DO UPDATE SET
+                    quantity = subscription_usage_rollup.quantity + EXCLUDED.quantity,
+                    amount = subscription_usage_rollup.amount + EXCLUDED.amount,
+                    billable_quantity = subscription_usage_rollup.billable_quantity + EXCLUDED.billable_quantity,
+                    billable_amount = subscription_usage_rollup.billable_amount + EXCLUDED.billable_amount,
+                    usage_count = subscription_usage_rollup.usage_count + EXCLUDED.usage_count,
+                    write_uid = EXCLUDED.write_uid,
+                    write_date = EXCLUDED.write_date
+            """ % ', '.join([row_sql] * len(keys)), params)
+        
+        # Days whose records were all corrected away, unless an invoice still has to be reversed
+        subscription_ids = list({key[0] for key in deltas})
+        self.env.cr.execute("""
+            DELETE FROM subscription_usage_rollup
+             WHERE subscription_id = ANY(%s) AND usage_count <= 0
+               AND invoiced_billable_quantity = 0
+        """, (subscription_ids,))
+        
+        self.invalidate_model()
+        self.env['subscription.subscription'].browse(subscription_ids).invalidate_recordset(
+            ['period_usage', 'usage_overage']
+        )
+    
+    @api.model
+    def _lock_uninvoiced(self, subscription_ids):
+        """
+        Lock the days with usage not invoiced yet of the given subscriptions
+        
+        Usage recorded into these days waits until the billing transaction
+        ends, so what is rated is exactly what _mark_invoiced records.
+        
+        Returns:
+            list: ids of the locked rollup rows
+        """
+        if not subscription_ids:
+            return []
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT id
+              FROM subscription_usage_rollup
+             WHERE subscription_id = ANY(%s)
+               AND billable_quantity <> invoiced_billable_quantity
+               FOR NO KEY UPDATE
+        """, (list(subscription_ids),))
+        return [row[0] for row in self.env.cr.fetchall()]
+    
+    @api.model
+    def _mark_invoiced(self, rollup_ids):
+        """Record the billable quantity of the given rollup rows as invoiced"""
+        if not rollup_ids:
+            return
+        self.env.cr.execute("""
+            UPDATE subscription_usage_rollup
+               SET invoiced_billable_quantity = billable_quantity,
+                   write_uid = %s,
+                   write_date = NOW() AT TIME ZONE 'UTC'
+             WHERE id = ANY(%s)
+         RETURNING subscription_id
+        """, (self.env.uid, list(rollup_ids)))
+        subscription_ids = list({row[0] for row in self.env.cr.fetchall()})
+        
+        self.invalidate_model()
+        self.env['subscription.subscription'].browse(subscription_ids).invalidate_recordset(
+            ['period_usage', 'usage_overage']
+        )
+    
+    @api.model
+    def _backfill_invoiced_quantity(self):
+        """Mark rollup days up to each subscription's last invoice as invoiced (install/upgrade)"""
+        self.env['subscription.subscription'].flush_model(['last_invoice_date'])
+        self.env.cr.execute("""
+            UPDATE subscription_usage_rollup r
+               SET invoiced_billable_quantity = CASE
+                       WHEN r.date <= s.last_invoice_date THEN r.billable_quantity
+                       ELSE 0
+                   END
+              FROM subscription_subscription s
+             WHERE s.id = r.subscription_id
+               AND r.invoiced_billable_quantity IS NULL
+        """)
+        if self.env.cr.rowcount:
+            _logger.info(f"Backfilled invoiced quantity of {self.env.cr.rowcount} usage rollup rows")
+        self.invalidate_model()
+    
+    @api.model
+    def _backfill_rollup(self):
+        """Build rollup rows from raw usage records when the rollup is still empty (install/upgrade)"""
+        self.env['subscription.usage'].flush_model()
+        self.env.cr.execute("SELECT 1 FROM subscription_usage_rollup LIMIT 1")
+        if self.env.cr.fetchone():
+            return
+        
+        self.env.cr.execute("""
+            INSERT INTO subscription_usage_rollup
+                (subscription_id, usage_type, date, quantity, amount,
+                 billable_quantity, billable_amount, usage_count,
+                 create_uid, create_date, write_uid, write_date)
+            SELECT subscription_id, usage_type, date,
+                   SUM(quantity), SUM(COALESCE(price_total, 0)),
+                   SUM(CASE WHEN billable THEN quantity ELSE 0 END),
+                   SUM(CASE WHEN billable THEN COALESCE(price_total, 0) ELSE 0 END),
+                   COUNT(*),
+                   %s, NOW() AT TIME ZONE 'UTC', %s, NOW() AT TIME ZONE 'UTC'
+              FROM subscription_usage
+             GROUP BY subscription_id, usage_type, date
+        """, (self.env.uid, self.env.uid))
+        _logger.info(f"Backfilled usage rollup with {self.env.cr.rowcount} daily rows")
+        self.invalidate_model()
+    
+    @api.model
+    def _cron_compact_usage(self):
+        """
+        Delete raw usage records older than the retention window
+        
+        Their totals stay in the rollup, which is left untouched.
+        Disabled when subscription.usage_retention_days is 0.
+        """
+        retention_days = int(self.env['ir.config_parameter'].sudo().get_param(
+            'subscription.usage_retention_days', '0'
+        ))
+        if retention_days <= 0:
+            return
+        
+        limit_date = fields.Date.today() - timedelta(days=retention_days)
+        Usage = self.env['subscription.usage'].with_context(skip_usage_rollup=True)
+        usage_ids = Usage.search([('date', '<', limit_date)]).ids
+        
+        for chunk_ids in split_every(10000, usage_ids):
+            Usage.browse(chunk_ids).unlink()
+            self.env['subscription.subscription']._cron_commit()
+        
+        _logger.info(f"Compacted {len(usage_ids)} usage records older than {limit_date}")
@@ -2,5 +2,6 @@
 
 from . import subscription_wizard
 from . import subscription_bulk_action_wizard
+from . import subscription_proration_simulator
 from . import subscription_usage_import_wizard
 from . import link_plan_wizard
\ No newline at end of file
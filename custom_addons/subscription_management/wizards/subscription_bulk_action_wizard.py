@@ -33,92 +33,58 @@ class SubscriptionBulkActionWizard(models.TransientModel):
         return res
 
     def action_execute_bulk(self):
-        """Execute bulk action"""
+        """Execute bulk action
+
+        Small selections are processed right away; larger ones are queued as
+        a background job processed chunk by chunk (see subscription.bulk.job).
+        """
         if not self.subscription_ids:
             raise UserError(_("No subscriptions selected"))
 
-        if self.action == 'suspend':
-            return self._bulk_suspend()
-        elif self.action == 'activate':
-            return self._bulk_activate()
-        elif self.action == 'cancel':
-            return self._bulk_cancel()
-        elif self.action == 'send_reminder':
-            return self._bulk_send_reminders()
-        elif self.action == 'update_price':
-            return self._bulk_update_price()
-
-    def _bulk_suspend(self):
-        """Bulk suspend subscriptions"""
-        count = 0
-        for subscription in self.subscription_ids:
-            if subscription.state in ('active', 'trial'):
-                subscription.action_suspend()
-                if self.reason:
-                    subscription.message_post(
-                        body=f"Bulk suspension: {self.reason}",
-                        message_type='comment'
-                    )
-                count += 1
-        
-        return self._show_result_message(f"{count} subscriptions suspended")
+        job = self.env['subscription.bulk.job'].create(self._prepare_job_vals())
 
-    def _bulk_activate(self):
-        """Bulk activate subscriptions"""
-        count = 0
-        for subscription in self.subscription_ids:
-            if subscription.state in ('draft', 'suspended'):
-                subscription.action_activate()
-                count += 1
-        
-        return self._show_result_message(f"{count} subscriptions activated")
+        sync_limit = int(self.env['ir.config_parameter'].sudo().get_param(
+            'subscription.bulk_action_sync_limit', '200'
+        ))
+        if len(self.subscription_ids) <= sync_limit:
+            job._run()
+            return self._show_result_message(self._get_result_message(job))
 
-    def _bulk_cancel(self):
-        """Bulk cancel subscriptions"""
-        count = 0
-        for subscription in self.subscription_ids:
-            if subscription.state not in ('cancelled', 'expired'):
-                subscription.action_cancel()
-                if self.reason:
-                    subscription.message_post(
-                        body=f"Bulk cancellation: {self.reason}",
-                        message_type='comment'
-                    )
-                count += 1
-        
-        return self._show_result_message(f"{count} subscriptions cancelled")
+        job._enqueue()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Bulk Action Progress'),
+            'res_model': 'subscription.bulk.job',
+            'res_id': job.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
 
-    def _bulk_send_reminders(self):
-        """Bulk send billing reminders"""
-        template = self.env.ref('subscription_management.email_template_subscription_billing_reminder', 
-                               raise_if_not_found=False)
-        count = 0
-        
-        if template:
-            for subscription in self.subscription_ids:
-                if subscription.state == 'active':
-                    template.send_mail(subscription.id, force_send=False)
-                    count += 1
-        
-        return self._show_result_message(f"Billing reminders sent to {count} customers")
+    def _prepare_job_vals(self):
+        """Prepare the background job values for this bulk action"""
+        action_label = dict(self._fields['action'].selection)[self.action]
+        return {
+            'name': f"{action_label} ({len(self.subscription_ids)})",
+            'action': self.action,
+            'subscription_ids': [(6, 0, self.subscription_ids.ids)],
+            'reason': self.reason,
+            'new_price': self.new_price,
+            'price_increase_percent': self.price_increase_percent,
+            'send_email': self.send_email,
+        }
 
-    def _bulk_update_price(self):
-        """Bulk update subscription prices"""
-        count = 0
-        for subscription in self.subscription_ids:
-            if self.new_price > 0:
-                subscription.write({'price': self.new_price})
-            elif self.price_increase_percent != 0:
-                new_price = subscription.price * (1 + self.price_increase_percent / 100)
-                subscription.write({'price': new_price})
-            
-            subscription.message_post(
-                body=f"Price updated via bulk action",
-                message_type='comment'
-            )
-            count += 1
-        
-        return self._show_result_message(f"{count} subscription prices updated")
+    def _get_result_message(self, job):
+        """Result message of a bulk action processed right away"""
+        message = {
+            'suspend': f"{job.success_count} subscriptions suspended",
+            'activate': f"{job.success_count} subscriptions activated",
+            'cancel': f"{job.success_count} subscriptions cancelled",
+            'send_reminder': f"Billing reminders sent to {job.success_count} customers",
+            'update_price': f"{job.success_count} subscription prices updated",
+        }[job.action]
+        if job.failed_count:
+            message += f" ({job.failed_count} failed)"
+        return message
 
     def _show_result_message(self, message):
         """Show result message"""
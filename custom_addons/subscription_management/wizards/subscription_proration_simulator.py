@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+import base64
+import csv
+import io
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class SubscriptionProrationSimulator(models.TransientModel):
+    _name = 'subscription.proration.simulator'
+    _description = 'Plan Change Proration Simulator'
+
+    plan_id = fields.Many2one('subscription.plan', 'Plan', required=True)
+    currency_id = fields.Many2one(related='plan_id.currency_id')
+    change_type = fields.Selection([
+        ('price', 'Change Plan Price'),
+        ('plan', 'Move Subscriptions to Another Plan'),
+    ], string='Change', required=True, default='price')
+    new_price = fields.Float('New Price')
+    new_plan_id = fields.Many2one('subscription.plan', 'New Plan')
+    effective_date = fields.Date('Effective Date', required=True, default=fields.Date.today)
+    create_invoices = fields.Boolean('Create Proration Invoices', default=False,
+                                     help='On confirmation, invoice prorated charges and refund prorated credits')
+
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('simulated', 'Simulated'),
+    ], default='draft')
+
+    # Results
+    affected_count = fields.Integer('Affected Subscriptions', readonly=True)
+    total_charge = fields.Monetary('Prorated Charges', readonly=True)
+    total_credit = fields.Monetary('Prorated Credits', readonly=True)
+    net_proration = fields.Monetary('Net Proration', readonly=True)
+    price_delta_per_period = fields.Monetary('Revenue Change per Period', readonly=True)
+    mrr_delta = fields.Monetary('MRR Change', readonly=True)
+    arr_delta = fields.Monetary('ARR Change', readonly=True)
+    detail_file = fields.Binary('Detail', readonly=True, attachment=False)
+    detail_filename = fields.Char('Detail File Name', readonly=True)
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super().default_get(fields_list)
+        if self.env.context.get('active_model') == 'subscription.plan' and self.env.context.get('active_id'):
+            plan = self.env['subscription.plan'].browse(self.env.context['active_id'])
+            res['plan_id'] = plan.id
+            res['new_price'] = plan.price
+        return res
+
+    def _simulate(self):
+        """Run the simulation for the current settings"""
+        self.ensure_one()
+        if self.change_type == 'plan':
+            if not self.new_plan_id:
+                raise UserError(_("Please select the new plan"))
+            if self.new_plan_id == self.plan_id:
+                raise UserError(_("The new plan must differ from the current plan"))
+            return self.plan_id._simulate_price_change(
+                new_plan=self.new_plan_id, effective_date=self.effective_date
+            )
+        return self.plan_id._simulate_price_change(
+            new_price=self.new_price, effective_date=self.effective_date
+        )
+
+    def action_simulate(self):
+        """Compute the impact and the downloadable detail; nothing else is written"""
+        self.ensure_one()
+        result = self._simulate()
+        self.write(dict(
+            result['summary'],
+            state='simulated',
+            detail_file=base64.b64encode(self._build_detail_csv(result['lines'])),
+            detail_filename=f"proration_{self.plan_id.code}_{self.effective_date}.csv",
+        ))
+        return self._reopen()
+
+    def action_reset(self):
+        """Back to the change settings"""
+        self.write({'state': 'draft', 'detail_file': False, 'detail_filename': False})
+        return self._reopen()
+
+    def action_confirm(self):
+        """Apply the change to every affected subscription, using a fresh simulation"""
+        self.ensure_one()
+        result = self._simulate()
+        lines = result['lines']
+        subscriptions = self.env['subscription.subscription'].browse(
+            [line['subscription_id'] for line in lines]
+        )
+
+        if self.change_type == 'plan':
+            subscriptions.write({'plan_id': self.new_plan_id.id})
+            subscriptions._message_log_batch(
+                bodies={sub.id: f"Plan changed from {self.plan_id.name} to {self.new_plan_id.name}"
+                        for sub in subscriptions},
+            )
+        else:
+            old_price = self.plan_id.price
+            self.plan_id.write({'price': self.new_price})
+            self.plan_id.message_post(
+                body=f"Price changed from {old_price} to {self.new_price} "
+                     f"({len(lines)} subscriptions, net proration {result['summary']['net_proration']})",
+                message_type='comment'
+            )
+
+        invoices = self.env['account.move']
+        if self.create_invoices:
+            invoices = self._create_proration_invoices(lines)
+
+        _logger.info(f"Applied {self.change_type} change to {len(lines)} subscriptions of plan "
+                     f"{self.plan_id.name}, {len(invoices)} proration invoices created")
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Change Applied'),
+                'message': _("%(count)s subscriptions updated, %(invoices)s proration invoices created",
+                             count=len(lines), invoices=len(invoices)),
+                'type': 'success',
+                'sticky': False,
+                'next': {'type': 'ir.actions.act_window_close'},
+            }
+        }
+
+    def _create_proration_invoices(self, lines):
+        """Create all proration invoices and refunds with one multi-create"""
+        target_plan = self.new_plan_id if self.change_type == 'plan' else self.plan_id
+        subscriptions = self.env['subscription.subscription'].browse(
+            [line['subscription_id'] for line in lines]
+        )
+        vals_list = []
+        for subscription, line in zip(subscriptions, lines):
+            amount = line['proration_amount']
+            if not amount:
+                continue
+            vals_list.append({
+                'move_type': 'out_invoice' if amount > 0 else 'out_refund',
+                'partner_id': subscription.partner_id.id,
+                'subscription_id': subscription.id,
+                'company_id': subscription.company_id.id,
+                'invoice_origin': f"Plan change - {subscription.name}",
+                'invoice_line_ids': [(0, 0, {
+                    'name': f"Plan change proration: {self.plan_id.name} → {target_plan.name}",
+                    'quantity': 1,
+                    'price_unit': abs(amount),
+                })],
+            })
+        return self.env['account.move'].create(vals_list)
+
+    def _build_detail_csv(self, lines):
+        """Per-subscription detail as CSV bytes"""
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow([
+            'Subscription', 'Customer', 'Status', 'Next Billing Date', 'Remaining Days',
+            'Current Price', 'New Price', 'Proration Amount',
+        ])
+        for line in lines:
+            writer.writerow([
+                line['subscription'], line['customer'], line['state'],
+                line['next_billing_date'] or '', '' if line['remaining_days'] is None else line['remaining_days'],
+                line['current_price'], line['new_price'], line['proration_amount'],
+            ])
+        return output.getvalue().encode('utf-8-sig')
+
+    def _reopen(self):
+        """Keep the simulator dialog open"""
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
@@ -2,14 +2,23 @@
 
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError, ValidationError
-from datetime import datetime
+from odoo.tools import split_every
+from datetime import datetime, date
 import base64
 import io
 import csv
 import logging
 
+try:
+    from openpyxl import load_workbook
+except ImportError:
+    load_workbook = None
+
 _logger = logging.getLogger(__name__)
 
+# Errors kept for the result message; the rest are only counted
+MAX_REPORTED_ERRORS = 50
+
 
 class SubscriptionUsageImportWizard(models.TransientModel):
     _name = 'subscription.usage.import.wizard'
@@ -22,103 +31,223 @@ class SubscriptionUsageImportWizard(models.TransientModel):
         ('excel', 'Excel'),
     ], string='File Type', required=True, default='csv')
 
-    subscription_id = fields.Many2one('subscription.subscription', 'Subscription')
+    subscription_id = fields.Many2one('subscription.subscription', 'Subscription',
+                                      help='Leave empty to read the subscription of each row '
+                                           'from the subscription reference column')
     usage_type = fields.Char('Usage Type', required=True)
     date_column = fields.Char('Date Column', default='date')
     quantity_column = fields.Char('Quantity Column', default='quantity')
     description_column = fields.Char('Description Column', default='description')
+    subscription_column = fields.Char('Subscription Reference Column', default='subscription',
+                                      help='Column holding the subscription reference (e.g. SUB00001)')
+    chunk_size = fields.Integer('Rows per Chunk', default=5000)
 
     def action_import_usage(self):
         """Import usage data from file"""
-        if not self.file_data:
+        if not self.with_context(bin_size=True).file_data:
             raise UserError(_("Please upload a file"))
 
-        # Decode file data
-        file_content = base64.b64decode(self.file_data)
-        
-        if self.file_type == 'csv':
-            return self._import_csv_usage(file_content)
-        elif self.file_type == 'excel':
-            return self._import_excel_usage(file_content)
-
-    def _import_csv_usage(self, file_content):
-        """Import usage from CSV"""
-        csv_file = io.StringIO(file_content.decode('utf-8'))
-        reader = csv.DictReader(csv_file)
-        
-        usage_records = []
-        error_lines = []
-        
-        for line_num, row in enumerate(reader, start=2):
+        file_stream = self._open_file_stream()
+        try:
+            if self.file_type == 'csv':
+                return self._import_csv_usage(file_stream)
+            elif self.file_type == 'excel':
+                return self._import_excel_usage(file_stream)
+        finally:
+            file_stream.close()
+
+    def _open_file_stream(self):
+        """Open the uploaded file as a binary stream
+
+        Reads straight from the filestore when the file is stored as an
+        attachment, so large meter exports are never fully loaded in memory.
+        """
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', 'file_data'),
+        ], limit=1)
+        if attachment.store_fname:
             try:
-                usage_data = self._process_usage_row(row)
-                usage_records.append(usage_data)
-            except Exception as e:
-                error_lines.append(f"Line {line_num}: {str(e)}")
-        
-        # Create usage records
+                return open(attachment._full_path(attachment.store_fname), 'rb')
+            except OSError:
+                _logger.warning(f"Could not open usage file {attachment.store_fname} from filestore")
+        return io.BytesIO(base64.b64decode(self.file_data))
+
+    def _import_csv_usage(self, file_stream):
+        """Import usage from CSV, streaming rows"""
+        text_stream = io.TextIOWrapper(file_stream, encoding='utf-8-sig', newline='')
+        try:
+            reader = csv.DictReader(text_stream)
+            return self._import_usage_rows(reader)
+        finally:
+            text_stream.detach()
+
+    def _import_excel_usage(self, file_stream):
+        """Import usage from the first sheet of an XLSX file, streaming rows"""
+        if load_workbook is None:
+            raise UserError(_("Excel import requires the openpyxl library. Please use CSV format."))
+
+        try:
+            workbook = load_workbook(file_stream, read_only=True, data_only=True)
+        except Exception as e:
+            raise UserError(_("Could not read Excel file: %s") % e)
+
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if not header:
+                raise UserError(_("The Excel file is empty."))
+            header = [str(cell).strip() if cell is not None else '' for cell in header]
+            return self._import_usage_rows(dict(zip(header, row)) for row in rows)
+        finally:
+            workbook.close()
+
+    def _import_usage_rows(self, rows):
+        """Import an iterable of row dicts chunk by chunk
+
+        Each chunk is validated, resolved against subscriptions with one query,
+        inserted with one multi-create and applied to current_usage with one
+        increment per subscription. A failing chunk is rolled back on its own
+        and reported, the other chunks are kept.
+        """
+        chunk_size = self.chunk_size if self.chunk_size > 0 else 5000
+        subscription_cache = {}
         created_count = 0
-        for usage_data in usage_records:
+        error_count = 0
+        error_lines = []
+
+        numbered_rows = enumerate(rows, start=2)
+        for chunk in split_every(chunk_size, numbered_rows):
+            first_line, last_line = chunk[0][0], chunk[-1][0]
+            vals_list, row_errors = self._prepare_usage_chunk(chunk, subscription_cache)
+
             try:
-                self.env['subscription.usage'].create(usage_data)
-                created_count += 1
+                with self.env.cr.savepoint():
+                    if vals_list:
+                        self.env['subscription.usage'].create(vals_list)
+                        quantities = {}
+                        for vals in vals_list:
+                            subscription_id = vals['subscription_id']
+                            quantities[subscription_id] = quantities.get(subscription_id, 0.0) + vals['quantity']
+                        self.env['subscription.subscription']._increment_current_usage(quantities)
+                created_count += len(vals_list)
             except Exception as e:
-                error_lines.append(f"Error creating usage: {str(e)}")
-        
+                row_errors.append(f"Lines {first_line}-{last_line}: chunk not imported ({e})")
+                _logger.warning(f"Usage import chunk {first_line}-{last_line} failed: {e}")
+
+            error_count += len(row_errors)
+            error_lines.extend(row_errors[:MAX_REPORTED_ERRORS - len(error_lines)])
+
+            # Keep memory bounded across chunks
+            self.env.invalidate_all()
+
         # Show result
         message = f"Successfully imported {created_count} usage records"
-        if error_lines:
-            message += f"\n\nErrors:\n" + "\n".join(error_lines[:10])
-            if len(error_lines) > 10:
-                message += f"\n... and {len(error_lines) - 10} more errors"
-        
+        if error_count:
+            message += f"\n\nErrors:\n" + "\n".join(error_lines)
+            if error_count > len(error_lines):
+                message += f"\n... and {error_count - len(error_lines)} more errors"
+
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
             'params': {
                 'title': _('Import Completed'),
                 'message': message,
-                'type': 'success' if not error_lines else 'warning',
+                'type': 'success' if not error_count else 'warning',
                 'sticky': True,
             }
         }
 
-    def _import_excel_usage(self, file_content):
-        """Import usage from Excel"""
-        # This would require openpyxl or similar library
-        # For now, just raise not implemented
-        raise UserError(_("Excel import not implemented yet. Please use CSV format."))
+    def _prepare_usage_chunk(self, chunk, subscription_cache):
+        """Parse a chunk of (line number, row) pairs into usage values
+
+        Subscription references not seen in previous chunks are resolved
+        with a single search.
+
+        Returns:
+            tuple: (list of usage vals, list of error messages)
+        """
+        errors = []
+        parsed = []
+        for line_num, row in chunk:
+            try:
+                usage_data = self._process_usage_row(row)
+                if not usage_data['subscription_id']:
+                    usage_data['subscription_id'] = self._get_row_subscription_ref(row)
+                parsed.append((line_num, usage_data))
+            except Exception as e:
+                errors.append(f"Line {line_num}: {str(e)}")
+
+        if not self.subscription_id:
+            missing_refs = list({
+                usage_data['subscription_id'] for line_num, usage_data in parsed
+                if usage_data['subscription_id'] not in subscription_cache
+            })
+            if missing_refs:
+                found = self.env['subscription.subscription'].search_read(
+                    [('name', 'in', missing_refs)], ['name']
+                )
+                subscription_cache.update({ref: False for ref in missing_refs})
+                subscription_cache.update({rec['name']: rec['id'] for rec in found})
+
+        vals_list = []
+        for line_num, usage_data in parsed:
+            if not self.subscription_id:
+                ref = usage_data['subscription_id']
+                usage_data['subscription_id'] = subscription_cache.get(ref)
+                if not usage_data['subscription_id']:
+                    errors.append(f"Line {line_num}: Subscription '{ref}' not found")
+                    continue
+            vals_list.append(usage_data)
+
+        return vals_list, errors
+
+    def _get_row_subscription_ref(self, row):
+        """Read the subscription reference of a row"""
+        ref = row.get(self.subscription_column or 'subscription')
+        ref = str(ref).strip() if ref is not None else ''
+        if not ref:
+            raise ValidationError(f"Missing subscription reference in column '{self.subscription_column}'")
+        return ref
 
     def _process_usage_row(self, row):
         """Process a single usage row"""
         # Parse date
-        date_str = row.get(self.date_column, '')
-        if not date_str:
-            raise ValidationError(f"Missing date in column '{self.date_column}'")
-        
-        try:
-            usage_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-        except ValueError:
+        date_value = row.get(self.date_column, '')
+        if isinstance(date_value, datetime):
+            usage_date = date_value.date()
+        elif isinstance(date_value, date):
+            usage_date = date_value
+        else:
+            date_str = str(date_value or '').strip()
+            if not date_str:
+                raise ValidationError(f"Missing date in column '{self.date_column}'")
+
             try:
-                usage_date = datetime.strptime(date_str, '%m/%d/%Y').date()
+                usage_date = datetime.strptime(date_str, '%Y-%m-%d').date()
             except ValueError:
-                raise ValidationError(f"Invalid date format: {date_str}")
-        
+                try:
+                    usage_date = datetime.strptime(date_str, '%m/%d/%Y').date()
+                except ValueError:
+                    raise ValidationError(f"Invalid date format: {date_str}")
+
         # Parse quantity
         quantity_str = row.get(self.quantity_column, '0')
         try:
             quantity = float(quantity_str)
-        except ValueError:
+        except (TypeError, ValueError):
             raise ValidationError(f"Invalid quantity: {quantity_str}")
-        
+
         # Get description
-        description = row.get(self.description_column, '')
-        
+        description = row.get(self.description_column) or ''
+
         return {
             'subscription_id': self.subscription_id.id,
             'date': usage_date,
             'usage_type': self.usage_type,
             'quantity': quantity,
-            'description': description,
+            'description': str(description),
             'billable': True,
-        }
\ No newline at end of file
+        }
@@ -239,12 +239,7 @@ class SubscriptionWizard(models.TransientModel):
             remaining_days = (self.subscription_id.next_billing_date - today).days
             
             # Calculate daily rate and proration
-            if old_plan.billing_period == 'monthly':
-                total_days = 30
-            elif old_plan.billing_period == 'yearly':
-                total_days = 365
-            else:
-                total_days = 30  # Default
+            total_days = old_plan._get_proration_period_days()
             
             proration_factor = remaining_days / total_days
             return price_difference * proration_factor